@@ -0,0 +1,346 @@
+"""
+Benchmark: throughput and latency of every router's endpoints under concurrent load.
+
+Seeds a synthetic catalog (courses, chapters, one quiz per course, users with
+enrollments, chapter completions and quiz attempts), starts the application
+with its lifespan, and drives each endpoint in turn with concurrent
+``httpx.AsyncClient`` requests against the ASGI app (no network). Reports, as
+JSON, per endpoint: throughput, p50/p95/p99 latency, error count and SQL
+statements per request (from the request metrics middleware).
+
+The report is compared against a stored baseline. Statements per request
+are deterministic and must not grow. Latency and throughput are compared only
+when the baseline was recorded with the same settings, within ``--tolerance``.
+Any regression exits with status 1. Record a baseline on the machine that
+runs the comparison with ``--save-baseline``.
+
+The default catalog runs in under a minute on SQLite. The full-size catalog
+and a local Postgres can be selected with flags, e.g.:
+    python -m benchmarks.api_load --courses 1000 --chapters 100 --users 1000000 \\
+        --enrollments 1 --database-url postgresql://localhost/bench
+
+Usage (from backend/):
+    python -m benchmarks.api_load
+    python -m benchmarks.api_load --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "api_load.json")
+
+WORDS = (
+    "python typing async await generator decorator closure iterator context manager class "
+    "protocol dataclass pattern matching exception logging testing fixture mock database "
+    "query index transaction cache queue thread process socket http json schema validation "
+    "function module package import variable loop list dictionary set tuple string"
+).split()
+OPTIONS = ["a", "b", "c", "d"]
+QUESTIONS_PER_QUIZ = 10
+CHUNK_SIZE = 10000
+
+
+def _chunks(rows, size: int = CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(conn, model, rows):
+    from sqlalchemy import insert
+
+    for chunk in _chunks(rows):
+        conn.execute(insert(model), chunk)
+
+
+def seed(engine, args, rng: random.Random):
+    """Insert the synthetic catalog with chunked executemany inserts (skipped if
+    the database already has courses)"""
+    from sqlalchemy import func, select
+
+    from models import (
+        Chapter, ChapterCompletion, Course, Quiz, QuizAttempt, QuizBestScore, Subscription, User, UserProgress,
+    )
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Course)).scalar_one():
+            return False
+
+        _insert(conn, Course, (
+            {"id": f"course-{c}", "title": f"Course {c}: {' '.join(rng.sample(WORDS, 3))}",
+             "description": " ".join(rng.sample(WORDS, 12)), "prerequisites": []}
+            for c in range(args.courses)
+        ))
+        _insert(conn, Chapter, (
+            {
+                "id": f"course-{c}-ch{n}", "course_id": f"course-{c}", "order": n + 1,
+                "title": f"Chapter {n + 1}: {' '.join(rng.sample(WORDS, 2))}",
+                "content": " ".join(rng.choices(WORDS, k=args.content_words)),
+                "prev_chapter_id": f"course-{c}-ch{n - 1}" if n > 0 else None,
+                "next_chapter_id": f"course-{c}-ch{n + 1}" if n + 1 < args.chapters else None,
+            }
+            for c in range(args.courses) for n in range(args.chapters)
+        ))
+        _insert(conn, Quiz, (
+            {
+                "id": f"quiz-{c}", "course_id": f"course-{c}", "chapter_id": f"course-{c}-ch0",
+                "title": f"Quiz {c}", "passing_score": 0.7,
+                "questions": [
+                    {"id": f"q{n}", "question": f"Question {n}", "options": OPTIONS, "correct_answer": OPTIONS[n % 4]}
+                    for n in range(QUESTIONS_PER_QUIZ)
+                ],
+            }
+            for c in range(args.courses)
+        ))
+        _insert(conn, User, (
+            {"id": f"user-{u}", "email": f"user-{u}@example.com", "username": f"user-{u}", "is_active": True}
+            for u in range(args.users)
+        ))
+
+        now = datetime.now(timezone.utc)
+        # Even-numbered users are on a paid plan, so the premium endpoints let them in
+        _insert(conn, Subscription, (
+            {"user_id": f"user-{u}", "plan_type": "pro", "is_active": True, "end_date": now + timedelta(days=30)}
+            for u in range(0, args.users, 2)
+        ))
+        enrollments = [
+            (f"user-{u}", c) for u in range(args.users) for c in rng.sample(range(args.courses), args.enrollments)
+        ]
+        _insert(conn, UserProgress, (
+            {"user_id": user_id, "course_id": f"course-{c}", "streak_days": rng.randrange(30), "last_accessed": now}
+            for user_id, c in enrollments
+        ))
+        _insert(conn, ChapterCompletion, (
+            {"user_id": user_id, "course_id": f"course-{c}", "chapter_id": f"course-{c}-ch{n}", "completed_at": now}
+            for user_id, c in enrollments for n in range(rng.randrange(args.chapters + 1))
+        ))
+        attempts = [
+            (user_id, c, rng.randrange(QUESTIONS_PER_QUIZ + 1) / QUESTIONS_PER_QUIZ)
+            for user_id, c in enrollments for _ in range(rng.randrange(args.attempts + 1))
+        ]
+        _insert(conn, QuizAttempt, (
+            {"user_id": user_id, "quiz_id": f"quiz-{c}", "answers": {}, "score": score,
+             "passed": score >= 0.7, "completed_at": now - timedelta(minutes=i)}
+            for i, (user_id, c, score) in enumerate(attempts)
+        ))
+        best = {}
+        for user_id, c, score in attempts:
+            row = best.setdefault((user_id, c), {
+                "user_id": user_id, "quiz_id": f"quiz-{c}", "course_id": f"course-{c}", "best_score": score,
+                "attempts": 0, "last_score": score, "last_passed": score >= 0.7, "last_attempt_at": now,
+            })
+            row["best_score"] = max(row["best_score"], score)
+            row["attempts"] += 1
+        _insert(conn, QuizBestScore, best.values())
+    return True
+
+
+def endpoints(args):
+    """(name, request builder) per endpoint; builders return (method, url, json body)"""
+    def course(rng):
+        return rng.randrange(args.courses)
+
+    def chapter(rng, with_next: bool = False):
+        return f"course-{course(rng)}-ch{rng.randrange(args.chapters - 1 if with_next else args.chapters)}"
+
+    def user(rng):
+        return f"user-{rng.randrange(args.users)}"
+
+    def premium_user(rng):
+        return f"user-{rng.randrange(0, args.users, 2)}"
+
+    def submission(rng):
+        c = course(rng)
+        return {
+            "user_id": user(rng), "quiz_id": f"quiz-{c}",
+            "answers": {f"q{n}": rng.choice(OPTIONS) for n in range(QUESTIONS_PER_QUIZ)},
+        }
+
+    v1 = "/api/v1"
+    return [
+        ("courses.list", lambda rng: ("GET", f"{v1}/courses/", None)),
+        ("courses.get", lambda rng: ("GET", f"{v1}/courses/course-{course(rng)}", None)),
+        ("courses.chapters", lambda rng: ("GET", f"{v1}/courses/course-{course(rng)}/chapters", None)),
+        ("courses.chapter", lambda rng: ("GET", f"{v1}/courses/chapters/{chapter(rng)}", None)),
+        ("courses.next", lambda rng: ("GET", f"{v1}/courses/chapters/{chapter(rng, with_next=True)}/next", None)),
+        ("courses.bundle", lambda rng: ("GET", f"{v1}/courses/chapters/{chapter(rng)}/bundle?include_content=true", None)),
+        ("progress.courses", lambda rng: ("GET", f"{v1}/progress/{user(rng)}/courses", None)),
+        ("progress.course", lambda rng: ("GET", f"{v1}/progress/{user(rng)}/courses/course-{course(rng)}", None)),
+        ("progress.complete", lambda rng: (
+            "POST", f"{v1}/progress/{user(rng)}/courses/course-{course(rng)}/chapters/{chapter(rng)}", None
+        )),
+        ("quizzes.get", lambda rng: ("GET", f"{v1}/quizzes/quiz-{course(rng)}", None)),
+        ("quizzes.submit", lambda rng: ("POST", f"{v1}/quizzes/submit", submission(rng))),
+        ("quizzes.attempts", lambda rng: ("GET", f"{v1}/quizzes/attempts/{user(rng)}/quiz-{course(rng)}", None)),
+        ("search.all", lambda rng: ("GET", f"{v1}/search/?query={rng.choice(WORDS)}", None)),
+        ("search.chapters", lambda rng: ("GET", f"{v1}/search/chapters?query={rng.choice(WORDS)}", None)),
+        ("hybrid.adaptive", lambda rng: ("POST", f"{v1}/hybrid/adaptive-learning", {
+            "user_id": premium_user(rng), "course_id": f"course-{course(rng)}", "current_chapter_id": chapter(rng),
+            "quiz_performance": {"quiz-0": 0.5}, "time_spent": {"ch": 400},
+        })),
+        ("hybrid.usage", lambda rng: ("GET", f"{v1}/hybrid/usage/{user(rng)}", None)),
+        ("access.check", lambda rng: ("GET", f"{v1}/access/check?user_id={user(rng)}", None)),
+    ]
+
+
+def percentile(ordered, pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(client, build, requests: int, concurrency: int, rng: random.Random) -> dict:
+    from services.metrics import request_metrics
+
+    calls = [build(rng) for _ in range(requests)]
+    calls.reverse()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while calls:
+            method, url, body = calls.pop()
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    count_before, statements_before = request_metrics.statements.totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    count_after, statements_after = request_metrics.statements.totals()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "sql_per_request": round((statements_after - statements_before) / max(count_after - count_before, 1), 2),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    regressions = []
+    same_settings = baseline.get("settings") == report["settings"]
+    for name, current in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if base is None:
+            continue
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base['errors']})")
+        if current["sql_per_request"] > base["sql_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: {current['sql_per_request']} SQL statements per request (baseline {base['sql_per_request']})"
+            )
+        if not same_settings:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance) and current["p95_ms"] - base["p95_ms"] > min_delta_ms:
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms (baseline {base['p95_ms']}ms)")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s (baseline {base['rps']})")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", help="sync URL of the database to seed and serve (default: temporary SQLite)")
+    parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--chapters", type=int, default=20, help="chapters per course")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--enrollments", type=int, default=5, help="courses per user")
+    parser.add_argument("--attempts", type=int, default=3, help="max quiz attempts per enrollment")
+    parser.add_argument("--content-words", type=int, default=120, help="words of content per chapter")
+    parser.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests per endpoint first")
+    parser.add_argument("--only", help="comma-separated endpoint names or router prefixes (e.g. courses,search.all)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the report to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95/throughput change")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore p95 increases smaller than this")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.pop("DATABASE_READ_URL", None)
+
+    import httpx
+
+    from config.database import async_engine, engine
+    from config.migrations import run_migrations
+    from main import app
+
+    # Request logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    run_migrations()
+    started = time.perf_counter()
+    seeded = seed(engine, args, rng)
+    seed_seconds = time.perf_counter() - started
+
+    selected = [
+        (name, build) for name, build in endpoints(args)
+        if not args.only or any(name == only or name.startswith(f"{only}.") for only in args.only.split(","))
+    ]
+    report = {
+        "settings": {
+            key: getattr(args, key)
+            for key in ("courses", "chapters", "users", "enrollments", "attempts", "content_words", "requests", "concurrency")
+        },
+        "database": engine.dialect.name,
+        "seed_s": round(seed_seconds, 2) if seeded else None,
+        "endpoints": {},
+    }
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, build in selected:
+                    await drive(client, build, args.warmup, args.concurrency, rng)
+                    report["endpoints"][name] = await drive(client, build, args.requests, args.concurrency, rng)
+    finally:
+        await async_engine.dispose()
+        tmp.cleanup()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if baseline.get("settings") != report["settings"]:
+            report["note"] = "baseline settings differ; compared errors and SQL statements only"
+
+    print(json.dumps(report, indent=2))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
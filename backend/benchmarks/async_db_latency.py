@@ -0,0 +1,146 @@
+"""
+Benchmark: p99 latency of a cheap endpoint while slow queries run concurrently.
+
+Compares the old request path (``async def`` handler doing blocking calls
+through the sync ``SessionLocal``) against the ``AsyncSession`` path used by
+the routers. Slow queries are simulated with a ``sleep_ms()`` SQL function so
+the result does not depend on catalog size.
+
+Usage (from backend/):
+    python -m benchmarks.async_db_latency --clients 20 --requests 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from config.database import Base
+from models import Chapter as ChapterModel, Course as CourseModel
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000.0)
+    return ms
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, _sleep_ms)
+
+
+def build_apps(db_path: str, slow_ms: int, pool_size: int):
+    # The sync pool is sized to the client count: with the default 5+10 the old
+    # path blocks the event loop on checkout and never gets to release connections
+    sync_engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, pool_size=pool_size
+    )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    event.listen(sync_engine, "connect", _register_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as db:
+        db.add(CourseModel(id="bench-course", title="Bench", description="Bench course", prerequisites=[]))
+        db.add(ChapterModel(id="bench-ch1", course_id="bench-course", title="Bench chapter", content="...", order=1))
+        db.commit()
+
+    SyncSessionLocal = sessionmaker(bind=sync_engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    before = FastAPI()
+
+    @before.get("/slow")
+    async def slow_sync(db: Session = Depends(get_sync_db)):
+        return {"ms": db.execute(text("SELECT sleep_ms(:ms)"), {"ms": slow_ms}).scalar()}
+
+    @before.get("/fast")
+    async def fast_sync(db: Session = Depends(get_sync_db)):
+        return {"id": db.get(ChapterModel, "bench-ch1").id}
+
+    after = FastAPI()
+
+    @after.get("/slow")
+    async def slow_async(db: AsyncSession = Depends(get_async_db)):
+        return {"ms": (await db.execute(text("SELECT sleep_ms(:ms)"), {"ms": slow_ms})).scalar()}
+
+    @after.get("/fast")
+    async def fast_async(db: AsyncSession = Depends(get_async_db)):
+        return {"id": (await db.get(ChapterModel, "bench-ch1")).id}
+
+    return {"before (sync Session)": before, "after (AsyncSession)": after}, async_engine
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def drive(app, clients: int, requests_per_client: int, slow_every: int):
+    fast_latencies = []
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def worker(worker_id: int):
+            for i in range(requests_per_client):
+                path = "/slow" if (worker_id + i) % slow_every == 0 else "/fast"
+                started = time.perf_counter()
+                response = await client.get(path)
+                elapsed = (time.perf_counter() - started) * 1000
+                response.raise_for_status()
+                if path == "/fast":
+                    fast_latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        wall = time.perf_counter() - started
+
+    return {
+        "fast_requests": len(fast_latencies),
+        "p50_ms": round(statistics.median(fast_latencies), 2),
+        "p99_ms": round(percentile(fast_latencies, 99), 2),
+        "wall_s": round(wall, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--slow-ms", type=int, default=50, help="duration of each simulated slow query")
+    parser.add_argument("--slow-every", type=int, default=10, help="one slow request per N requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        apps, async_engine = build_apps(os.path.join(tmp, "bench.db"), args.slow_ms, args.clients)
+        report = {}
+        for name, app in apps.items():
+            report[name] = await drive(app, args.clients, args.requests, args.slow_every)
+        await async_engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Benchmark: the LLM client under load, against the local stub server.
+
+Starts ``services.llm_stub`` on a free port (simulated latency, optionally
+failing every Nth request with a 529) and sends ``--calls`` completions
+through ``HTTPBackend`` and ``LLMClient``, ``--concurrency`` at a time,
+spread evenly over the plan tiers. Reports as JSON, per tier: the
+concurrency limit, the peak observed in flight, latency and queue-wait
+percentiles, outcomes and retried calls; plus overall throughput and tokens.
+Runs offline: nothing leaves the machine.
+
+Usage (from backend/):
+    python -m benchmarks.llm_load --calls 2000 --concurrency 200 --fail-every 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import llm_stub
+from services.llm import HTTPBackend, LLMClient, LLMError, parse_concurrency
+
+TIERS = ("premium", "pro", "team")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PeakTracker:
+    """Highest in-flight count seen per tier, sampled from the client's stats"""
+
+    def __init__(self, client: LLMClient):
+        self.client = client
+        self.peak = Counter()
+
+    def sample(self):
+        for tier, usage in self.client.stats()["tiers"].items():
+            self.peak[tier] = max(self.peak[tier], usage["in_flight"])
+
+
+async def run(args) -> dict:
+    import uvicorn
+
+    port = free_port()
+    latency = llm_stub.StubLatency(args.base_latency_ms, args.ms_per_token, args.jitter_ms)
+    server = uvicorn.Server(uvicorn.Config(
+        llm_stub.create_app(latency, args.fail_every), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    client = LLMClient(
+        HTTPBackend(f"http://127.0.0.1:{port}", api_key="stub"),
+        concurrency=parse_concurrency(args.tier_limits),
+        queue_timeout_seconds=args.queue_timeout,
+        recent_calls=args.calls,
+    )
+    tracker = PeakTracker(client)
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(n: int):
+        tier = TIERS[n % len(TIERS)]
+        prompt = f"Question {n}: " + "explain generators and closures " * args.prompt_repeat
+        async with gate:
+            try:
+                await client.complete("load_test", tier, "You are a tutor.", prompt, args.max_tokens)
+            except LLMError:
+                pass  # The client records the outcome
+            tracker.sample()
+
+    started = time.perf_counter()
+
+    async def sampler():
+        while True:
+            tracker.sample()
+            await asyncio.sleep(0.005)
+
+    sampling = asyncio.create_task(sampler())
+    await asyncio.gather(*(one(n) for n in range(args.calls)))
+    elapsed = time.perf_counter() - started
+    sampling.cancel()
+
+    await client.stop()
+    server.should_exit = True
+    await serving
+
+    calls = list(client.recent)
+    report = {
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "calls_per_s": round(args.calls / elapsed, 1),
+        "tokens": dict(client.tokens),
+        "tiers": {},
+    }
+    for tier in TIERS:
+        tier_calls = [call for call in calls if call.tier == tier]
+        ok = [call for call in tier_calls if call.outcome == "ok"]
+        report["tiers"][tier] = {
+            "limit": client.concurrency.get(tier),
+            "peak_in_flight": tracker.peak[tier],
+            "outcomes": dict(Counter(call.outcome for call in tier_calls)),
+            "retried": sum(call.attempts > 1 for call in tier_calls),
+            "p50_ms": round(statistics.median(call.latency_ms for call in ok), 1) if ok else None,
+            "p95_ms": round(percentile([call.latency_ms for call in ok], 95), 1) if ok else None,
+            "queued_p50_ms": round(statistics.median(call.queued_ms for call in tier_calls), 1) if tier_calls else None,
+            "queued_p95_ms": round(percentile([call.queued_ms for call in tier_calls], 95), 1) if tier_calls else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=100, help="Callers in flight at once")
+    parser.add_argument("--tier-limits", default="premium=4,pro=8,team=16,default=4")
+    parser.add_argument("--queue-timeout", type=float, default=30.0)
+    parser.add_argument("--base-latency-ms", type=float, default=100.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.5)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--fail-every", type=int, default=25)
+    parser.add_argument("--prompt-repeat", type=int, default=20)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: per-request cost of MetricsMiddleware and the SQL statement listeners.
+
+Calls ASGI apps directly (no HTTP client or server in the way) with and
+without the middleware and reports the difference per request:
+
+- bare:    a minimal ASGI app that only sends a response
+- fastapi: a FastAPI app with one JSON endpoint
+
+and the difference per statement of running ``SELECT 1`` inside a request
+with and without ``instrument_engine``. The listeners are the same for sync
+and async engines; an in-memory sync engine keeps thread hand-offs out of the
+measurement. The two variants run alternately and each timing is the best of
+``--repeats`` runs, so drift on a busy machine affects both alike.
+
+Usage (from backend/):
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from services.metrics import MetricsMiddleware, RequestMetrics, _RequestStats, _current_request, instrument_engine
+
+
+class _Route:
+    path = "/items/{item_id}"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def fastapi_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    return app
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+def _scope() -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/items/42", "raw_path": b"/items/42", "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+
+
+async def request_seconds(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(_scope(), _receive, _send)
+    return time.perf_counter() - started
+
+
+def statement_seconds(conn, statements: int) -> float:
+    started = time.perf_counter()
+    for _ in range(statements):
+        conn.execute(text("SELECT 1"))
+    return time.perf_counter() - started
+
+
+def compare(without: list, with_: list, n: int) -> dict:
+    without_us, with_us = min(without) / n * 1e6, min(with_) / n * 1e6
+    return {
+        "without_us": round(without_us, 2),
+        "with_us": round(with_us, 2),
+        "overhead_us": round(with_us - without_us, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--statements", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    report = {}
+    app = fastapi_app()
+    for name, inner in (("bare", bare_app), ("fastapi", app)):
+        wrapped = MetricsMiddleware(inner, RequestMetrics())
+        without, with_ = [], []
+        for _ in range(args.repeats):
+            without.append(await request_seconds(inner, args.requests))
+            with_.append(await request_seconds(wrapped, args.requests))
+        report[f"{name}_request"] = compare(without, with_, args.requests)
+
+    plain, instrumented = create_engine("sqlite://"), create_engine("sqlite://")
+    instrument_engine(instrumented)
+    without, with_ = [], []
+    token = _current_request.set(_RequestStats())
+    try:
+        with plain.connect() as plain_conn, instrumented.connect() as instrumented_conn:
+            for _ in range(args.repeats):
+                without.append(statement_seconds(plain_conn, args.statements))
+                with_.append(statement_seconds(instrumented_conn, args.statements))
+    finally:
+        _current_request.reset(token)
+    report["sql_statement"] = compare(without, with_, args.statements)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
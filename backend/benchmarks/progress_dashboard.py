@@ -0,0 +1,156 @@
+"""
+Benchmark: GET /progress/{user_id}/courses for users with 1, 10 and 500 enrollments.
+
+Compares a per-enrollment implementation (course lookup, chapter count,
+completions and quiz scores per progress row) against ``routers/progress.py``
+(one progress/course query, one query each for completions and scores,
+chapter positions from the course-structure cache), on a throwaway SQLite
+database. The first call warms the cache.
+
+Usage (from backend/):
+    python -m benchmarks.progress_dashboard --enrollments 1 10 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import event, func, select
+
+from config.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from models import (
+    Chapter as ChapterModel,
+    ChapterCompletion as ChapterCompletionModel,
+    Course as CourseModel,
+    QuizBestScore as QuizBestScoreModel,
+    UserProgress as UserProgressModel,
+)
+from routers.progress import get_user_courses_progress
+
+CHAPTERS_PER_COURSE = 20
+
+
+async def per_row_courses_progress(user_id: str, db):
+    """Per-enrollment lookups: four extra queries per progress row"""
+    user_progress_list = (await db.execute(
+        select(UserProgressModel).where(UserProgressModel.user_id == user_id).order_by(UserProgressModel.id)
+    )).scalars().all()
+    progress_summary = []
+    for progress in user_progress_list:
+        course = await db.get(CourseModel, progress.course_id)
+        total_chapters = (await db.execute(
+            select(func.count()).select_from(ChapterModel).where(ChapterModel.course_id == progress.course_id)
+        )).scalar_one()
+        completed_count = (await db.execute(
+            select(func.count()).select_from(ChapterCompletionModel).where(
+                ChapterCompletionModel.user_id == user_id,
+                ChapterCompletionModel.course_id == progress.course_id
+            )
+        )).scalar_one()
+        quiz_scores = {
+            row.quiz_id: {
+                "score": row.last_score,
+                "passed": row.last_passed,
+                "date": row.last_attempt_at.isoformat() if row.last_attempt_at else None,
+                "best_score": row.best_score,
+                "attempts": row.attempts,
+            }
+            for row in (await db.execute(
+                select(QuizBestScoreModel).where(
+                    QuizBestScoreModel.user_id == user_id,
+                    QuizBestScoreModel.course_id == progress.course_id
+                ).order_by(QuizBestScoreModel.id)
+            )).scalars()
+        }
+        progress_summary.append({
+            "course_id": progress.course_id,
+            "course_title": course.title if course else "Unknown Course",
+            "completed_chapters": completed_count,
+            "total_chapters": total_chapters,
+            "completion_percentage": (completed_count / total_chapters) * 100 if total_chapters > 0 else 0,
+            "quiz_scores": quiz_scores,
+            "streak_days": progress.streak_days,
+            "last_accessed": progress.last_accessed,
+        })
+    return progress_summary
+
+
+def seed(enrollment_counts):
+    Base.metadata.create_all(bind=engine)
+    n_courses = max(enrollment_counts)
+    db = SessionLocal()
+    db.bulk_insert_mappings(CourseModel, [
+        {"id": f"course-{c}", "title": f"Course {c}", "description": "", "prerequisites": []}
+        for c in range(n_courses)
+    ])
+    db.bulk_insert_mappings(ChapterModel, [
+        {"id": f"course-{c}-ch{n}", "course_id": f"course-{c}", "title": f"Chapter {n}", "content": "", "order": n}
+        for c in range(n_courses) for n in range(CHAPTERS_PER_COURSE)
+    ])
+    for count in enrollment_counts:
+        db.bulk_insert_mappings(UserProgressModel, [
+            {"user_id": f"user-{count}", "course_id": f"course-{c}", "streak_days": 0}
+            for c in range(count)
+        ])
+        db.bulk_insert_mappings(ChapterCompletionModel, [
+            {"user_id": f"user-{count}", "course_id": f"course-{c}", "chapter_id": f"course-{c}-ch{n}"}
+            for c in range(count) for n in range(c % CHAPTERS_PER_COURSE)
+        ])
+    db.commit()
+    db.close()
+
+
+async def measure(fn, user_id: str, iterations: int):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    latencies = []
+    try:
+        for _ in range(iterations):
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                result = await fn(user_id, db)
+                latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+    return result, {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "max_ms": round(max(latencies), 3),
+        "statements": len(statements) // iterations,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--enrollments", type=int, nargs="+", default=[1, 10, 500])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.enrollments)
+    report = {}
+    for count in args.enrollments:
+        user_id = f"user-{count}"
+        before, before_stats = await measure(per_row_courses_progress, user_id, args.iterations)
+        after, after_stats = await measure(get_user_courses_progress, user_id, args.iterations)
+        assert before == after, "dashboard payload differs from the per-row implementation"
+        report[f"{count} enrollments"] = {"before": before_stats, "after": after_stats}
+    await async_engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark: grading quiz submissions one request at a time vs. POST /quizzes/submit/batch.
+
+Seeds a handful of quizzes on a throwaway SQLite database, then times the
+batch handler on N submissions spread over many users (grading, attempt
+inserts and progress upserts in one transaction) against the per-submission
+handler on a smaller sample.
+
+Usage (from backend/):
+    python -m benchmarks.quiz_batch --submissions 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from config.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from models import Course as CourseModel, Quiz as QuizModel
+from routers.quizzes import submit_quiz, submit_quiz_batch
+from schemas import QuizBatchSubmission, QuizSubmission
+
+QUESTIONS_PER_QUIZ = 10
+OPTIONS = ["a", "b", "c", "d"]
+
+
+def seed(n_quizzes: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(CourseModel(id="course-bench", title="Bench", description="", prerequisites=[]))
+    for q in range(n_quizzes):
+        db.add(QuizModel(
+            id=f"quiz-{q}",
+            course_id="course-bench",
+            title=f"Quiz {q}",
+            questions=[
+                {"id": f"q{n}", "question": f"Question {n}", "options": OPTIONS, "correct_answer": OPTIONS[n % 4]}
+                for n in range(QUESTIONS_PER_QUIZ)
+            ],
+            passing_score=0.7,
+        ))
+    db.commit()
+    db.close()
+
+
+def make_submissions(count: int, n_quizzes: int, n_users: int, rng: random.Random):
+    return [
+        QuizSubmission(
+            user_id=f"user-{rng.randrange(n_users)}",
+            quiz_id=f"quiz-{rng.randrange(n_quizzes)}",
+            answers={f"q{n}": rng.choice(OPTIONS) for n in range(QUESTIONS_PER_QUIZ)},
+        )
+        for _ in range(count)
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--single-submissions", type=int, default=500)
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed(args.quizzes)
+
+    singles = make_submissions(args.single_submissions, args.quizzes, args.users, rng)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for submission in singles:
+            await submit_quiz(submission, db)
+    single_s = time.perf_counter() - started
+
+    batch = QuizBatchSubmission(submissions=make_submissions(args.submissions, args.quizzes, args.users, rng))
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        result = await submit_quiz_batch(batch, db)
+    batch_s = time.perf_counter() - started
+    assert len(result.results) == args.submissions
+    await async_engine.dispose()
+
+    print(json.dumps({
+        "single": {
+            "submissions": args.single_submissions,
+            "total_s": round(single_s, 3),
+            "per_submission_ms": round(single_s * 1000 / args.single_submissions, 3),
+        },
+        "batch": {
+            "submissions": args.submissions,
+            "total_s": round(batch_s, 3),
+            "per_submission_ms": round(batch_s * 1000 / args.submissions, 4),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
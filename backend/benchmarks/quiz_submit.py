@@ -0,0 +1,96 @@
+"""
+Benchmark: POST /quizzes/submit throughput in each write mode.
+
+Runs concurrent clients against the submit handler on a throwaway SQLite
+database in two modes:
+
+- transaction:  one transaction per submission with score/progress upserts
+- write-behind: attempts queued and flushed in batches (QUIZ_WRITE_BEHIND),
+                including the final flush, as on shutdown
+
+SQLite runs one writer at a time, so extra clients mostly add lock waits.
+
+Usage (from backend/):
+    python -m benchmarks.quiz_submit --clients 4 --submissions 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+from sqlalchemy import func, select
+
+from benchmarks.quiz_batch import make_submissions, seed
+from config.database import AsyncSessionLocal, async_engine
+from models import QuizAttempt as QuizAttemptModel
+from routers.quizzes import submit_quiz
+from services.quiz_submissions import quiz_writer
+
+
+async def run(handler, submissions, clients: int):
+    queue = list(reversed(submissions))
+    latencies = []
+
+    async def client():
+        while queue:
+            submission = queue.pop()
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                await handler(submission, db)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    await quiz_writer.flush()
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "submissions_per_s": round(len(submissions) / elapsed, 1),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+    }
+
+
+async def count_attempts() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(QuizAttemptModel))).scalar_one()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    seed(args.quizzes)
+
+    report = {}
+    expected = 0
+    for mode in ("transaction", "write-behind"):
+        submissions = make_submissions(args.submissions, args.quizzes, args.users, rng)
+        quiz_writer.enabled = mode == "write-behind"
+        report[mode] = await run(submit_quiz, submissions, args.clients)
+        expected += args.submissions
+        assert await count_attempts() == expected, f"{mode}: attempts missing after flush"
+    await async_engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark: build time and query latency of the BM25 search index.
+
+Indexes a synthetic catalog whose vocabulary follows a Zipf distribution
+(so a few terms appear in most chapters and most terms are rare), then times
+queries sampled from the same distribution, including partial last words.
+
+Usage (from backend/):
+    python -m benchmarks.search_index --chapters 100000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.search_index import SearchIndex
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    words = sorted(words)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(size)))
+    return words, cum_weights
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chapters", type=int, default=100000)
+    parser.add_argument("--words-per-chapter", type=int, default=150)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words, cum_weights = make_vocabulary(args.vocabulary, rng)
+
+    index = SearchIndex(path=os.devnull)
+    started = time.perf_counter()
+    for n in range(args.chapters):
+        title = " ".join(rng.choices(words, cum_weights=cum_weights, k=4))
+        body = " ".join(rng.choices(words, cum_weights=cum_weights, k=args.words_per_chapter))
+        index.index_chapter(f"ch-{n}", title, body)
+    build_s = time.perf_counter() - started
+
+    # Sample query terms from the mid/long tail: the head of a Zipf vocabulary
+    # behaves like stopwords and matches nearly every chapter
+    tail = words[100:]
+    queries = []
+    for _ in range(args.queries):
+        terms = rng.sample(tail, rng.randint(1, 3))
+        if rng.random() < 0.3:
+            terms[-1] = terms[-1][: max(3, len(terms[-1]) - 2)]
+        queries.append(" ".join(terms))
+
+    def run_queries():
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search_chapters(query, limit=10)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    # Cold: first sighting of each term builds its impact list.
+    # Warm: the same queries again, as popular searches would be
+    report = {"chapters": args.chapters, "terms": len(index.chapters._postings), "build_s": round(build_s, 2)}
+    for phase in ("cold", "warm"):
+        latencies = run_queries()
+        report[f"{phase}_p50_ms"] = round(statistics.median(latencies), 3)
+        report[f"{phase}_p95_ms"] = round(percentile(latencies, 95), 3)
+        report[f"{phase}_p99_ms"] = round(percentile(latencies, 99), 3)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
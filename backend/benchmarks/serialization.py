@@ -0,0 +1,144 @@
+"""
+Benchmark: JSON serialization of list responses, per schema.
+
+For each of ``Course``, ``Chapter``, ``UserProgress`` and ``QuizAttempt``,
+loads ``--rows`` synthetic rows from an in-memory SQLite database and renders
+them as a JSON list two ways:
+
+- ``orm``: ORM objects -> ``Schema.model_validate`` -> ``jsonable_encoder``
+  -> ``json.dumps`` (what a ``response_model`` route with ``JSONResponse``
+  did before),
+- ``rows``: a select of the schema's columns -> dicts -> orjson
+  (``utils.serialization``, what the list endpoints do now).
+
+Both outputs are checked to decode to the same JSON. Reports the median
+milliseconds over ``--repeat`` runs and the speedup, as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --rows 5000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from config.database import Base
+from utils.serialization import dumps, row_dicts
+
+SCHEMAS = (
+    ("Course", models.Course, schemas.Course),
+    ("Chapter", models.Chapter, schemas.Chapter),
+    ("UserProgress", models.UserProgress, schemas.UserProgress),
+    ("QuizAttempt", models.QuizAttempt, schemas.QuizAttempt),
+)
+
+
+def make_rows(rows: int, rng: random.Random) -> list:
+    started = datetime(2026, 1, 1)
+    words = ["python", "typing", "async", "generators", "closures", "testing", "packaging", "profiling"]
+
+    def text(n):
+        return " ".join(rng.choices(words, k=n))
+
+    objects = []
+    for n in range(rows):
+        objects.append(models.Course(
+            id=f"course-{n}", title=text(4), description=text(40),
+            prerequisites=[f"course-{rng.randrange(rows)}" for _ in range(rng.randint(0, 3))],
+            created_at=started + timedelta(minutes=n),
+        ))
+        objects.append(models.Chapter(
+            id=f"ch-{n}", course_id=f"course-{n % 50}", title=text(4), content=f"# {text(3)}\n\n{text(300)}",
+            next_chapter_id=f"ch-{n + 1}", prev_chapter_id=f"ch-{n - 1}" if n else None, order=n,
+            created_at=started + timedelta(minutes=n),
+        ))
+        objects.append(models.UserProgress(
+            user_id=f"user-{n}", course_id=f"course-{n % 50}", streak_days=rng.randint(0, 30),
+            last_accessed=started + timedelta(seconds=rng.randrange(10 ** 7), microseconds=rng.randrange(10 ** 6)),
+        ))
+        objects.append(models.QuizAttempt(
+            user_id=f"user-{n % 100}", quiz_id=f"quiz-{n % 20}",
+            answers={f"q{i}": rng.choice("abcd") for i in range(10)},
+            score=rng.random(), passed=rng.random() < 0.7,
+            completed_at=started + timedelta(seconds=rng.randrange(10 ** 7), microseconds=rng.randrange(10 ** 6)),
+        ))
+    return objects
+
+
+def render_orm(engine, model, schema) -> bytes:
+    with Session(engine) as session:
+        objects = session.execute(select(model)).scalars().all()
+        content = jsonable_encoder([schema.model_validate(obj) for obj in objects])
+    # Same settings as starlette's JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def render_rows(engine, model, schema) -> bytes:
+    columns = [getattr(model, name) for name in schema.model_fields if hasattr(model, name)]
+    # Fields that are not columns (UserProgress' completions and scores) are
+    # filled in by the endpoint; use the schema defaults here
+    extra = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in schema.model_fields.items() if not hasattr(model, name)
+    }
+    with engine.connect() as conn:
+        rows = row_dicts(conn.execute(select(*columns)))
+    if extra:
+        rows = [{**row, **extra} for row in rows]
+    return dumps(rows)
+
+
+def time_ms(render, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(make_rows(args.rows, random.Random(args.seed)))
+        session.commit()
+
+    report = {"rows": args.rows, "repeat": args.repeat, "schemas": {}}
+    for name, model, schema in SCHEMAS:
+        orm_body = render_orm(engine, model, schema)
+        rows_body = render_rows(engine, model, schema)
+        if json.loads(orm_body) != json.loads(rows_body):
+            raise SystemExit(f"{name}: the two paths render different JSON")
+        orm_ms = time_ms(lambda: render_orm(engine, model, schema), args.repeat)
+        rows_ms = time_ms(lambda: render_rows(engine, model, schema), args.repeat)
+        report["schemas"][name] = {
+            "bytes": len(rows_body),
+            "orm_ms": round(orm_ms, 2),
+            "rows_ms": round(rows_ms, 2),
+            "speedup": round(orm_ms / rows_ms, 2),
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
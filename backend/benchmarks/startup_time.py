@@ -0,0 +1,130 @@
+"""
+Benchmark: time to import the application, checked against a budget.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters (the
+same work each uvicorn worker does before it can serve) and reports, as
+JSON, the median and best cumulative import time of ``main``, the slowest
+first-party modules and third-party packages, and any module that should
+only be imported on demand (``LAZY_MODULES``) but was imported at startup.
+
+Exits with status 1 when the median exceeds the budget in
+``baselines/startup_time.json`` or a lazy module is imported eagerly.
+Import times depend on the machine; record the budget where the check runs
+with ``--save-baseline`` (median plus ``--headroom``), or pass ``--budget-ms``.
+
+Usage (from backend/):
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --save-baseline
+"""
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "startup_time.json")
+
+FIRST_PARTY = ("main", "config", "models", "schemas", "routers", "services", "utils")
+# Only needed by management commands, rarely used endpoints or the HTTP LLM backend
+LAZY_MODULES = ("alembic", "tarfile", "httpx", "services.course_ingest", "manage")
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(stderr: str) -> dict:
+    """Module name -> (self µs, cumulative µs) from ``-X importtime`` output"""
+    times = {}
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def run_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr[-2000:]}")
+    return import_times(result.stderr)
+
+
+def slowest(runs: list, first_party: bool, top: int) -> dict:
+    """Median cumulative ms per module (first party) or top-level package (third party)"""
+    samples = defaultdict(list)
+    for times in runs:
+        per_run = defaultdict(int)
+        for name, (self_us, cumulative_us) in times.items():
+            package = name.split(".")[0]
+            if (package in FIRST_PARTY) != first_party:
+                continue
+            if first_party:
+                per_run[name] = cumulative_us
+            else:
+                # Sum self times so nested imports of the same package are not double counted
+                per_run[package] += self_us
+        for name, us in per_run.items():
+            samples[name].append(us)
+    medians = {name: statistics.median(values) / 1000 for name, values in samples.items()}
+    return {name: round(ms, 1) for name, ms in sorted(medians.items(), key=lambda item: -item[1])[:top]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, help="Override the stored budget")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--headroom", type=float, default=0.25,
+                        help="Budget saved with --save-baseline, as a fraction over the median")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    totals = [times["main"][1] / 1000 for times in runs]
+    eager = sorted({
+        lazy for times in runs for name in times for lazy in LAZY_MODULES
+        if name == lazy or name.startswith(f"{lazy}.")
+    })
+    report = {
+        "runs": args.runs,
+        "import_ms": round(statistics.median(totals), 1),
+        "best_ms": round(min(totals), 1),
+        "first_party_ms": slowest(runs, True, args.top),
+        "third_party_ms": slowest(runs, False, args.top),
+        "eager_lazy_modules": eager,
+    }
+
+    budget_ms = args.budget_ms
+    if args.save_baseline:
+        budget_ms = math.ceil(report["import_ms"] * (1 + args.headroom))
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"budget_ms": budget_ms, "measured": report}, f, indent=2)
+            f.write("\n")
+    elif budget_ms is None and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            budget_ms = json.load(f)["budget_ms"]
+    report["budget_ms"] = budget_ms
+
+    failures = []
+    if budget_ms is not None and report["import_ms"] > budget_ms:
+        failures.append(f"import took {report['import_ms']}ms, budget {budget_ms}ms")
+    if eager:
+        failures.append(f"imported at startup but meant to be lazy: {', '.join(eager)}")
+    report["failures"] = failures
+
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
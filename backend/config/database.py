@@ -1,31 +1,157 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import time
 from dotenv import load_dotenv
 
+from config.pool import apply_sqlite_pragmas, instrument_pool, pool_options, timed_checkout
+
 # Load environment variables
 load_dotenv()
 
 # Database URL - using SQLite for simplicity, can be changed to PostgreSQL in production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./course_companion.db")
 
-# Create engine
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgres:"):
+        return url.replace("postgres:", "postgresql+asyncpg:", 1)
+    return url
+
+
+# Async URL used by the request path; override to point at a different driver
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Optional read replica for GET routes (see get_read_db); unset reads go to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL", to_async_url(DATABASE_READ_URL))
+# How long a user's reads stay on the primary after they write; cover the replica lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Create engine (sync - schema management, seeding and scripts)
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    **pool_options(DATABASE_URL)
 )
 
-# Create session maker
+# Create async engine (used by all route handlers)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, is_async=True))
+
+apply_sqlite_pragmas(engine)
+apply_sqlite_pragmas(async_engine.sync_engine)
+instrument_pool(engine)
+instrument_pool(async_engine.sync_engine)
+
+# Read-only engine for GET routes; the primary doubles as it without a replica
+if ASYNC_DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        ASYNC_DATABASE_READ_URL, **pool_options(ASYNC_DATABASE_READ_URL, is_async=True)
+    )
+    apply_sqlite_pragmas(read_engine.sync_engine, query_only=True)
+    instrument_pool(read_engine.sync_engine)
+else:
+    read_engine = async_engine
+
+# Create session makers
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False so handlers can keep reading attributes after commit
+# without triggering a lazy load outside the async context
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
+async def checkout(db: AsyncSession):
+    """Give ``db`` its connection now, so pool waits and timeouts are counted;
+    a pool timeout is a 503"""
+    try:
+        await timed_checkout(db)
+    except exc.TimeoutError:
+        raise HTTPException(status_code=503, detail="Database busy, try again")
+
+
 # Dependency to get DB session
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        await checkout(db)
+        yield db
+
+
+class ReadYourWrites:
+    """Users who wrote recently, whose reads stay on the primary until the
+    replica has caught up. Tracked per process, like the other in-memory caches."""
+
+    PRUNE_AT = 10000
+
+    def __init__(self, window_seconds: float = READ_YOUR_WRITES_SECONDS):
+        self.window_seconds = window_seconds
+        self._until = {}
+
+    def mark(self, *user_ids: str):
+        now = time.monotonic()
+        if len(self._until) >= self.PRUNE_AT:
+            self._until = {user: until for user, until in self._until.items() if until > now}
+        for user_id in user_ids:
+            self._until[user_id] = now + self.window_seconds
+
+    def clear(self):
+        self._until.clear()
+
+    def is_sticky(self, user_id) -> bool:
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[user_id]
+            return False
+        return True
+
+
+read_your_writes = ReadYourWrites()
+
+
+# Dependency for GET routes: a session on the read replica, or on the primary
+# for a user (``user_id`` path or query parameter) who wrote recently
+async def get_read_db(request: Request):
+    user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+    sticky = read_engine is not async_engine and user_id is not None and read_your_writes.is_sticky(user_id)
+    async with (AsyncSessionLocal if sticky else ReadSessionLocal)() as db:
+        await checkout(db)
+        yield db
+
+
+@asynccontextmanager
+async def primary_session(db: AsyncSession):
+    """``db`` itself if it is on the primary, otherwise a short-lived primary session.
+
+    Caches load their misses through this: a miss right after a write would
+    otherwise repopulate the cache from a replica that has not seen the write.
+    """
+    if db.bind is async_engine:
+        yield db
+    else:
+        async with AsyncSessionLocal() as primary:
+            await checkout(primary)
+            yield primary
+
+
+# Sync session for scripts and one-off jobs outside the request path
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
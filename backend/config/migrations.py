@@ -0,0 +1,35 @@
+import os
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from config.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Revision matching the schema that Base.metadata.create_all used to build
+INITIAL_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    # Leave the application's logging setup alone
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations(revision: str = "head"):
+    """Upgrade the database schema, adopting databases built by create_all"""
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "courses" in tables:
+            logger.info(f"Stamping existing unversioned database at revision {INITIAL_REVISION}")
+            command.stamp(config, INITIAL_REVISION)
+        command.upgrade(config, revision)
@@ -0,0 +1,175 @@
+"""
+Connection pool settings, SQLite pragmas and pool instrumentation.
+
+Pool sizing comes from the environment and applies per engine, per process:
+with N uvicorn workers the database sees up to
+N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections from the async engine.
+``/api/v1/internal/pool`` reports what each pool is doing (checked-out
+connections and their peak, checkouts that had to wait and for how long,
+timeouts) so the numbers can be sized against real traffic. Checkouts and
+new connections are counted from the pool's public ``checkout`` /
+``connect`` events. Request sessions check their connection out up front
+through ``timed_checkout``, which times the waits and counts timeouts. The
+pools themselves are stock SQLAlchemy ones and log under
+``sqlalchemy.pool``.
+"""
+import os
+import time
+import weakref
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite: WAL lets readers run alongside the single writer; synchronous=NORMAL
+# is durable in WAL mode except for the last commits on power loss; writers
+# wait up to busy_timeout for the lock instead of failing immediately
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "yes")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class PoolStats:
+    """Counters fed by the pool's checkout and connect events, and by
+    ``timed_checkout`` for the waits and timeouts of request sessions"""
+    __slots__ = (
+        "capacity", "checkouts", "connects", "peak_checked_out", "waits", "wait_seconds", "max_wait_seconds",
+        "timeouts",
+    )
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.checkouts = 0
+        self.connects = 0
+        self.peak_checked_out = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record_checkout(self, checked_out: int):
+        self.checkouts += 1
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "peak_checked_out": self.peak_checked_out,
+            "waits": self.waits,
+            "wait_ms_total": round(self.wait_seconds * 1000, 3),
+            "wait_ms_max": round(self.max_wait_seconds * 1000, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+_pool_stats: "weakref.WeakKeyDictionary[Engine, PoolStats]" = weakref.WeakKeyDictionary()
+
+
+def instrument_pool(sync_engine, max_overflow: int = DB_MAX_OVERFLOW):
+    """Count checkouts and new connections of ``sync_engine``'s pool (pass
+    ``async_engine.sync_engine`` for async engines). The listeners carry over
+    to the fresh pool ``engine.dispose()`` creates."""
+    pool = sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    stats = _pool_stats[sync_engine] = PoolStats(pool.size() + max_overflow)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_checkout(sync_engine.pool.checkedout())
+
+    @event.listens_for(sync_engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+
+async def timed_checkout(db: AsyncSession):
+    """Check out ``db``'s connection now. A checkout that finds every connection
+    in use counts as a wait, timed until it gets one; a pool timeout is counted
+    and re-raised."""
+    sync_engine = db.bind.sync_engine
+    stats = _pool_stats.get(sync_engine)
+    if stats is None:
+        await db.connection()
+        return
+    full = sync_engine.pool.checkedout() >= stats.capacity
+    started = time.perf_counter()
+    try:
+        await db.connection()
+    except exc.TimeoutError:
+        stats.timeouts += 1
+        raise
+    finally:
+        if full:
+            stats.record_wait(time.perf_counter() - started)
+
+
+def _is_sqlite_memory(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def pool_options(url, is_async: bool = False) -> dict:
+    """Engine keyword arguments for the configured pool; in-memory SQLite keeps
+    SQLAlchemy's default single-connection pool"""
+    if _is_sqlite_memory(url):
+        return {}
+    return {
+        "poolclass": AsyncAdaptedQueuePool if is_async else QueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(sync_engine, query_only: bool = False):
+    """Set the SQLite pragma profile on every new connection of ``sync_engine``
+    (pass ``async_engine.sync_engine`` for async engines); ``query_only``
+    rejects writes, for read-replica engines"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def pool_status(engine) -> dict:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    stats = _pool_stats.get(sync_engine)
+    if stats is None:
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": stats.capacity,
+        "timeout_s": pool.timeout(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **stats.as_dict(),
+    }
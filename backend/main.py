@@ -1,50 +1,37 @@
-from fastapi import FastAPI, Depends, HTTPException
+"""
+Application entry point.
+
+``create_app()`` builds the API without touching the database. Schema
+migrations and seed data are one-shot commands (``python manage.py setup``)
+run before the workers start; the lifespan only loads the search index and
+starts the background writers.
+
+Run with ``uvicorn main:app`` (or ``uvicorn --factory main:create_app``).
+Keep startup imports within budget: ``python -m benchmarks.startup_time``.
+"""
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-import os
+from fastapi.responses import ORJSONResponse
 import logging
-from sqlalchemy.orm import Session
 
-from config.database import engine, get_db, Base
-from routers import courses, progress, quizzes, search, hybrid
-import models
+from config.database import engine, async_engine, read_engine, AsyncSessionLocal
+from config.pool import pool_status
+from routers import courses, progress, quizzes, search, hybrid, exports
+from services.entitlements import Entitlement, entitlements, get_entitlement
+from services.llm import llm_client
+from services.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, request_metrics
+from services.search_index import search_index
+from services.quiz_grading import quiz_keys
+from services.quiz_submissions import quiz_writer
+from services.usage_metering import usage_meter
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Course Companion FTE API",
-    description="Digital Full-Time Equivalent Educational Tutor API",
-    version="1.0.0"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers with API versioning
-app.include_router(courses.router, prefix="/api/v1/courses", tags=["courses"])
-app.include_router(progress.router, prefix="/api/v1/progress", tags=["progress"])
-app.include_router(quizzes.router, prefix="/api/v1/quizzes", tags=["quizzes"])
-app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
-app.include_router(hybrid.router, prefix="/api/v1/hybrid", tags=["hybrid"])
-
-# Legacy routes for current frontend compatibility (unversioned)
-app.include_router(courses.router, prefix="/courses", tags=["legacy"])
-app.include_router(progress.router, prefix="/progress", tags=["legacy"])
-app.include_router(quizzes.router, prefix="/quizzes", tags=["legacy"])
-app.include_router(search.router, prefix="/search", tags=["legacy"])
-app.include_router(hybrid.router, prefix="/hybrid", tags=["legacy"])
-
-@app.get("/")
+router = APIRouter()
+
+
+@router.get("/")
 async def root():
     return {
         "message": "Course Companion FTE API",
@@ -53,23 +40,18 @@ async def root():
         "docs": "/docs"
     }
 
-@app.get("/api/v1/access/check")
-async def check_access(user_id: str, db: Session = Depends(get_db)):
+@router.get("/api/v1/access/check")
+async def check_access(user_id: str, entitlement: Entitlement = Depends(get_entitlement)):
     """
     Feature 6: Freemium Gate / Access Control
-    Checks if a user has active premium access.
+    Checks if a user has active premium access (cached, see services/entitlements.py).
     """
-    subscription = db.query(models.Subscription).filter(
-        models.Subscription.user_id == user_id,
-        models.Subscription.is_active == True
-    ).first()
-    
-    if subscription:
+    if entitlement.has_premium:
         return {
             "user_id": user_id,
             "has_premium": True,
-            "plan_type": subscription.plan_type,
-            "expires_at": subscription.end_date
+            "plan_type": entitlement.plan_type,
+            "expires_at": entitlement.expires_at
         }
     
     return {
@@ -79,7 +61,7 @@ async def check_access(user_id: str, db: Session = Depends(get_db)):
         "message": "Upgrade to Premium for advanced features like AI mentoring and adaptive learning paths."
     }
 
-@app.get("/api/v1/pricing")
+@router.get("/api/v1/pricing")
 async def get_pricing():
     """Information for the Freemium Gate presentation"""
     return {
@@ -91,89 +73,117 @@ async def get_pricing():
         ]
     }
 
-# Seed sample data on startup if empty
-@app.on_event("startup")
-async def startup_event():
-    db = next(get_db())
+@router.get("/api/v1/internal/pool")
+async def get_pool_stats():
+    """Connection pool usage: checked-out connections, waits and timeouts per engine"""
+    stats = {"async": pool_status(async_engine), "sync": pool_status(engine)}
+    if read_engine is not async_engine:
+        stats["read"] = pool_status(read_engine)
+    return stats
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request and LLM call metrics in Prometheus text format"""
+    return Response(
+        request_metrics.render() + llm_client.metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@router.get("/api/v1/internal/quiz-cache")
+async def get_quiz_cache_stats():
+    """Hit/miss counters of the compiled quiz answer-key cache"""
+    return quiz_keys.stats()
+
+@router.get("/api/v1/internal/entitlement-cache")
+async def get_entitlement_cache_stats():
+    """Hit/miss counters of the entitlement cache behind the freemium gate"""
+    return entitlements.stats()
+
+@router.get("/api/v1/internal/llm")
+async def get_llm_stats(recent: int = Query(50, ge=0, le=1000)):
+    """LLM client concurrency per tier, call outcomes, token totals and the most recent calls"""
+    return {**llm_client.stats(), "recent_calls": llm_client.recent_calls(recent)}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the persisted search index, rebuilding it if it is out of date
     try:
-        # Check if we already have courses
-        if db.query(models.Course).count() == 0:
-            logger.info("Seeding initial course data...")
-            
-            # Create a sample course
-            course_id = "course-python-intro"
-            course = models.Course(
-                id=course_id,
-                title="Introduction to Modern Python",
-                description="Learn modern Python with typing and best practices",
-                prerequisites=[]
-            )
-            db.add(course)
-            
-            # Create chapters
-            chapters = [
-                models.Chapter(
-                    id="ch1-intro",
-                    course_id=course_id,
-                    title="Getting Started with Python",
-                    content="# Getting Started\n\nPython is a versatile programming language...",
-                    next_chapter_id="ch2-basics",
-                    prev_chapter_id=None,
-                    order=1
-                ),
-                models.Chapter(
-                    id="ch2-basics",
-                    course_id=course_id,
-                    title="Python Basics",
-                    content="# Python Basics\n\nVariables, data types, and operators...",
-                    next_chapter_id="ch3-functions",
-                    prev_chapter_id="ch1-intro",
-                    order=2
-                ),
-                models.Chapter(
-                    id="ch3-functions",
-                    course_id=course_id,
-                    title="Functions and Typing",
-                    content="# Functions and Type Hints\n\nModern Python uses type hints...",
-                    next_chapter_id=None,
-                    prev_chapter_id="ch2-basics",
-                    order=3
-                )
-            ]
-            for chapter in chapters:
-                db.add(chapter)
-            
-            # Create a sample quiz
-            quiz = models.Quiz(
-                id="quiz-python-basics",
-                course_id=course_id,
-                chapter_id="ch2-basics",
-                title="Python Basics Quiz",
-                questions=[
-                    {
-                        "id": "q1",
-                        "question": "What is the correct way to declare a variable in Python?",
-                        "options": ["int x = 5", "var x = 5", "x = 5", "declare x = 5"],
-                        "correct_answer": "x = 5"
-                    },
-                    {
-                        "id": "q2",
-                        "question": "Which of these is a valid Python function declaration?",
-                        "options": ["function my_func():", "def my_func():", "func my_func():", "void my_func():"],
-                        "correct_answer": "def my_func():"
-                    }
-                ],
-                passing_score=0.7
-            )
-            db.add(quiz)
-            
-            db.commit()
-            logger.info("Successfully seeded course data.")
+        async with AsyncSessionLocal() as db:
+            await search_index.load_or_build(db)
     except Exception as e:
-        logger.error(f"Error seeding data: {str(e)}")
-        db.rollback()
+        logger.error(f"Error loading search index (has `python manage.py setup` been run?): {str(e)}")
+        raise
+
+    usage_meter.start()
+    quiz_writer.start()
+    try:
+        yield
     finally:
-        db.close()
+        # Each step runs even if an earlier one fails, so one failed flush
+        # does not lose the other buffers
+        for description, stop in (
+            ("flushing quiz attempts", quiz_writer.stop),
+            ("flushing usage counters", usage_meter.stop),
+            ("closing the LLM client", llm_client.stop),
+        ):
+            try:
+                await stop()
+            except Exception as e:
+                logger.error(f"Error {description} on shutdown: {str(e)}")
+        try:
+            search_index.save()
+        except Exception as e:
+            logger.error(f"Error saving the search index on shutdown: {str(e)}")
+
+
+def create_app() -> FastAPI:
+    # Configure logging; a no-op if the server has already configured the root logger
+    logging.basicConfig(level=logging.INFO)
+
+    app = FastAPI(
+        title="Course Companion FTE API",
+        description="Digital Full-Time Equivalent Educational Tutor API",
+        version="1.0.0",
+        lifespan=lifespan,
+        # Routes that return models or dicts are rendered by orjson
+        default_response_class=ORJSONResponse
+    )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-route latency, SQL statement count/time and response size, served at /metrics
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+        instrument_engine(async_engine)
+        instrument_engine(read_engine)
+
+    # Include routers with API versioning
+    app.include_router(courses.router, prefix="/api/v1/courses", tags=["courses"])
+    app.include_router(progress.router, prefix="/api/v1/progress", tags=["progress"])
+    app.include_router(quizzes.router, prefix="/api/v1/quizzes", tags=["quizzes"])
+    app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
+    app.include_router(hybrid.router, prefix="/api/v1/hybrid", tags=["hybrid"])
+    app.include_router(exports.router, prefix="/api/v1/exports", tags=["exports"])
+
+    # Legacy routes for current frontend compatibility (unversioned)
+    app.include_router(courses.router, prefix="/courses", tags=["legacy"])
+    app.include_router(progress.router, prefix="/progress", tags=["legacy"])
+    app.include_router(quizzes.router, prefix="/quizzes", tags=["legacy"])
+    app.include_router(search.router, prefix="/search", tags=["legacy"])
+    app.include_router(hybrid.router, prefix="/hybrid", tags=["legacy"])
+
+    app.include_router(router)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,141 @@
+"""
+One-shot management commands, run before (not inside) the API workers.
+
+The API process does not touch the schema or seed data on startup; run these
+once per deploy (e.g. as a release or init-container step):
+
+    python manage.py migrate          # upgrade the schema to the latest revision
+    python manage.py seed             # add the sample course if there are no courses
+    python manage.py setup            # migrate, seed, and build the search index
+
+``setup`` writes the search index to ``SEARCH_INDEX_PATH`` so workers only
+load it at startup instead of each rebuilding it from the database.
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+
+from config.database import AsyncSessionLocal, async_engine
+import models
+
+logger = logging.getLogger("manage")
+
+
+def migrate(revision: str = "head"):
+    from config.migrations import run_migrations
+
+    run_migrations(revision)
+    logger.info(f"Database schema upgraded to {revision}")
+
+
+async def seed() -> bool:
+    """Add the sample course, chapters and quiz to an empty database"""
+    async with AsyncSessionLocal() as db:
+        if (await db.execute(select(func.count()).select_from(models.Course))).scalar_one() > 0:
+            logger.info("Courses already present, not seeding")
+            return False
+        logger.info("Seeding initial course data...")
+
+        # Create a sample course
+        course_id = "course-python-intro"
+        db.add(models.Course(
+            id=course_id,
+            title="Introduction to Modern Python",
+            description="Learn modern Python with typing and best practices",
+            prerequisites=[]
+        ))
+
+        # Create chapters
+        db.add_all([
+            models.Chapter(
+                id="ch1-intro",
+                course_id=course_id,
+                title="Getting Started with Python",
+                content="# Getting Started\n\nPython is a versatile programming language...",
+                next_chapter_id="ch2-basics",
+                prev_chapter_id=None,
+                order=1
+            ),
+            models.Chapter(
+                id="ch2-basics",
+                course_id=course_id,
+                title="Python Basics",
+                content="# Python Basics\n\nVariables, data types, and operators...",
+                next_chapter_id="ch3-functions",
+                prev_chapter_id="ch1-intro",
+                order=2
+            ),
+            models.Chapter(
+                id="ch3-functions",
+                course_id=course_id,
+                title="Functions and Typing",
+                content="# Functions and Type Hints\n\nModern Python uses type hints...",
+                next_chapter_id=None,
+                prev_chapter_id="ch2-basics",
+                order=3
+            )
+        ])
+
+        # Create a sample quiz
+        db.add(models.Quiz(
+            id="quiz-python-basics",
+            course_id=course_id,
+            chapter_id="ch2-basics",
+            title="Python Basics Quiz",
+            questions=[
+                {
+                    "id": "q1",
+                    "question": "What is the correct way to declare a variable in Python?",
+                    "options": ["int x = 5", "var x = 5", "x = 5", "declare x = 5"],
+                    "correct_answer": "x = 5"
+                },
+                {
+                    "id": "q2",
+                    "question": "Which of these is a valid Python function declaration?",
+                    "options": ["function my_func():", "def my_func():", "func my_func():", "void my_func():"],
+                    "correct_answer": "def my_func():"
+                }
+            ],
+            passing_score=0.7
+        ))
+
+        await db.commit()
+    logger.info("Successfully seeded course data.")
+    return True
+
+
+async def build_search_index():
+    from services.search_index import search_index
+
+    async with AsyncSessionLocal() as db:
+        await search_index.rebuild(db)
+    search_index.save()
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Course Companion management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="Upgrade the database schema")
+    migrate_parser.add_argument("--revision", default="head")
+    commands.add_parser("seed", help="Add the sample course to an empty database")
+    commands.add_parser("setup", help="Migrate, seed and build the search index")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        if args.command == "migrate":
+            migrate(args.revision)
+        elif args.command == "seed":
+            await seed()
+        else:
+            migrate()
+            await seed()
+            await build_search_index()
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,144 @@
+"""Initial schema
+
+Tables as originally created by ``Base.metadata.create_all``. Databases that
+were created that way are stamped at this revision by ``run_migrations``
+instead of being re-created.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _timestamps():
+    return [
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'courses',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('prerequisites', sa.JSON(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_courses_id', 'courses', ['id'])
+    op.create_index('ix_courses_title', 'courses', ['title'])
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table(
+        'chapters',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('course_id', sa.String(), sa.ForeignKey('courses.id'), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('next_chapter_id', sa.String(), nullable=True),
+        sa.Column('prev_chapter_id', sa.String(), nullable=True),
+        sa.Column('order', sa.Integer(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chapters_id', 'chapters', ['id'])
+    op.create_index('ix_chapters_title', 'chapters', ['title'])
+
+    op.create_table(
+        'user_progress',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('course_id', sa.String(), sa.ForeignKey('courses.id'), nullable=True),
+        sa.Column('completed_chapters', sa.JSON(), nullable=True),
+        sa.Column('quiz_scores', sa.JSON(), nullable=True),
+        sa.Column('last_accessed', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('streak_days', sa.Integer(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_user_progress_id', 'user_progress', ['id'])
+
+    op.create_table(
+        'quizzes',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('course_id', sa.String(), sa.ForeignKey('courses.id'), nullable=True),
+        sa.Column('chapter_id', sa.String(), sa.ForeignKey('chapters.id'), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('questions', sa.JSON(), nullable=True),
+        sa.Column('passing_score', sa.Float(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_quizzes_id', 'quizzes', ['id'])
+
+    op.create_table(
+        'quiz_attempts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('quiz_id', sa.String(), sa.ForeignKey('quizzes.id'), nullable=True),
+        sa.Column('answers', sa.JSON(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('passed', sa.Boolean(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_quiz_attempts_id', 'quiz_attempts', ['id'])
+
+    op.create_table(
+        'subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('plan_type', sa.String(), nullable=True),
+        sa.Column('start_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('end_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_subscriptions_id', 'subscriptions', ['id'])
+
+    op.create_table(
+        'hybrid_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('month_year', sa.String(), nullable=True),
+        sa.Column('adaptive_learning', sa.Integer(), nullable=True),
+        sa.Column('llm_assessment', sa.Integer(), nullable=True),
+        sa.Column('synthesis', sa.Integer(), nullable=True),
+        sa.Column('mentor_sessions', sa.Integer(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_hybrid_usage_id', 'hybrid_usage', ['id'])
+
+
+def downgrade() -> None:
+    for table in ('hybrid_usage', 'subscriptions', 'quiz_attempts', 'quizzes',
+                  'user_progress', 'chapters', 'users', 'courses'):
+        op.drop_table(table)
@@ -0,0 +1,69 @@
+"""Composite indexes for hot filter paths
+
+Adds the indexes every router filters by, and makes ``user_progress`` and
+``hybrid_usage`` unique on the keys the code already treats as unique.
+Duplicate rows left behind by the old read-then-insert code are folded first:
+hybrid usage counters are summed into the oldest row, and for progress the
+oldest row (the one ``.first()`` always returned) is kept.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USAGE_FIELDS = ('adaptive_learning', 'llm_assessment', 'synthesis', 'mentor_sessions')
+
+
+def _fold_duplicate_usage() -> None:
+    totals = ', '.join(
+        f"{field} = (SELECT SUM(COALESCE(d.{field}, 0)) FROM hybrid_usage d "
+        f"WHERE d.user_id = hybrid_usage.user_id AND d.month_year = hybrid_usage.month_year)"
+        for field in USAGE_FIELDS
+    )
+    keep = "SELECT MIN(id) FROM hybrid_usage GROUP BY user_id, month_year"
+    op.execute(sa.text(
+        f"UPDATE hybrid_usage SET {totals} WHERE id IN ({keep} HAVING COUNT(*) > 1)"
+    ))
+    op.execute(sa.text(f"DELETE FROM hybrid_usage WHERE id NOT IN ({keep})"))
+
+
+def _drop_duplicate_progress() -> None:
+    op.execute(sa.text(
+        "DELETE FROM user_progress WHERE id NOT IN "
+        "(SELECT MIN(id) FROM user_progress GROUP BY user_id, course_id)"
+    ))
+
+
+def upgrade() -> None:
+    _fold_duplicate_usage()
+    _drop_duplicate_progress()
+
+    op.create_index('ix_chapters_course_id_order', 'chapters', ['course_id', 'order'])
+    op.create_index('ix_user_progress_user_id_course_id', 'user_progress', ['user_id', 'course_id'], unique=True)
+    op.create_index('ix_quizzes_course_id', 'quizzes', ['course_id'])
+    op.create_index(
+        'ix_quiz_attempts_user_id_quiz_id_completed_at', 'quiz_attempts', ['user_id', 'quiz_id', 'completed_at']
+    )
+    op.create_index('ix_subscriptions_user_id_is_active', 'subscriptions', ['user_id', 'is_active'])
+    op.create_index('ix_hybrid_usage_user_id_month_year', 'hybrid_usage', ['user_id', 'month_year'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_hybrid_usage_user_id_month_year', table_name='hybrid_usage')
+    op.drop_index('ix_subscriptions_user_id_is_active', table_name='subscriptions')
+    op.drop_index('ix_quiz_attempts_user_id_quiz_id_completed_at', table_name='quiz_attempts')
+    op.drop_index('ix_quizzes_course_id', table_name='quizzes')
+    op.drop_index('ix_user_progress_user_id_course_id', table_name='user_progress')
+    op.drop_index('ix_chapters_course_id_order', table_name='chapters')
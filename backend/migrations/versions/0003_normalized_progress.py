@@ -0,0 +1,267 @@
+"""Normalized chapter completions and quiz scores
+
+Moves ``user_progress.completed_chapters`` (JSON list) and
+``user_progress.quiz_scores`` (JSON dict) into ``chapter_completions`` and
+``quiz_best_scores``, then drops the JSON columns.
+
+Backfill: every listed chapter becomes a completion row, stamped with the
+progress row's ``last_accessed``. Best score and attempt count per user and
+quiz come from ``quiz_attempts``; the latest score, pass flag and date come
+from the JSON entry when there is one, otherwise from the newest attempt.
+Attempts are aggregated in one ``INSERT ... SELECT``; progress rows are read
+in keyset-paginated batches, so neither table is held in memory.
+Downgrade rebuilds the JSON columns from the tables.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+user_progress = sa.table(
+    'user_progress',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.String),
+    sa.column('course_id', sa.String),
+    sa.column('completed_chapters', sa.JSON),
+    sa.column('quiz_scores', sa.JSON),
+    sa.column('last_accessed', sa.DateTime(timezone=True)),
+)
+quizzes = sa.table('quizzes', sa.column('id', sa.String), sa.column('course_id', sa.String))
+quiz_attempts = sa.table(
+    'quiz_attempts',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.String),
+    sa.column('quiz_id', sa.String),
+    sa.column('score', sa.Float),
+    sa.column('passed', sa.Boolean),
+    sa.column('completed_at', sa.DateTime(timezone=True)),
+)
+
+
+def _parse_date(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _progress_batches(conn):
+    """user_progress rows in id order, ``BATCH_SIZE`` at a time (keyset pagination)"""
+    last_id = None
+    while True:
+        query = sa.select(
+            user_progress.c.id, user_progress.c.user_id, user_progress.c.course_id,
+            user_progress.c.completed_chapters, user_progress.c.quiz_scores, user_progress.c.last_accessed,
+        ).order_by(user_progress.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(user_progress.c.id > last_id)
+        rows = conn.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _backfill_attempts(conn, quiz_best_scores) -> None:
+    """One quiz_best_scores row per (user, quiz) with attempts, in a single INSERT ... SELECT"""
+    per_quiz = (
+        sa.select(
+            quiz_attempts.c.user_id, quiz_attempts.c.quiz_id,
+            sa.func.max(quiz_attempts.c.score).label('best_score'),
+            sa.func.count().label('attempts'),
+            sa.func.max(quiz_attempts.c.id).label('latest_id'),
+        )
+        .group_by(quiz_attempts.c.user_id, quiz_attempts.c.quiz_id)
+        .subquery()
+    )
+    latest = quiz_attempts.alias('latest')
+    conn.execute(quiz_best_scores.insert().from_select(
+        ['user_id', 'quiz_id', 'course_id', 'best_score', 'attempts', 'last_score', 'last_passed', 'last_attempt_at'],
+        sa.select(
+            per_quiz.c.user_id, per_quiz.c.quiz_id, quizzes.c.course_id, per_quiz.c.best_score,
+            per_quiz.c.attempts, latest.c.score, latest.c.passed, latest.c.completed_at,
+        )
+        .select_from(per_quiz)
+        .join(latest, latest.c.id == per_quiz.c.latest_id)
+        .outerjoin(quizzes, quizzes.c.id == per_quiz.c.quiz_id)
+    ))
+
+
+def _backfill_progress(conn, rows, chapter_completions, quiz_best_scores) -> None:
+    """Completions and JSON quiz entries of one batch of user_progress rows"""
+    completions, entries = [], {}
+    for _, user_id, course_id, completed_chapters, quiz_scores, last_accessed in rows:
+        for chapter_id in dict.fromkeys(completed_chapters or ()):
+            completions.append({
+                'user_id': user_id, 'course_id': course_id, 'chapter_id': chapter_id,
+                'completed_at': last_accessed or datetime.utcnow(),
+            })
+        for quiz_id, entry in (quiz_scores or {}).items():
+            if isinstance(entry, dict):
+                # Course and best score from the first entry, latest result from the last
+                entries.setdefault((user_id, quiz_id), [course_id, entry.get('score'), None])[2] = entry
+    if completions:
+        op.bulk_insert(chapter_completions, completions)
+    if not entries:
+        return
+
+    # The JSON entry is the latest result; best score and count stay with the attempts
+    user_ids = {user_id for user_id, _ in entries}
+    quiz_ids = {quiz_id for _, quiz_id in entries}
+    existing = set(conn.execute(
+        sa.select(quiz_best_scores.c.user_id, quiz_best_scores.c.quiz_id)
+        .where(quiz_best_scores.c.user_id.in_(user_ids), quiz_best_scores.c.quiz_id.in_(quiz_ids))
+    ).all())
+    quiz_courses = dict(conn.execute(
+        sa.select(quizzes.c.id, quizzes.c.course_id).where(quizzes.c.id.in_(quiz_ids))
+    ).all())
+
+    updates, inserts = [], []
+    for (user_id, quiz_id), (course_id, best_score, entry) in entries.items():
+        latest = {
+            'last_score': entry.get('score'),
+            'last_passed': entry.get('passed'),
+            'last_attempt_at': _parse_date(entry.get('date')),
+        }
+        if (user_id, quiz_id) in existing:
+            updates.append({'match_user_id': user_id, 'match_quiz_id': quiz_id, **latest})
+        else:
+            inserts.append({
+                'user_id': user_id, 'quiz_id': quiz_id, 'course_id': quiz_courses.get(quiz_id, course_id),
+                'best_score': best_score, 'attempts': 1, **latest,
+            })
+    if updates:
+        conn.execute(
+            quiz_best_scores.update()
+            .where(
+                quiz_best_scores.c.user_id == sa.bindparam('match_user_id'),
+                quiz_best_scores.c.quiz_id == sa.bindparam('match_quiz_id'),
+            )
+            .values(
+                last_score=sa.bindparam('last_score'),
+                last_passed=sa.bindparam('last_passed'),
+                last_attempt_at=sa.bindparam('last_attempt_at'),
+            ),
+            updates,
+        )
+    if inserts:
+        op.bulk_insert(quiz_best_scores, inserts)
+
+
+def _backfill(chapter_completions, quiz_best_scores) -> None:
+    conn = op.get_bind()
+    _backfill_attempts(conn, quiz_best_scores)
+    for rows in _progress_batches(conn):
+        _backfill_progress(conn, rows, chapter_completions, quiz_best_scores)
+
+
+def upgrade() -> None:
+    chapter_completions = op.create_table(
+        'chapter_completions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('course_id', sa.String(), nullable=True),
+        sa.Column('chapter_id', sa.String(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id']),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chapter_completions_id', 'chapter_completions', ['id'])
+    op.create_index(
+        'ix_chapter_completions_user_id_course_id_chapter_id', 'chapter_completions',
+        ['user_id', 'course_id', 'chapter_id'], unique=True,
+    )
+
+    quiz_best_scores = op.create_table(
+        'quiz_best_scores',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('quiz_id', sa.String(), nullable=True),
+        sa.Column('course_id', sa.String(), nullable=True),
+        sa.Column('best_score', sa.Float(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_score', sa.Float(), nullable=True),
+        sa.Column('last_passed', sa.Boolean(), nullable=True),
+        sa.Column('last_attempt_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id']),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_quiz_best_scores_id', 'quiz_best_scores', ['id'])
+    op.create_index('ix_quiz_best_scores_user_id_quiz_id', 'quiz_best_scores', ['user_id', 'quiz_id'], unique=True)
+    op.create_index('ix_quiz_best_scores_user_id_course_id', 'quiz_best_scores', ['user_id', 'course_id'])
+
+    _backfill(chapter_completions, quiz_best_scores)
+
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.drop_column('quiz_scores')
+        batch_op.drop_column('completed_chapters')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.add_column(sa.Column('completed_chapters', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('quiz_scores', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    completions = sa.table(
+        'chapter_completions',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.String),
+        sa.column('course_id', sa.String), sa.column('chapter_id', sa.String),
+    )
+    best_scores = sa.table(
+        'quiz_best_scores',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.String), sa.column('quiz_id', sa.String),
+        sa.column('course_id', sa.String), sa.column('last_score', sa.Float),
+        sa.column('last_passed', sa.Boolean), sa.column('last_attempt_at', sa.DateTime(timezone=True)),
+    )
+    blobs = {}
+    for user_id, course_id, chapter_id in conn.execute(
+        sa.select(completions.c.user_id, completions.c.course_id, completions.c.chapter_id).order_by(completions.c.id)
+    ):
+        blobs.setdefault((user_id, course_id), ([], {}))[0].append(chapter_id)
+    for user_id, quiz_id, course_id, score, passed, date in conn.execute(
+        sa.select(
+            best_scores.c.user_id, best_scores.c.quiz_id, best_scores.c.course_id,
+            best_scores.c.last_score, best_scores.c.last_passed, best_scores.c.last_attempt_at,
+        ).order_by(best_scores.c.id)
+    ):
+        blobs.setdefault((user_id, course_id), ([], {}))[1][quiz_id] = {
+            'score': score, 'passed': passed, 'date': date.isoformat() if date else None,
+        }
+
+    conn.execute(user_progress.update().values(completed_chapters=[], quiz_scores={}))
+    for (user_id, course_id), (completed_chapters, quiz_scores) in blobs.items():
+        conn.execute(
+            user_progress.update()
+            .where(user_progress.c.user_id == user_id, user_progress.c.course_id == course_id)
+            .values(completed_chapters=completed_chapters, quiz_scores=quiz_scores)
+        )
+
+    op.drop_index('ix_quiz_best_scores_user_id_course_id', table_name='quiz_best_scores')
+    op.drop_index('ix_quiz_best_scores_user_id_quiz_id', table_name='quiz_best_scores')
+    op.drop_index('ix_quiz_best_scores_id', table_name='quiz_best_scores')
+    op.drop_table('quiz_best_scores')
+    op.drop_index('ix_chapter_completions_user_id_course_id_chapter_id', table_name='chapter_completions')
+    op.drop_index('ix_chapter_completions_id', table_name='chapter_completions')
+    op.drop_table('chapter_completions')
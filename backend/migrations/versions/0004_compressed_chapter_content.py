@@ -0,0 +1,83 @@
+"""Store chapter content gzip-compressed
+
+Replaces the ``chapters.content`` text column with a binary column holding
+the same text as a gzip member (see ``utils.compression``). Rows are
+converted in batches of ``BATCH_SIZE`` through a temporary column, which is
+then renamed into place. Downgrade decompresses back into a text column.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+# Same format as utils.compression: a gzip member without a timestamp
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+def _compress(value):
+    if value is None:
+        return None
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(value.encode('utf-8')) + compressor.flush()
+
+
+def _decompress(value):
+    if value is None:
+        return None
+    return zlib.decompress(bytes(value), GZIP_WBITS).decode('utf-8')
+
+
+def _convert(source_type, target_type, convert) -> None:
+    """Copy ``content`` into ``content_new`` through ``convert``, keyset-batched by id"""
+    chapters = sa.table(
+        'chapters',
+        sa.column('id', sa.String),
+        sa.column('content', source_type),
+        sa.column('content_new', target_type),
+    )
+    conn = op.get_bind()
+    update = (
+        sa.update(chapters)
+        .where(chapters.c.id == sa.bindparam('chapter_id'))
+        .values(content_new=sa.bindparam('converted', type_=target_type))
+    )
+    last_id = None
+    while True:
+        query = sa.select(chapters.c.id, chapters.c.content).order_by(chapters.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(chapters.c.id > last_id)
+        rows = conn.execute(query).all()
+        if not rows:
+            break
+        conn.execute(update, [{'chapter_id': row.id, 'converted': convert(row.content)} for row in rows])
+        last_id = rows[-1].id
+
+
+def _swap(source_type, target_type, convert) -> None:
+    op.add_column('chapters', sa.Column('content_new', target_type, nullable=True))
+    _convert(source_type, target_type, convert)
+    with op.batch_alter_table('chapters') as batch_op:
+        batch_op.drop_column('content')
+        batch_op.alter_column('content_new', new_column_name='content')
+
+
+def upgrade() -> None:
+    _swap(sa.Text, sa.LargeBinary, _compress)
+
+
+def downgrade() -> None:
+    _swap(sa.LargeBinary, sa.Text, _decompress)
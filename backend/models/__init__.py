@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, Index
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.sql import func
 from config.database import Base
+from utils.compression import CompressedText
 from datetime import datetime
 
 
@@ -18,11 +19,13 @@ class Course(Base):
 
 class Chapter(Base):
     __tablename__ = "chapters"
+    __table_args__ = (Index("ix_chapters_course_id_order", "course_id", "order"),)
 
     id = Column(String, primary_key=True, index=True)
     course_id = Column(String, ForeignKey("courses.id"))
     title = Column(String, index=True)
-    content = Column(Text)
+    # Gzip-compressed (read and written as str); list queries defer it
+    content = Column(CompressedText)
     next_chapter_id = Column(String, nullable=True)
     prev_chapter_id = Column(String, nullable=True)
     order = Column(Integer)
@@ -43,20 +46,54 @@ class User(Base):
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    # The routers assume a single progress row per user per course
+    __table_args__ = (Index("ix_user_progress_user_id_course_id", "user_id", "course_id", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
     course_id = Column(String, ForeignKey("courses.id"))
-    completed_chapters = Column(JSON, default=[])
-    quiz_scores = Column(JSON, default={})
+    # Completed chapters and quiz scores live in chapter_completions / quiz_best_scores
     last_accessed = Column(DateTime(timezone=True), server_default=func.now())
     streak_days = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+class ChapterCompletion(Base):
+    __tablename__ = "chapter_completions"
+    __table_args__ = (
+        Index("ix_chapter_completions_user_id_course_id_chapter_id", "user_id", "course_id", "chapter_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"))
+    course_id = Column(String, ForeignKey("courses.id"))
+    chapter_id = Column(String, ForeignKey("chapters.id"))
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class QuizBestScore(Base):
+    __tablename__ = "quiz_best_scores"
+    # One row per user per quiz; quiz submission upserts against it
+    __table_args__ = (
+        Index("ix_quiz_best_scores_user_id_quiz_id", "user_id", "quiz_id", unique=True),
+        Index("ix_quiz_best_scores_user_id_course_id", "user_id", "course_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"))
+    quiz_id = Column(String, ForeignKey("quizzes.id"))
+    course_id = Column(String, ForeignKey("courses.id"))
+    best_score = Column(Float)
+    attempts = Column(Integer, default=0)
+    last_score = Column(Float)
+    last_passed = Column(Boolean)
+    last_attempt_at = Column(DateTime(timezone=True))
+
+
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (Index("ix_quizzes_course_id", "course_id"),)
 
     id = Column(String, primary_key=True, index=True)
     course_id = Column(String, ForeignKey("courses.id"))
@@ -70,6 +107,7 @@ class Quiz(Base):
 
 class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
+    __table_args__ = (Index("ix_quiz_attempts_user_id_quiz_id_completed_at", "user_id", "quiz_id", "completed_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
@@ -82,6 +120,7 @@ class QuizAttempt(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (Index("ix_subscriptions_user_id_is_active", "user_id", "is_active"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
@@ -95,6 +134,8 @@ class Subscription(Base):
 
 class HybridUsage(Base):
     __tablename__ = "hybrid_usage"
+    # One counter row per user per month; usage metering upserts against it
+    __table_args__ = (Index("ix_hybrid_usage_user_id_month_year", "user_id", "month_year", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
@@ -1,40 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy import and_, case, or_, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.types import LargeBinary
+from typing import List, Optional
+import asyncio
 import logging
+import os
+import shutil
+import tempfile
 
-from config.database import get_db
+from config.database import get_db, get_read_db
 from models import Course as CourseModel, Chapter as ChapterModel
-from schemas import Course as CourseSchema, Chapter as ChapterSchema, CourseCreate
+from schemas import Course as CourseSchema, Chapter as ChapterSchema, ChapterBundle, ChapterNeighbor, CourseCreate
+from services.admin import require_admin
+from services.response_cache import etag_matches, make_etag, response_cache
+from utils.compression import accepts_gzip, compress_text, decompress_text
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, is_legacy_request, paginate
+from utils.serialization import columns_of, row_dicts
 
 router = APIRouter()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Routes served through response_cache read the primary: hits never touch the
+# session, and a miss right after a write must not re-cache a lagging
+# replica's rows. Uncached reads (chapter content) use the replica.
+
 
 @router.get("/")
-async def get_courses(db: Session = Depends(get_db)):
-    """Get all available courses"""
-    try:
-        courses = db.query(CourseModel).all()
+async def get_courses(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get available courses, one keyset page (ordered by id) at a time"""
+    legacy = is_legacy_request(request)
+
+    async def load():
+        # Plain column rows: nothing is built per course but the dict that gets serialized
+        query = select(*columns_of(CourseModel)).order_by(CourseModel.id)
+        if legacy:
+            courses = row_dicts(await db.execute(query))
+            logger.info(f"Retrieved {len(courses)} courses")
+            return {"courses": courses}
+
+        if cursor:
+            (after_id,) = decode_cursor(cursor, (str,))
+            query = query.where(CourseModel.id > after_id)
+        rows = row_dicts(await db.execute(query.limit(limit + 1)))
+        courses, next_cursor = paginate(rows, limit, lambda course: [course["id"]])
         logger.info(f"Retrieved {len(courses)} courses")
-        return {"courses": courses}
+        return {"courses": courses, "next_cursor": next_cursor}
+
+    try:
+        return await response_cache.respond(request, load, variant="legacy" if legacy else "")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving courses: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/{course_id}", response_model=CourseSchema)
-async def get_course(course_id: str, db: Session = Depends(get_db)):
+async def get_course(course_id: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a specific course by ID"""
-    try:
-        course = db.query(CourseModel).filter(CourseModel.id == course_id).first()
+    async def load():
+        course = await db.get(CourseModel, course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
         logger.info(f"Retrieved course: {course_id}")
-        return course
+        return CourseSchema.model_validate(course)
+
+    try:
+        return await response_cache.respond(request, load)
     except HTTPException:
         raise
     except Exception as e:
@@ -43,17 +83,47 @@ async def get_course(course_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{course_id}/chapters")
-async def get_course_chapters(course_id: str, db: Session = Depends(get_db)):
-    """Get all chapters for a specific course"""
-    try:
-        chapters = db.query(ChapterModel).filter(ChapterModel.course_id == course_id).order_by(ChapterModel.order).all()
-        if not chapters:
+async def get_course_chapters(
+    course_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_content: bool = Query(False, description="Also send each chapter's content"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the chapters of a specific course, one keyset page (by order) at a time.
+
+    Content is left out unless ``include_content`` is set; legacy full lists
+    keep sending it.
+    """
+    legacy = is_legacy_request(request)
+
+    async def load():
+        # Only titles and order are needed unless content is asked for
+        columns = columns_of(ChapterModel, exclude=() if legacy or include_content else ("content",))
+        query = select(*columns).where(ChapterModel.course_id == course_id).order_by(ChapterModel.order, ChapterModel.id)
+        if not legacy:
+            if cursor:
+                after_order, after_id = decode_cursor(cursor, (int, str))
+                query = query.where(or_(
+                    ChapterModel.order > after_order,
+                    and_(ChapterModel.order == after_order, ChapterModel.id > after_id)
+                ))
+            query = query.limit(limit + 1)
+        chapters = row_dicts(await db.execute(query))
+        if not chapters and not cursor:
             # Check if course exists to return appropriate error
-            course_exists = db.query(CourseModel).filter(CourseModel.id == course_id).first()
+            course_exists = await db.get(CourseModel, course_id)
             if not course_exists:
                 raise HTTPException(status_code=404, detail="Course not found")
         logger.info(f"Retrieved {len(chapters)} chapters for course: {course_id}")
-        return {"chapters": chapters}
+        if legacy:
+            return {"chapters": chapters}
+        chapters, next_cursor = paginate(chapters, limit, lambda chapter: [chapter["order"], chapter["id"]])
+        return {"chapters": chapters, "next_cursor": next_cursor}
+
+    try:
+        return await response_cache.respond(request, load, variant="legacy" if legacy else "")
     except HTTPException:
         raise
     except Exception as e:
@@ -62,14 +132,17 @@ async def get_course_chapters(course_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/chapters/{chapter_id}", response_model=ChapterSchema)
-async def get_chapter(chapter_id: str, db: Session = Depends(get_db)):
+async def get_chapter(chapter_id: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get a specific chapter by ID"""
-    try:
-        chapter = db.query(ChapterModel).filter(ChapterModel.id == chapter_id).first()
+    async def load():
+        chapter = await db.get(ChapterModel, chapter_id)
         if not chapter:
             raise HTTPException(status_code=404, detail="Chapter not found")
         logger.info(f"Retrieved chapter: {chapter_id}")
-        return chapter
+        return ChapterSchema.model_validate(chapter)
+
+    try:
+        return await response_cache.respond(request, load)
     except HTTPException:
         raise
     except Exception as e:
@@ -77,23 +150,72 @@ async def get_chapter(chapter_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/chapters/{chapter_id}/next", response_model=ChapterSchema)
-async def get_next_chapter(chapter_id: str, db: Session = Depends(get_db)):
-    """Get the next chapter after the specified one"""
+@router.get("/chapters/{chapter_id}/content")
+async def get_chapter_content(chapter_id: str, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Get a chapter's Markdown content on its own.
+
+    Content is stored gzip-compressed; clients that accept gzip get the stored
+    bytes as they are, with ``Content-Encoding: gzip``, and only others pay
+    for decompression.
+    """
     try:
-        current_chapter = db.query(ChapterModel).filter(ChapterModel.id == chapter_id).first()
-        if not current_chapter:
+        row = (await db.execute(
+            select(type_coerce(ChapterModel.content, LargeBinary)).where(ChapterModel.id == chapter_id)
+        )).first()
+        if row is None:
             raise HTTPException(status_code=404, detail="Chapter not found")
+        body = bytes(row[0]) if row[0] is not None else compress_text("")
+        gzipped = accepts_gzip(request.headers.get("accept-encoding"))
+        # Strong ETags must differ between the gzip and identity bytes
+        headers = {
+            "ETag": make_etag(body, "-gz" if gzipped else ""),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = decompress_text(body).encode("utf-8")
+        logger.info(f"Retrieved content of chapter: {chapter_id} ({headers.get('Content-Encoding', 'identity')})")
+        return Response(content=body, media_type="text/markdown", headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving content of chapter {chapter_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        if not current_chapter.next_chapter_id:
-            raise HTTPException(status_code=404, detail="No next chapter available")
 
-        next_chapter = db.query(ChapterModel).filter(ChapterModel.id == current_chapter.next_chapter_id).first()
-        if not next_chapter:
-            raise HTTPException(status_code=404, detail="Next chapter not found")
+async def _linked_chapter(db: AsyncSession, chapter_id: str, link: str, label: str) -> ChapterModel:
+    """The chapter that ``chapter_id`` links to through its ``link`` column, in one query"""
+    current = aliased(ChapterModel)
+    linked = (await db.execute(
+        select(ChapterModel)
+        .join(current, ChapterModel.id == getattr(current, link))
+        .where(current.id == chapter_id)
+    )).scalars().first()
+    if linked is None:
+        # Only a miss pays for a second query, to tell the cases apart
+        current_chapter = await db.get(ChapterModel, chapter_id)
+        if not current_chapter:
+            raise HTTPException(status_code=404, detail="Chapter not found")
+        if not getattr(current_chapter, link):
+            raise HTTPException(status_code=404, detail=f"No {label} chapter available")
+        raise HTTPException(status_code=404, detail=f"{label.capitalize()} chapter not found")
+    return linked
+
 
+@router.get("/chapters/{chapter_id}/next", response_model=ChapterSchema)
+async def get_next_chapter(chapter_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get the next chapter after the specified one"""
+    async def load():
+        next_chapter = await _linked_chapter(db, chapter_id, "next_chapter_id", "next")
         logger.info(f"Retrieved next chapter: {next_chapter.id} for chapter: {chapter_id}")
-        return next_chapter
+        return ChapterSchema.model_validate(next_chapter)
+
+    try:
+        return await response_cache.respond(request, load)
     except HTTPException:
         raise
     except Exception as e:
@@ -102,24 +224,95 @@ async def get_next_chapter(chapter_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/chapters/{chapter_id}/previous", response_model=ChapterSchema)
-async def get_prev_chapter(chapter_id: str, db: Session = Depends(get_db)):
+async def get_prev_chapter(chapter_id: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get the previous chapter before the specified one"""
+    async def load():
+        prev_chapter = await _linked_chapter(db, chapter_id, "prev_chapter_id", "previous")
+        logger.info(f"Retrieved previous chapter: {prev_chapter.id} for chapter: {chapter_id}")
+        return ChapterSchema.model_validate(prev_chapter)
+
     try:
-        current_chapter = db.query(ChapterModel).filter(ChapterModel.id == chapter_id).first()
-        if not current_chapter:
+        return await response_cache.respond(request, load)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving previous chapter for {chapter_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/chapters/{chapter_id}/bundle", response_model=ChapterBundle)
+async def get_chapter_bundle(
+    chapter_id: str,
+    request: Request,
+    include_content: bool = Query(False, description="Also send the neighbors' content, to prefetch page turns"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a chapter together with its next and previous chapters.
+
+    The chapter and both neighbors come from one query (the chapter joined to
+    the rows whose id is IN its own id and link ids), and the bundle is cached
+    as a unit. Neighbor content is left out unless ``include_content`` is set.
+    """
+    async def load():
+        current = aliased(ChapterModel)
+        content = ChapterModel.content if include_content else case(
+            (ChapterModel.id == current.id, ChapterModel.content)
+        )
+        rows = (await db.execute(
+            select(
+                ChapterModel.id, ChapterModel.course_id, ChapterModel.title, ChapterModel.order,
+                ChapterModel.next_chapter_id, ChapterModel.prev_chapter_id, content.label("content"),
+                current.next_chapter_id.label("link_next"), current.prev_chapter_id.label("link_prev"),
+            )
+            .join(current, ChapterModel.id.in_([current.id, current.next_chapter_id, current.prev_chapter_id]))
+            .where(current.id == chapter_id)
+        )).mappings().all()
+        by_id = {row["id"]: dict(row) for row in rows}
+        if chapter_id not in by_id:
             raise HTTPException(status_code=404, detail="Chapter not found")
+        chapter = by_id[chapter_id]
+        next_row, prev_row = by_id.get(chapter["link_next"]), by_id.get(chapter["link_prev"])
+        logger.info(f"Retrieved chapter bundle: {chapter_id} ({len(rows)} chapters)")
+        return ChapterBundle(
+            chapter=ChapterSchema.model_validate(chapter),
+            next=ChapterNeighbor.model_validate(next_row) if next_row else None,
+            previous=ChapterNeighbor.model_validate(prev_row) if prev_row else None,
+        )
 
-        if not current_chapter.prev_chapter_id:
-            raise HTTPException(status_code=404, detail="No previous chapter available")
+    try:
+        return await response_cache.respond(request, load)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving chapter bundle for {chapter_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        prev_chapter = db.query(ChapterModel).filter(ChapterModel.id == current_chapter.prev_chapter_id).first()
-        if not prev_chapter:
-            raise HTTPException(status_code=404, detail="Previous chapter not found")
 
-        logger.info(f"Retrieved previous chapter: {prev_chapter.id} for chapter: {chapter_id}")
-        return prev_chapter
+@router.post("/ingest", dependencies=[Depends(require_admin)])
+async def ingest_courses(bundle: UploadFile = File(..., description="Tarball of course folders (course.json + Markdown chapters)")):
+    """Bulk-ingest Markdown courses from an uploaded tarball (admin only)"""
+    # Imported here: ingestion is an admin path and tarfile/compression stay out of startup
+    import tarfile
+    from services.course_ingest import IngestError, ingest
+
+    path = None
+    try:
+        # Spool the upload to disk so the archive is read member by member, never held in memory
+        with tempfile.NamedTemporaryFile(suffix=".tar", delete=False) as fh:
+            path = fh.name
+            await asyncio.to_thread(shutil.copyfileobj, bundle.file, fh, 1024 * 1024)
+        if not tarfile.is_tarfile(path):
+            raise HTTPException(status_code=400, detail="Upload is not a tar archive")
+        report = await ingest(path)
+        logger.info(f"Ingested {report.courses} courses and {report.chapters} chapters from {bundle.filename}")
+        return report._asdict()
     except HTTPException:
         raise
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error retrieving previous chapter for {chapter_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        logger.error(f"Error ingesting courses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if path is not None:
+            os.unlink(path)
@@ -0,0 +1,171 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import AsyncIterator, Optional
+from datetime import date, datetime, timedelta
+import json
+import logging
+import os
+import zlib
+
+from config.database import ReadSessionLocal
+from models import (
+    ChapterCompletion as ChapterCompletionModel,
+    HybridUsage as HybridUsageModel,
+    QuizAttempt as QuizAttemptModel,
+    UserProgress as UserProgressModel,
+)
+from services.admin import require_admin
+
+# Full exports of every user's data: admin only
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip from the server-side cursor, and per NDJSON chunk sent
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def _ndjson(name: str, query) -> AsyncIterator[bytes]:
+    """Stream query rows as NDJSON, one chunk per ``yield_per`` partition.
+
+    The session is opened here rather than injected, so it stays open for as
+    long as the response body is being sent.
+    """
+    rows_sent = 0
+    try:
+        async with ReadSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for partition in result.mappings().partitions():
+                yield "".join(
+                    json.dumps(dict(row), default=_json_default, separators=(",", ":")) + "\n" for row in partition
+                ).encode()
+                rows_sent += len(partition)
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated body
+        logger.error(f"Error exporting {name} after {rows_sent} rows: {str(e)}")
+        raise
+    logger.info(f"Exported {rows_sent} {name} rows")
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _export(name: str, query, gzip: bool) -> StreamingResponse:
+    body = _ndjson(name, query)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.ndjson"'}
+    if gzip:
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+
+def _check_range(since: Optional[datetime], until: Optional[datetime]):
+    if since is not None and until is not None and since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+
+
+def _in_range(column, since: Optional[datetime], until: Optional[datetime]):
+    """Half-open [since, until) filter on a timestamp column"""
+    conditions = []
+    if since is not None:
+        conditions.append(column >= since)
+    if until is not None:
+        conditions.append(column < until)
+    return conditions
+
+
+@router.get("/progress")
+async def export_progress(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = Query(False, description="Send the body gzip-encoded")
+):
+    """Export progress rows last accessed in [since, until) as NDJSON"""
+    _check_range(since, until)
+    query = (
+        select(
+            UserProgressModel.id, UserProgressModel.user_id, UserProgressModel.course_id,
+            UserProgressModel.streak_days, UserProgressModel.last_accessed, UserProgressModel.created_at
+        )
+        .where(*_in_range(UserProgressModel.last_accessed, since, until))
+        .order_by(UserProgressModel.id)
+    )
+    return _export("progress", query, gzip)
+
+
+@router.get("/chapter-completions")
+async def export_chapter_completions(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = Query(False, description="Send the body gzip-encoded")
+):
+    """Export chapters completed in [since, until) as NDJSON"""
+    _check_range(since, until)
+    query = (
+        select(
+            ChapterCompletionModel.id, ChapterCompletionModel.user_id, ChapterCompletionModel.course_id,
+            ChapterCompletionModel.chapter_id, ChapterCompletionModel.completed_at
+        )
+        .where(*_in_range(ChapterCompletionModel.completed_at, since, until))
+        .order_by(ChapterCompletionModel.id)
+    )
+    return _export("chapter-completions", query, gzip)
+
+
+@router.get("/quiz-attempts")
+async def export_quiz_attempts(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = Query(False, description="Send the body gzip-encoded")
+):
+    """Export quiz attempts completed in [since, until) as NDJSON"""
+    _check_range(since, until)
+    query = (
+        select(
+            QuizAttemptModel.id, QuizAttemptModel.user_id, QuizAttemptModel.quiz_id, QuizAttemptModel.answers,
+            QuizAttemptModel.score, QuizAttemptModel.passed, QuizAttemptModel.completed_at
+        )
+        .where(*_in_range(QuizAttemptModel.completed_at, since, until))
+        .order_by(QuizAttemptModel.id)
+    )
+    return _export("quiz-attempts", query, gzip)
+
+
+@router.get("/hybrid-usage")
+async def export_hybrid_usage(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = Query(False, description="Send the body gzip-encoded")
+):
+    """Export monthly hybrid usage counters as NDJSON; a month is included if it
+    overlaps [since, until)"""
+    _check_range(since, until)
+    conditions = []
+    if since is not None:
+        conditions.append(HybridUsageModel.month_year >= since.strftime('%Y-%m'))
+    if until is not None:
+        # until is exclusive: midnight on the 1st does not pull in that month
+        conditions.append(HybridUsageModel.month_year <= (until - timedelta(microseconds=1)).strftime('%Y-%m'))
+    query = (
+        select(
+            HybridUsageModel.id, HybridUsageModel.user_id, HybridUsageModel.month_year,
+            HybridUsageModel.adaptive_learning, HybridUsageModel.llm_assessment,
+            HybridUsageModel.synthesis, HybridUsageModel.mentor_sessions
+        )
+        .where(*conditions)
+        .order_by(HybridUsageModel.id)
+    )
+    return _export("hybrid-usage", query, gzip)
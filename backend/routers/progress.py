@@ -1,59 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import logging
 from datetime import datetime
 
-from config.database import get_db
+from config.database import get_db, get_read_db, read_your_writes
 from models import UserProgress as UserProgressModel, Chapter as ChapterModel, Course as CourseModel
 from schemas import UserProgress as UserProgressSchema, UserProgressCreate
+from services import progress_store
+from services.course_structure import course_structure
+from utils.serialization import json_response
 
 router = APIRouter()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 @router.post("/{user_id}/courses/{course_id}/chapters/{chapter_id}")
-async def mark_chapter_completed(user_id: str, course_id: str, chapter_id: str, db: Session = Depends(get_db)):
+async def mark_chapter_completed(user_id: str, course_id: str, chapter_id: str, db: AsyncSession = Depends(get_db)):
     """Mark a chapter as completed for a user"""
     try:
         # Check if chapter exists
-        chapter = db.query(ChapterModel).filter(ChapterModel.id == chapter_id).first()
+        chapter = await db.get(ChapterModel, chapter_id)
         if not chapter:
             raise HTTPException(status_code=404, detail="Chapter not found")
 
         # Check if course exists
-        course = db.query(CourseModel).filter(CourseModel.id == course_id).first()
+        course = await db.get(CourseModel, course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
-        # Find or create user progress record
-        user_progress = db.query(UserProgressModel).filter(
-            UserProgressModel.user_id == user_id,
-            UserProgressModel.course_id == course_id
-        ).first()
+        # Record the completion (a no-op if already recorded) and find or create
+        # the progress row, in one transaction
+        await progress_store.record_completion(db, user_id, course_id, chapter_id)
+        await db.commit()
+        read_your_writes.mark(user_id)
 
-        if not user_progress:
-            # Create new progress record if it doesn't exist
-            user_progress = UserProgressModel(
-                user_id=user_id,
-                course_id=course_id,
-                completed_chapters=[],
-                quiz_scores={},
-                streak_days=0
+        user_progress = (await db.execute(
+            select(UserProgressModel).where(
+                UserProgressModel.user_id == user_id,
+                UserProgressModel.course_id == course_id
             )
-            db.add(user_progress)
-            db.commit()
-            db.refresh(user_progress)
-
-        # Add chapter to completed if not already there
-        if chapter_id not in user_progress.completed_chapters:
-            user_progress.completed_chapters.append(chapter_id)
-            user_progress.last_accessed = datetime.utcnow()
-
-        db.commit()
+        )).scalars().first()
+        completed = await progress_store.completed_chapters(db, user_id, [course_id])
+        scores = await progress_store.quiz_scores(db, user_id, [course_id])
 
         logger.info(f"Chapter {chapter_id} marked as completed for user {user_id} in course {course_id}")
         return {
@@ -61,8 +52,8 @@ async def mark_chapter_completed(user_id: str, course_id: str, chapter_id: str,
             "progress": {
                 "user_id": user_progress.user_id,
                 "course_id": user_progress.course_id,
-                "completed_chapters": user_progress.completed_chapters,
-                "quiz_scores": user_progress.quiz_scores,
+                "completed_chapters": completed.get(course_id, []),
+                "quiz_scores": scores.get(course_id, {}),
                 "last_accessed": user_progress.last_accessed,
                 "streak_days": user_progress.streak_days
             }
@@ -75,19 +66,21 @@ async def mark_chapter_completed(user_id: str, course_id: str, chapter_id: str,
 
 
 @router.get("/{user_id}/courses/{course_id}", response_model=UserProgressSchema)
-async def get_user_progress(user_id: str, course_id: str, db: Session = Depends(get_db)):
+async def get_user_progress(user_id: str, course_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get a user's progress in a specific course"""
     try:
         # Check if course exists
-        course = db.query(CourseModel).filter(CourseModel.id == course_id).first()
+        course = await db.get(CourseModel, course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found")
 
         # Get user progress
-        user_progress = db.query(UserProgressModel).filter(
-            UserProgressModel.user_id == user_id,
-            UserProgressModel.course_id == course_id
-        ).first()
+        user_progress = (await db.execute(
+            select(UserProgressModel).where(
+                UserProgressModel.user_id == user_id,
+                UserProgressModel.course_id == course_id
+            )
+        )).scalars().first()
 
         if not user_progress:
             # Return default progress if no record exists
@@ -101,18 +94,20 @@ async def get_user_progress(user_id: str, course_id: str, db: Session = Depends(
                 "streak_days": 0
             }
 
-        # Calculate completion percentage
-        total_chapters = db.query(ChapterModel).filter(ChapterModel.course_id == course_id).count()
-        completed_count = len(user_progress.completed_chapters)
-        completion_percentage = (completed_count / total_chapters) * 100 if total_chapters > 0 else 0
+        completed = (await progress_store.completed_chapters(db, user_id, [course_id])).get(course_id, [])
+        scores = (await progress_store.quiz_scores(db, user_id, [course_id])).get(course_id, {})
+
+        # Calculate completion percentage from the completion bitset
+        structure = await course_structure.get(db, course_id)
+        completion_percentage = structure.completion_percentage(structure.completion_mask(completed))
 
         logger.info(f"Retrieved progress for user {user_id} in course {course_id}")
         return {
             "id": user_progress.id,
             "user_id": user_progress.user_id,
             "course_id": user_progress.course_id,
-            "completed_chapters": user_progress.completed_chapters,
-            "quiz_scores": user_progress.quiz_scores,
+            "completed_chapters": completed,
+            "quiz_scores": scores,
             "last_accessed": user_progress.last_accessed,
             "streak_days": user_progress.streak_days,
             "completion_percentage": completion_percentage
@@ -125,57 +120,71 @@ async def get_user_progress(user_id: str, course_id: str, db: Session = Depends(
 
 
 @router.get("/{user_id}/courses", response_model=List[dict])
-async def get_user_courses_progress(user_id: str, db: Session = Depends(get_db)):
+async def get_user_courses_progress(user_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get a user's progress across all courses"""
     try:
-        # Get all progress records for the user
-        user_progress_list = db.query(UserProgressModel).filter(
-            UserProgressModel.user_id == user_id
-        ).all()
+        # Progress rows with course title in a single query
+        rows = (await db.execute(
+            select(
+                UserProgressModel.course_id,
+                UserProgressModel.streak_days,
+                UserProgressModel.last_accessed,
+                CourseModel.title.label("course_title")
+            )
+            .outerjoin(CourseModel, CourseModel.id == UserProgressModel.course_id)
+            .where(UserProgressModel.user_id == user_id)
+            .order_by(UserProgressModel.id)
+        )).all()
 
-        progress_summary = []
+        # Completions and scores for all of the user's courses in one query each;
+        # chapter positions come from the structure cache (one query for any misses)
+        completed = await progress_store.completed_chapters(db, user_id)
+        scores = await progress_store.quiz_scores(db, user_id)
+        structures = await course_structure.get_many(db, [row.course_id for row in rows])
 
-        for progress in user_progress_list:
-            # Get course info
-            course = db.query(CourseModel).filter(CourseModel.id == progress.course_id).first()
+        progress_summary = []
 
-            # Calculate completion percentage
-            total_chapters = db.query(ChapterModel).filter(ChapterModel.course_id == progress.course_id).count()
-            completed_count = len(progress.completed_chapters)
-            completion_percentage = (completed_count / total_chapters) * 100 if total_chapters > 0 else 0
+        for row in rows:
+            structure = structures[row.course_id]
+            mask = structure.completion_mask(completed.get(row.course_id, ()))
+            completed_count = mask.bit_count()
+            total_chapters = structure.chapter_count
+            completion_percentage = structure.completion_percentage(mask)
 
             progress_summary.append({
-                "course_id": progress.course_id,
-                "course_title": course.title if course else "Unknown Course",
-                "completed_chapters": len(progress.completed_chapters),
+                "course_id": row.course_id,
+                "course_title": row.course_title or "Unknown Course",
+                "completed_chapters": completed_count,
                 "total_chapters": total_chapters,
                 "completion_percentage": completion_percentage,
-                "quiz_scores": progress.quiz_scores,
-                "streak_days": progress.streak_days,
-                "last_accessed": progress.last_accessed
+                "quiz_scores": scores.get(row.course_id, {}),
+                "streak_days": row.streak_days,
+                "last_accessed": row.last_accessed
             })
 
         logger.info(f"Retrieved progress summary for user {user_id} across {len(progress_summary)} courses")
-        return progress_summary
+        # Already plain dicts; serialize them without a List[dict] validation pass
+        return json_response(progress_summary)
     except Exception as e:
         logger.error(f"Error retrieving user courses progress: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.put("/{user_id}/streak/reset")
-async def reset_streak(user_id: str, db: Session = Depends(get_db)):
+async def reset_streak(user_id: str, db: AsyncSession = Depends(get_db)):
     """Reset a user's streak days to 0"""
     try:
         # Find all progress records for the user
-        user_progress_list = db.query(UserProgressModel).filter(
-            UserProgressModel.user_id == user_id
-        ).all()
+        user_progress_list = (await db.execute(
+            select(UserProgressModel).where(UserProgressModel.user_id == user_id)
+        )).scalars().all()
 
         for progress in user_progress_list:
             progress.streak_days = 0
             progress.last_accessed = datetime.utcnow()
 
-        db.commit()
+        await db.commit()
+        read_your_writes.mark(user_id)
 
         logger.info(f"Reset streak for user {user_id}")
         return {"message": "Streak reset successfully", "user_id": user_id}
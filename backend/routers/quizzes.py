@@ -1,25 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 import logging
+import os
 from datetime import datetime
 
-from config.database import get_db
-from models import Quiz as QuizModel, QuizAttempt as QuizAttemptModel, UserProgress as UserProgressModel
-from schemas import Quiz as QuizSchema, QuizSubmission, QuizResult, QuizAttemptCreate, QuizAttempt
+from config.database import get_db, get_read_db, read_your_writes
+from models import Quiz as QuizModel, QuizAttempt as QuizAttemptModel
+from schemas import (
+    Quiz as QuizSchema, QuizSubmission, QuizResult, QuizAttemptCreate, QuizAttempt, QuizAttemptPage,
+    QuizBatchSubmission, QuizBatchResult
+)
+from services.quiz_grading import grade, quiz_keys
+from services.quiz_submissions import (
+    QUIZ_WRITE_BEHIND_INTERVAL, GradedAttempt, QueueFull, quiz_writer, record_attempts
+)
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, is_legacy_request, paginate
+from utils.serialization import columns_of, json_response, row_dicts
 
 router = APIRouter()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+QUIZ_BATCH_MAX_SUBMISSIONS = int(os.getenv("QUIZ_BATCH_MAX_SUBMISSIONS", "10000"))
+
 
 @router.get("/{quiz_id}", response_model=QuizSchema)
-async def get_quiz(quiz_id: str, db: Session = Depends(get_db)):
+async def get_quiz(quiz_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get a specific quiz by ID"""
     try:
-        quiz = db.query(QuizModel).filter(QuizModel.id == quiz_id).first()
+        quiz = await db.get(QuizModel, quiz_id)
         if not quiz:
             raise HTTPException(status_code=404, detail="Quiz not found")
         logger.info(f"Retrieved quiz: {quiz_id}")
@@ -32,63 +43,41 @@ async def get_quiz(quiz_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/submit", response_model=QuizResult)
-async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db)):
+async def submit_quiz(submission: QuizSubmission, db: AsyncSession = Depends(get_db)):
     """Submit quiz answers and get results"""
     try:
-        # Get the quiz
-        quiz = db.query(QuizModel).filter(QuizModel.id == submission.quiz_id).first()
+        # Get the compiled answer key and calculate score
+        quiz = await quiz_keys.get(db, submission.quiz_id)
         if not quiz:
             raise HTTPException(status_code=404, detail="Quiz not found")
 
-        # Calculate score
-        correct_answers = 0
-        total_questions = len(quiz.questions)
-
-        for question in quiz.questions:
-            question_id = question.get('id')
-            if question_id in submission.answers:
-                if submission.answers[question_id] == question.get('correct_answer'):
-                    correct_answers += 1
-
-        score = correct_answers / total_questions if total_questions > 0 else 0
-        passed = score >= quiz.passing_score
-
-        # Save quiz attempt
-        quiz_attempt = QuizAttemptModel(
+        score, passed = grade(quiz, submission.answers)
+        attempt = GradedAttempt(
             user_id=submission.user_id,
             quiz_id=submission.quiz_id,
+            course_id=quiz.course_id,
             answers=submission.answers,
             score=score,
-            passed=passed
+            passed=passed,
+            submitted_at=datetime.utcnow()
         )
-        db.add(quiz_attempt)
-        db.commit()
-        db.refresh(quiz_attempt)
-
-        # Update user progress
-        user_progress = db.query(UserProgressModel).filter(
-            UserProgressModel.user_id == submission.user_id,
-            UserProgressModel.course_id == quiz.course_id
-        ).first()
-
-        if not user_progress:
-            # Create new progress record if it doesn't exist
-            user_progress = UserProgressModel(
-                user_id=submission.user_id,
-                course_id=quiz.course_id,
-                completed_chapters=[],
-                quiz_scores={},
-                streak_days=0
-            )
-            db.add(user_progress)
 
-        # Update quiz scores
-        user_progress.quiz_scores[submission.quiz_id] = {
-            "score": score,
-            "passed": passed,
-            "date": datetime.utcnow().isoformat()
-        }
-        db.commit()
+        # Save the attempt and upsert progress in one transaction, or queue
+        # both for the write-behind flusher
+        if quiz_writer.enabled:
+            try:
+                await quiz_writer.submit(attempt)
+            except QueueFull as e:
+                logger.error(f"Rejecting quiz submission: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Quiz submissions are temporarily unavailable, please retry shortly",
+                    headers={"Retry-After": str(max(1, round(QUIZ_WRITE_BEHIND_INTERVAL)))},
+                )
+        else:
+            await record_attempts(db, [attempt])
+            await db.commit()
+        read_your_writes.mark(submission.user_id)
 
         feedback = "Great job!" if passed else "Keep studying, you'll get it next time!"
 
@@ -108,27 +97,113 @@ async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db))
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/attempts/{user_id}/{quiz_id}", response_model=List[QuizAttempt])
-async def get_user_quiz_attempts(user_id: str, quiz_id: str, db: Session = Depends(get_db)):
-    """Get all attempts by a user for a specific quiz"""
+@router.post("/submit/batch", response_model=QuizBatchResult)
+async def submit_quiz_batch(batch: QuizBatchSubmission, db: AsyncSession = Depends(get_db)):
+    """Grade many quiz submissions and record them in a single transaction"""
+    try:
+        submissions = batch.submissions
+        if len(submissions) > QUIZ_BATCH_MAX_SUBMISSIONS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {QUIZ_BATCH_MAX_SUBMISSIONS} submissions per batch"
+            )
+        if not submissions:
+            return QuizBatchResult(results=[])
+
+        # Compiled answer key per distinct quiz
+        quiz_ids = {submission.quiz_id for submission in submissions}
+        quizzes = await quiz_keys.get_many(db, quiz_ids)
+        missing = quiz_ids - quizzes.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Quiz not found: {', '.join(sorted(missing))}")
+
+        now = datetime.utcnow()
+        attempts = []
+        for submission in submissions:
+            quiz = quizzes[submission.quiz_id]
+            score, passed = grade(quiz, submission.answers)
+            attempts.append(GradedAttempt(
+                user_id=submission.user_id,
+                quiz_id=submission.quiz_id,
+                course_id=quiz.course_id,
+                answers=submission.answers,
+                score=score,
+                passed=passed,
+                submitted_at=now
+            ))
+
+        # Later submissions for the same user and quiz win, as with sequential submits
+        await record_attempts(db, attempts)
+        await db.commit()
+        read_your_writes.mark(*{attempt.user_id for attempt in attempts})
+
+        results = [
+            QuizResult(
+                quiz_id=attempt.quiz_id,
+                score=attempt.score,
+                passed=attempt.passed,
+                feedback="Great job!" if attempt.passed else "Keep studying, you'll get it next time!"
+            )
+            for attempt in attempts
+        ]
+        logger.info(f"Graded batch of {len(submissions)} quiz submissions across {len(quizzes)} quizzes")
+        return QuizBatchResult(results=results)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error grading quiz batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/attempts/{user_id}/{quiz_id}", response_model=Union[QuizAttemptPage, List[QuizAttempt]])
+async def get_user_quiz_attempts(
+    user_id: str,
+    quiz_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get a user's attempts at a specific quiz, newest first, one keyset page at a time
+
+    Rows are serialized straight from the columns (which are exactly the
+    schema's fields); the response model documents the shape but is not run
+    per attempt.
+    """
     try:
-        attempts = db.query(QuizAttemptModel).filter(
+        query = select(*columns_of(QuizAttemptModel)).where(
             QuizAttemptModel.user_id == user_id,
             QuizAttemptModel.quiz_id == quiz_id
-        ).order_by(QuizAttemptModel.completed_at.desc()).all()
+        )
+        if is_legacy_request(request):
+            attempts = row_dicts(await db.execute(query.order_by(QuizAttemptModel.completed_at.desc())))
+            logger.info(f"Retrieved {len(attempts)} attempts for user {user_id} and quiz {quiz_id}")
+            return json_response(attempts)
+
+        # Page on id rather than completed_at: ids follow completion order and
+        # are unique, so the key needs no tie-breaker
+        if cursor:
+            (before_id,) = decode_cursor(cursor, (int,))
+            query = query.where(QuizAttemptModel.id < before_id)
+        rows = row_dicts(await db.execute(query.order_by(QuizAttemptModel.id.desc()).limit(limit + 1)))
+        attempts, next_cursor = paginate(rows, limit, lambda attempt: [attempt["id"]])
 
         logger.info(f"Retrieved {len(attempts)} attempts for user {user_id} and quiz {quiz_id}")
-        return attempts
+        return json_response({"attempts": attempts, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving quiz attempts: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/user/{user_id}/course/{course_id}", response_model=List[QuizSchema])
-async def get_user_quizzes_for_course(user_id: str, course_id: str, db: Session = Depends(get_db)):
+async def get_user_quizzes_for_course(user_id: str, course_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get all quizzes for a specific course that a user can access"""
     try:
-        quizzes = db.query(QuizModel).filter(QuizModel.course_id == course_id).all()
+        quizzes = (await db.execute(
+            select(QuizModel).where(QuizModel.course_id == course_id)
+        )).scalars().all()
 
         logger.info(f"Retrieved {len(quizzes)} quizzes for course {course_id} for user {user_id}")
         return quizzes
@@ -1,146 +1,118 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 import logging
-from sqlalchemy import or_
+from sqlalchemy import select
 
-from config.database import get_db
+from config.database import get_read_db
 from models import Course as CourseModel, Chapter as ChapterModel
 from schemas import SearchRequest, SearchResponse
+from services.search_index import search_index
 
 router = APIRouter()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def _course_results(db: AsyncSession, hits, top_score: float) -> List[Dict[str, Any]]:
+    """Hydrate ranked (course_id, score) index hits into result dicts, keeping rank order"""
+    if not hits:
+        return []
+    rows = (await db.execute(
+        select(CourseModel).where(CourseModel.id.in_([course_id for course_id, _ in hits]))
+    )).scalars().all()
+    courses = {course.id: course for course in rows}
+
+    results = []
+    for course_id, score in hits:
+        course = courses.get(course_id)
+        if not course:
+            continue
+        results.append({
+            "type": "course",
+            "id": course.id,
+            "title": course.title,
+            "description": course.description,
+            "relevance": round(score / top_score, 4)
+        })
+    return results
+
+
+async def _chapter_results(db: AsyncSession, hits, top_score: float) -> List[Dict[str, Any]]:
+    """Hydrate ranked (chapter_id, score) index hits into result dicts, keeping rank order"""
+    if not hits:
+        return []
+    # One query for the whole page: chapter columns plus the owning course title
+    rows = (await db.execute(
+        select(ChapterModel.id, ChapterModel.title, ChapterModel.course_id, CourseModel.title.label("course_title"))
+        .outerjoin(CourseModel, CourseModel.id == ChapterModel.course_id)
+        .where(ChapterModel.id.in_([chapter_id for chapter_id, _ in hits]))
+    )).all()
+    chapters = {row.id: row for row in rows}
+
+    results = []
+    for chapter_id, score in hits:
+        chapter = chapters.get(chapter_id)
+        if not chapter:
+            continue
+        results.append({
+            "type": "chapter",
+            "id": chapter.id,
+            "title": chapter.title,
+            "course_id": chapter.course_id,
+            "course_title": chapter.course_title or "Unknown Course",
+            "relevance": round(score / top_score, 4)
+        })
+    return results
+
+
 @router.get("/", response_model=SearchResponse)
-async def search_content(query: str, limit: int = 10, db: Session = Depends(get_db)):
+async def search_content(query: str, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
     """Search for content across courses and chapters"""
     try:
-        results = []
-
-        # Search in courses
-        course_results = db.query(CourseModel).filter(
-            or_(
-                CourseModel.title.ilike(f"%{query}%"),
-                CourseModel.description.ilike(f"%{query}%")
-            )
-        ).limit(limit).all()
-
-        for course in course_results:
-            results.append({
-                "type": "course",
-                "id": course.id,
-                "title": course.title,
-                "description": course.description,
-                "relevance": 0.9
-            })
-
-        # Search in chapters
-        chapter_results = db.query(ChapterModel).filter(
-            or_(
-                ChapterModel.title.ilike(f"%{query}%"),
-                ChapterModel.content.ilike(f"%{query}%")
-            )
-        ).limit(limit).all()
-
-        for chapter in chapter_results:
-            # Find the associated course
-            course = db.query(CourseModel).filter(CourseModel.id == chapter.course_id).first()
-
-            relevance = 0.8 if query.lower() in chapter.title.lower() else 0.6
-
-            results.append({
-                "type": "chapter",
-                "id": chapter.id,
-                "title": chapter.title,
-                "course_id": chapter.course_id,
-                "course_title": course.title if course else "Unknown Course",
-                "relevance": relevance
-            })
+        # Rank both document types, then keep the overall top `limit` by BM25 score
+        hits = [("course", doc_id, score) for doc_id, score in search_index.search_courses(query, limit)]
+        hits += [("chapter", doc_id, score) for doc_id, score in search_index.search_chapters(query, limit)]
+        hits.sort(key=lambda hit: hit[2], reverse=True)
+        hits = hits[:limit]
+        top_score = hits[0][2] if hits else 1.0
+
+        results = await _course_results(db, [(i, sc) for t, i, sc in hits if t == "course"], top_score)
+        results += await _chapter_results(db, [(i, sc) for t, i, sc in hits if t == "chapter"], top_score)
 
         # Sort by relevance
         results.sort(key=lambda x: x["relevance"], reverse=True)
 
-        # Limit results
-        limited_results = results[:limit]
-
-        logger.info(f"Search query '{query}' returned {len(limited_results)} results")
-        return SearchResponse(results=limited_results)
+        logger.info(f"Search query '{query}' returned {len(results)} results")
+        return SearchResponse(results=results)
     except Exception as e:
         logger.error(f"Error performing search: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/courses", response_model=SearchResponse)
-async def search_courses(query: str, limit: int = 10, db: Session = Depends(get_db)):
+async def search_courses(query: str, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
     """Search specifically for courses"""
     try:
-        results = []
-
-        # Search in courses only
-        course_results = db.query(CourseModel).filter(
-            or_(
-                CourseModel.title.ilike(f"%{query}%"),
-                CourseModel.description.ilike(f"%{query}%")
-            )
-        ).limit(limit).all()
-
-        for course in course_results:
-            results.append({
-                "type": "course",
-                "id": course.id,
-                "title": course.title,
-                "description": course.description,
-                "relevance": 0.9
-            })
-
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance"], reverse=True)
+        hits = search_index.search_courses(query, limit)
+        results = await _course_results(db, hits, hits[0][1] if hits else 1.0)
 
         logger.info(f"Course search query '{query}' returned {len(results)} results")
-        return SearchResponse(results=results[:limit])
+        return SearchResponse(results=results)
     except Exception as e:
         logger.error(f"Error performing course search: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.get("/chapters", response_model=SearchResponse)
-async def search_chapters(query: str, limit: int = 10, db: Session = Depends(get_db)):
+async def search_chapters(query: str, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
     """Search specifically for chapters"""
     try:
-        results = []
-
-        # Search in chapters only
-        chapter_results = db.query(ChapterModel).filter(
-            or_(
-                ChapterModel.title.ilike(f"%{query}%"),
-                ChapterModel.content.ilike(f"%{query}%")
-            )
-        ).limit(limit).all()
-
-        for chapter in chapter_results:
-            # Find the associated course
-            course = db.query(CourseModel).filter(CourseModel.id == chapter.course_id).first()
-
-            relevance = 0.8 if query.lower() in chapter.title.lower() else 0.6
-
-            results.append({
-                "type": "chapter",
-                "id": chapter.id,
-                "title": chapter.title,
-                "course_id": chapter.course_id,
-                "course_title": course.title if course else "Unknown Course",
-                "relevance": relevance
-            })
-
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance"], reverse=True)
+        hits = search_index.search_chapters(query, limit)
+        results = await _chapter_results(db, hits, hits[0][1] if hits else 1.0)
 
         logger.info(f"Chapter search query '{query}' returned {len(results)} results")
-        return SearchResponse(results=results[:limit])
+        return SearchResponse(results=results)
     except Exception as e:
         logger.error(f"Error performing chapter search: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
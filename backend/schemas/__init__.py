@@ -41,6 +41,26 @@ class Chapter(ChapterBase):
         from_attributes = True
 
 
+class ChapterNeighbor(BaseModel):
+    id: str
+    course_id: str
+    title: str
+    order: int
+    next_chapter_id: Optional[str] = None
+    prev_chapter_id: Optional[str] = None
+    content: Optional[str] = None  # Only when the bundle is requested with include_content
+
+    class Config:
+        from_attributes = True
+
+
+class ChapterBundle(BaseModel):
+    """A chapter with its neighbors, so the reader can turn pages without another request"""
+    chapter: Chapter
+    next: Optional[ChapterNeighbor] = None
+    previous: Optional[ChapterNeighbor] = None
+
+
 class UserBase(BaseModel):
     email: str
     username: str
@@ -117,6 +137,14 @@ class QuizResult(BaseModel):
     feedback: str
 
 
+class QuizBatchSubmission(BaseModel):
+    submissions: List[QuizSubmission]
+
+
+class QuizBatchResult(BaseModel):
+    results: List[QuizResult]
+
+
 class QuizAttemptBase(BaseModel):
     user_id: str
     quiz_id: str
@@ -137,6 +165,11 @@ class QuizAttempt(QuizAttemptBase):
         from_attributes = True
 
 
+class QuizAttemptPage(BaseModel):
+    attempts: List[QuizAttempt]
+    next_cursor: Optional[str] = None
+
+
 class SubscriptionType(str, Enum):
     FREE = "free"
     PREMIUM = "premium"
@@ -0,0 +1,22 @@
+"""
+Guard for admin-only endpoints (course ingestion, full data exports).
+
+There are no user accounts to check against, so admin calls carry a shared
+secret: the ``X-Admin-Token`` header must equal ``ADMIN_TOKEN``. Without
+``ADMIN_TOKEN`` set, admin endpoints are disabled and always answer 403;
+the CLIs (``python -m services.course_ingest``) keep working.
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
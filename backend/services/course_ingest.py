@@ -0,0 +1,339 @@
+"""
+Bulk ingestion of Markdown courses.
+
+A bundle is a directory or a tarball (``.tar``, ``.tar.gz``, ...) holding one
+folder per course. Each course folder has a ``course.json`` manifest and one
+Markdown file per chapter::
+
+    python-intro/
+        course.json     {"id": "course-python-intro", "title": "...",
+                         "description": "...", "prerequisites": [],
+                         "chapters": ["01-intro.md", {"file": "02-basics.md", "id": "ch2-basics"}]}
+        01-intro.md
+        02-basics.md
+
+``chapters`` sets the order and may give ids and titles. Without it, every
+``.md`` file in the folder is a chapter, in file name order. Chapter ids
+default to ``<course id>-<file stem>`` and titles to the first ``# `` heading.
+``next_chapter_id``/``prev_chapter_id`` come from that order.
+
+Courses and chapters are upserted by id with executemany statements in
+batches of ``INGEST_BATCH_SIZE``, one transaction per batch. Manifests are
+validated before anything is written; after that only the chapter lists
+(ids and paths, a few hundred bytes per chapter) and one batch of content
+are in memory. Compressed tarballs are first unpacked to a temporary plain
+tar, since reading gzip members out of archive order means re-decompressing.
+Archive and file reads run in a worker thread, never on the event loop.
+
+Chapters missing from a new manifest are not deleted, since completions and
+quizzes may still point at them; their ids are logged and returned in
+``IngestReport.stale_chapters``. Bulk statements bypass the ORM session
+hooks, so after each commit the search index, course structure cache and
+response cache are updated here directly.
+
+CLI (from backend/), updating the persisted search index as well:
+    python -m services.course_ingest path/to/bundle.tar.gz
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import posixpath
+import re
+import tarfile
+import tempfile
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.database import AsyncSessionLocal
+from models import Chapter as ChapterModel, Course as CourseModel
+from services.course_structure import course_structure
+from services.response_cache import response_cache
+from services.search_index import database_version, search_index
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+
+MANIFEST_NAME = "course.json"
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+class IngestError(ValueError):
+    """The bundle is malformed (missing manifest fields, unknown chapter files, ...)"""
+
+
+class IngestReport(NamedTuple):
+    courses: int
+    chapters: int
+    batches: int
+    stale_chapters: List[str]
+
+
+class _ChapterEntry(NamedTuple):
+    id: str
+    path: str
+    title: Optional[str]
+
+
+class _Bundle:
+    """Read access to the files of a directory or tarball, by '/'-separated path"""
+
+    def __init__(
+        self,
+        files: Dict[str, Union[str, tarfile.TarInfo]],
+        archive: Optional[tarfile.TarFile] = None,
+        temp_path: Optional[str] = None,
+    ):
+        # Bundle path -> file system path, or tar member when reading an archive
+        self._files = files
+        self._archive = archive
+        self._temp_path = temp_path
+        self._markdown: Dict[str, List[str]] = {}
+        for name in sorted(files):
+            if name.endswith(".md"):
+                self._markdown.setdefault(posixpath.dirname(name), []).append(posixpath.basename(name))
+
+    @classmethod
+    def open(cls, path: str) -> "_Bundle":
+        if os.path.isdir(path):
+            files = {}
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    files[os.path.relpath(full_path, path).replace(os.sep, "/")] = full_path
+            return cls(files)
+        if os.path.isfile(path) and tarfile.is_tarfile(path):
+            temp_path = None
+            try:
+                archive = tarfile.open(path, "r:")
+            except tarfile.ReadError:
+                # Compressed streams cannot seek back cheaply; unpack to a plain tar once
+                temp_path = _decompress(path)
+                archive = tarfile.open(temp_path, "r:")
+            # Random access mode keeps one header per member, never member contents
+            files = {posixpath.normpath(member.name): member for member in archive.getmembers() if member.isfile()}
+            return cls(files, archive, temp_path)
+        raise IngestError(f"Not a directory or tar archive: {path}")
+
+    def course_dirs(self) -> List[str]:
+        return sorted(posixpath.dirname(name) for name in self._files if posixpath.basename(name) == MANIFEST_NAME)
+
+    def markdown_files(self, directory: str) -> List[str]:
+        return self._markdown.get(directory, [])
+
+    def exists(self, path: str) -> bool:
+        return path in self._files
+
+    def read_text(self, path: str) -> str:
+        source = self._files[path]
+        if self._archive is not None:
+            return self._archive.extractfile(source).read().decode("utf-8")
+        with open(source, "rb") as fh:
+            return fh.read().decode("utf-8")
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+        if self._temp_path is not None:
+            os.unlink(self._temp_path)
+
+
+def _decompress(path: str) -> str:
+    """Copy a compressed tarball into an uncompressed temporary one, member by member"""
+    fd, temp_path = tempfile.mkstemp(suffix=".tar")
+    os.close(fd)
+    try:
+        with tarfile.open(path, "r|*") as source, tarfile.open(temp_path, "w") as target:
+            for member in source:
+                target.addfile(member, source.extractfile(member) if member.isfile() else None)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _slug(value: str) -> str:
+    return _SLUG_RE.sub("-", value.lower()).strip("-")
+
+
+def _markdown_title(content: str) -> Optional[str]:
+    for line in content.splitlines():
+        if line.startswith("# "):
+            return line[2:].strip()
+    return None
+
+
+def _load_manifest(bundle: _Bundle, directory: str) -> dict:
+    path = posixpath.join(directory, MANIFEST_NAME) if directory else MANIFEST_NAME
+    try:
+        manifest = json.loads(bundle.read_text(path))
+    except ValueError as e:
+        raise IngestError(f"{path}: invalid JSON ({e})")
+    if not isinstance(manifest, dict) or not manifest.get("id") or not manifest.get("title"):
+        raise IngestError(f"{path}: manifest needs an 'id' and a 'title'")
+    return manifest
+
+
+def _chapter_entries(bundle: _Bundle, directory: str, manifest: dict) -> List[_ChapterEntry]:
+    listed = manifest.get("chapters")
+    if listed is None:
+        listed = bundle.markdown_files(directory)
+    entries = []
+    for item in listed:
+        if isinstance(item, str):
+            item = {"file": item}
+        filename = item.get("file")
+        if not filename:
+            raise IngestError(f"{manifest['id']}: chapter entry without a 'file'")
+        path = posixpath.normpath(posixpath.join(directory, filename))
+        if not bundle.exists(path):
+            raise IngestError(f"{manifest['id']}: chapter file not found: {filename}")
+        stem = posixpath.splitext(posixpath.basename(filename))[0]
+        entries.append(_ChapterEntry(
+            id=item.get("id") or f"{manifest['id']}-{_slug(stem)}",
+            path=path,
+            title=item.get("title"),
+        ))
+    ids = [entry.id for entry in entries]
+    if len(set(ids)) != len(ids):
+        raise IngestError(f"{manifest['id']}: duplicate chapter ids")
+    return entries
+
+
+def _read_manifests(bundle: _Bundle, path: str) -> List[tuple]:
+    directories = bundle.course_dirs()
+    if not directories:
+        raise IngestError(f"No {MANIFEST_NAME} found in {path}")
+    courses = []
+    for directory in directories:
+        manifest = _load_manifest(bundle, directory)
+        courses.append((directory, manifest, _chapter_entries(bundle, directory, manifest)))
+    return courses
+
+
+def _chapter_batches(
+    bundle: _Bundle, course_id: str, entries: List[_ChapterEntry], batch_size: int
+) -> Iterator[List[dict]]:
+    """Chapter rows in order with their links, ``batch_size`` at a time;
+    content is read one file at a time"""
+    batch = []
+    for position, entry in enumerate(entries):
+        content = bundle.read_text(entry.path)
+        batch.append({
+            "id": entry.id,
+            "course_id": course_id,
+            "title": entry.title or _markdown_title(content) or posixpath.splitext(posixpath.basename(entry.path))[0],
+            "content": content,
+            "order": position + 1,
+            "prev_chapter_id": entries[position - 1].id if position > 0 else None,
+            "next_chapter_id": entries[position + 1].id if position + 1 < len(entries) else None,
+        })
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _upsert(dialect_name: str, model, update_columns):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={**{column: stmt.excluded[column] for column in update_columns}, "updated_at": func.now()},
+    )
+
+
+_COURSE_COLUMNS = ("title", "description", "prerequisites")
+_CHAPTER_COLUMNS = ("course_id", "title", "content", "order", "prev_chapter_id", "next_chapter_id")
+
+
+async def ingest(path: str, session_factory=AsyncSessionLocal, batch_size: int = INGEST_BATCH_SIZE) -> IngestReport:
+    """Upsert every course in the bundle at ``path``; manifests are validated
+    up front so a malformed bundle writes nothing"""
+    bundle = await asyncio.to_thread(_Bundle.open, path)
+    try:
+        return await _ingest_bundle(bundle, path, session_factory, batch_size)
+    finally:
+        await asyncio.to_thread(bundle.close)
+
+
+async def _ingest_bundle(bundle: _Bundle, path: str, session_factory, batch_size: int) -> IngestReport:
+    courses = await asyncio.to_thread(_read_manifests, bundle, path)
+
+    chapters = batches = 0
+    stale_chapters = []
+    async with session_factory() as db:
+        dialect_name = db.bind.dialect.name
+        course_stmt = _upsert(dialect_name, CourseModel, _COURSE_COLUMNS)
+        chapter_stmt = _upsert(dialect_name, ChapterModel, _CHAPTER_COLUMNS)
+
+        for directory, manifest, entries in courses:
+            course_id = manifest["id"]
+            course_row = {
+                "id": course_id,
+                "title": manifest["title"],
+                "description": manifest.get("description", ""),
+                "prerequisites": manifest.get("prerequisites", []),
+            }
+            await db.execute(course_stmt, [course_row])
+            await db.commit()
+            search_index.index_course(course_id, course_row["title"], course_row["description"])
+
+            # The worker thread reads one batch of files while the loop stays free
+            rows = _chapter_batches(bundle, course_id, entries, batch_size)
+            while batch := await asyncio.to_thread(next, rows, None):
+                await _write_chapters(db, chapter_stmt, batch)
+                chapters += len(batch)
+                batches += 1
+
+            ids = {entry.id for entry in entries}
+            existing = await db.execute(select(ChapterModel.id).where(ChapterModel.course_id == course_id))
+            stale = sorted(chapter_id for chapter_id in existing.scalars() if chapter_id not in ids)
+            if stale:
+                logger.warning(f"Course {course_id}: kept {len(stale)} chapters missing from the manifest: {stale}")
+                stale_chapters.extend(stale)
+
+            course_structure.invalidate(course_id)
+            logger.info(f"Ingested course {course_id} ({len(entries)} chapters) from {directory or path}")
+
+    response_cache.invalidate()
+    return IngestReport(courses=len(courses), chapters=chapters, batches=batches, stale_chapters=stale_chapters)
+
+
+async def _write_chapters(db, chapter_stmt, rows: List[dict]):
+    await db.execute(chapter_stmt, rows)
+    await db.commit()
+    for row in rows:
+        search_index.index_chapter(row["id"], row["title"], row["content"])
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Ingest a directory or tarball of Markdown courses")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from config.migrations import run_migrations
+
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
+    # Extend the persisted index in place when it is current; otherwise rebuild it afterwards
+    async with AsyncSessionLocal() as db:
+        current = search_index.load() and search_index.version == await database_version(db)
+    report = await ingest(args.path, batch_size=args.batch_size)
+    async with AsyncSessionLocal() as db:
+        if current:
+            search_index.version = await database_version(db)
+        else:
+            await search_index.rebuild(db)
+    search_index.save()
+    print(json.dumps(report._asdict()))
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,104 @@
+"""
+In-process cache of course structure: ordered chapter ids, chapter id -> position
+and chapter count per course.
+
+Entries are loaded on first use, from the primary even when the caller holds a
+replica session, and dropped when a committed write touches a chapter of
+that course. Writes that bypass the ORM unit of work (bulk inserts,
+raw SQL) must call ``course_structure.invalidate`` themselves.
+"""
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, select
+
+from config.database import primary_session
+from models import Chapter as ChapterModel
+from utils.invalidation import register_invalidation
+
+
+class CourseStructure(NamedTuple):
+    chapter_ids: Tuple[str, ...]
+    positions: Dict[str, int]
+
+    @property
+    def chapter_count(self) -> int:
+        return len(self.chapter_ids)
+
+    def position(self, chapter_id: str) -> Optional[int]:
+        """Zero-based position of ``chapter_id`` in the course, or None"""
+        return self.positions.get(chapter_id)
+
+    def completion_mask(self, chapter_ids: Iterable[str]) -> int:
+        """Bitset of completed chapters: bit n is the chapter at position n.
+        Ids that are not chapters of this course are ignored."""
+        mask = 0
+        for chapter_id in chapter_ids:
+            position = self.positions.get(chapter_id)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def completion_percentage(self, mask: int) -> float:
+        return (mask.bit_count() / self.chapter_count) * 100 if self.chapter_count > 0 else 0
+
+
+def _build(chapter_ids: Iterable[str]) -> CourseStructure:
+    chapter_ids = tuple(chapter_ids)
+    return CourseStructure(chapter_ids, {chapter_id: idx for idx, chapter_id in enumerate(chapter_ids)})
+
+
+class CourseStructureCache:
+    def __init__(self):
+        self._entries: Dict[str, CourseStructure] = {}
+
+    async def get(self, db, course_id: str) -> CourseStructure:
+        entry = self._entries.get(course_id)
+        if entry is None:
+            entry = (await self.get_many(db, [course_id]))[course_id]
+        return entry
+
+    async def get_many(self, db, course_ids: Iterable[str]) -> Dict[str, CourseStructure]:
+        """Structures for several courses, loading every miss in one query"""
+        course_ids = list(dict.fromkeys(course_ids))
+        missing = [course_id for course_id in course_ids if course_id not in self._entries]
+        if missing:
+            grouped: Dict[str, list] = {course_id: [] for course_id in missing}
+            # Misses read the primary: entries live until the next write, so one
+            # loaded from a lagging replica would stay stale that long
+            async with primary_session(db) as primary:
+                rows = (await primary.execute(
+                    select(ChapterModel.course_id, ChapterModel.id)
+                    .where(ChapterModel.course_id.in_(missing))
+                    .order_by(ChapterModel.course_id, ChapterModel.order)
+                )).all()
+            for course_id, chapter_id in rows:
+                grouped[course_id].append(chapter_id)
+            for course_id, chapter_ids in grouped.items():
+                self._entries[course_id] = _build(chapter_ids)
+        return {course_id: self._entries[course_id] for course_id in course_ids}
+
+    def invalidate(self, course_id: Optional[str] = None):
+        """Drop one course, or everything when ``course_id`` is None"""
+        if course_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(course_id, None)
+
+
+course_structure = CourseStructureCache()
+
+
+# Drop cached structures for courses whose chapters changed in a committed transaction
+def _structure_changes(obj, change: str):
+    if not isinstance(obj, ChapterModel):
+        return ()
+    # A chapter moved between courses also changes its old course
+    return [obj.course_id, *inspect(obj).attrs.course_id.history.deleted]
+
+
+def _invalidate_structures(course_ids):
+    for course_id in set(course_ids):
+        course_structure.invalidate(course_id)
+
+
+register_invalidation("course_structure", _structure_changes, _invalidate_structures)
@@ -0,0 +1,180 @@
+"""
+Entitlements: which plan a user is on, for the freemium gate.
+
+``entitlements`` caches each user's active subscriptions (plan and expiry as
+a POSIX timestamp) in process for ``ENTITLEMENT_TTL_SECONDS``. Users with no
+active subscription are cached too, as an empty entry, so the free majority
+does not query the database on every gated call. A cached check costs no
+database round trip: expiry is compared against the clock at lookup, so a
+plan that lapses while cached stops counting immediately.
+
+Entries are dropped when a committed write touches one of the user's
+subscriptions. Writes that bypass the ORM unit of work, and writes made by
+other processes, are picked up when the TTL runs out.
+
+``get_entitlement`` and ``require_premium`` are FastAPI dependencies; the
+user comes from the ``user_id`` path or query parameter, or the JSON body.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import get_db
+from models import Subscription as SubscriptionModel
+from utils.invalidation import register_invalidation
+
+ENTITLEMENT_TTL_SECONDS = float(os.getenv("ENTITLEMENT_TTL_SECONDS", "60"))
+ENTITLEMENT_CACHE_SIZE = int(os.getenv("ENTITLEMENT_CACHE_SIZE", "100000"))
+
+FREE_PLAN = "free"
+# Higher ranks win when a user has several active subscriptions
+PLAN_RANKS = {FREE_PLAN: 0, "premium": 1, "pro": 2, "team": 3}
+
+
+class Plan(NamedTuple):
+    plan_type: str
+    # POSIX timestamp, or None for a plan that does not expire
+    expires_at: Optional[float]
+
+    def active_at(self, now: float) -> bool:
+        return self.expires_at is None or self.expires_at > now
+
+
+class Entitlement(NamedTuple):
+    user_id: str
+    plan_type: str
+    expires_at: Optional[datetime]
+
+    @property
+    def has_premium(self) -> bool:
+        return self.plan_type != FREE_PLAN
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _rank(plan: Plan) -> tuple:
+    # Unknown plan types rank just above free; a later expiry breaks ties
+    return (PLAN_RANKS.get(plan.plan_type, 1), float("inf") if plan.expires_at is None else plan.expires_at)
+
+
+def _resolve(user_id: str, plans: Tuple[Plan, ...], now: float) -> Entitlement:
+    """The best plan (``plans`` is sorted best first) still running at ``now``, or the free plan"""
+    best = next((plan for plan in plans if plan.active_at(now)), None)
+    if best is None:
+        return Entitlement(user_id, FREE_PLAN, None)
+    expires_at = datetime.fromtimestamp(best.expires_at, timezone.utc) if best.expires_at is not None else None
+    return Entitlement(user_id, best.plan_type, expires_at)
+
+
+class EntitlementCache:
+    def __init__(self, ttl_seconds: float = ENTITLEMENT_TTL_SECONDS, max_entries: int = ENTITLEMENT_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # user id -> (monotonic time the entry goes stale, active plans sorted best first)
+        self._entries: Dict[str, Tuple[float, Tuple[Plan, ...]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db, user_id: str) -> Entitlement:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            plans = entry[1]
+        else:
+            self.misses += 1
+            plans = await self._load(db, user_id)
+        return _resolve(user_id, plans, time.time())
+
+    async def _load(self, db, user_id: str) -> Tuple[Plan, ...]:
+        rows = (await db.execute(
+            select(SubscriptionModel.plan_type, SubscriptionModel.end_date).where(
+                SubscriptionModel.user_id == user_id,
+                SubscriptionModel.is_active == True
+            )
+        )).all()
+        now = time.time()
+        plans = sorted(
+            (
+                Plan(plan_type or FREE_PLAN, _timestamp(end_date))
+                for plan_type, end_date in rows if (plan_type or FREE_PLAN) != FREE_PLAN
+            ),
+            key=_rank, reverse=True,
+        )
+        # Expired plans would never count again; leave them out of the entry
+        plans = tuple(plan for plan in plans if plan.active_at(now))
+        if len(self._entries) >= self.max_entries:
+            self._prune()
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, plans)
+        return plans
+
+    def _prune(self):
+        now = time.monotonic()
+        self._entries = {user_id: entry for user_id, entry in self._entries.items() if entry[0] > now}
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one user, or everything when ``user_id`` is None"""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+entitlements = EntitlementCache()
+
+
+async def _request_user_id(request: Request) -> Optional[str]:
+    user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+    if user_id is None and request.headers.get("content-type", "").startswith("application/json"):
+        # The body has already been read and parsed for the endpoint; this reuses it
+        body = await request.json()
+        if isinstance(body, dict):
+            user_id = body.get("user_id")
+    return user_id if isinstance(user_id, str) else None
+
+
+# Misses read the primary: a lagging replica could re-cache a plan that was
+# just cancelled for a whole TTL
+async def get_entitlement(request: Request, db: AsyncSession = Depends(get_db)) -> Entitlement:
+    user_id = await _request_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="user_id is required")
+    return await entitlements.get(db, user_id)
+
+
+async def require_premium(entitlement: Entitlement = Depends(get_entitlement)) -> Entitlement:
+    if not entitlement.has_premium:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Premium subscription required")
+    return entitlement
+
+
+# Drop entries of users whose subscriptions changed in a committed transaction
+def _subscription_changes(obj, change: str):
+    if not isinstance(obj, SubscriptionModel):
+        return ()
+    # A subscription moved between users also changes its old user
+    return [obj.user_id, *inspect(obj).attrs.user_id.history.deleted]
+
+
+def _invalidate_entitlements(user_ids):
+    for user_id in set(user_ids):
+        entitlements.invalidate(user_id)
+
+
+register_invalidation("entitlements", _subscription_changes, _invalidate_entitlements)
@@ -0,0 +1,432 @@
+"""
+LLM client for the hybrid (premium) features.
+
+``llm_client.complete`` sends one prompt through a pluggable backend:
+
+- ``StubBackend`` (``LLM_BACKEND=stub``, the default) answers in process
+  with the deterministic replies of ``services.llm_stub``,
+- ``HTTPBackend`` (``LLM_BACKEND=http``) posts to a Messages API endpoint at
+  ``LLM_BASE_URL`` over one pooled ``httpx.AsyncClient`` per process. Point
+  it at ``python -m services.llm_stub`` to load-test without a provider.
+
+Calls are limited per plan tier by semaphores (``LLM_CONCURRENCY``, e.g.
+``premium=4,pro=8,team=16,default=4``), so one tier cannot starve the
+others and a slow provider cannot pile up unbounded requests in a worker.
+A call that waits longer than ``LLM_QUEUE_TIMEOUT_SECONDS`` for a slot fails
+with ``LLMOverloaded``. Each attempt is bounded by ``LLM_TIMEOUT_SECONDS``;
+timeouts, connection errors, 429 and 5xx are retried up to
+``LLM_MAX_RETRIES`` times with full-jitter exponential backoff (never sooner
+than a ``Retry-After`` asks).
+
+Every call is recorded: tokens, latency, queue wait, attempts and outcome go
+to Prometheus histograms (served with the request metrics at ``/metrics``)
+and to a ring of the last ``LLM_RECENT_CALLS`` calls.
+
+``refine`` is what the hybrid endpoints use: the model is asked to improve a
+draft response computed by the endpoint's own heuristics, and the draft is
+returned unchanged when the call fails or the reply does not validate.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Dict, NamedTuple, Optional, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from services import llm_stub
+from services.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "stub").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.anthropic.com")
+LLM_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
+LLM_API_VERSION = os.getenv("LLM_API_VERSION", "2023-06-01")
+LLM_MODEL = os.getenv("LLM_MODEL", "claude-3-5-sonnet-latest")
+LLM_CONCURRENCY = os.getenv("LLM_CONCURRENCY", "premium=4,pro=8,team=16,default=4")
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_RECENT_CALLS = int(os.getenv("LLM_RECENT_CALLS", "1000"))
+
+DEFAULT_TIER = "default"
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+LLM_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1_000, 2_000, 5_000, 10_000, 20_000)
+LLM_LABEL_NAMES = ("feature", "tier", "outcome")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class LLMError(Exception):
+    """An LLM call that did not produce a completion"""
+
+    outcome = "error"
+
+
+class LLMOverloaded(LLMError):
+    """No concurrency slot for the tier within the queue timeout"""
+
+    outcome = "overloaded"
+
+
+class LLMTimeout(LLMError):
+    outcome = "timeout"
+
+
+class _Retryable(Exception):
+    def __init__(self, error: LLMError, retry_after: Optional[float] = None):
+        super().__init__(str(error))
+        self.error = error
+        self.retry_after = retry_after
+
+
+class Completion(NamedTuple):
+    text: str
+    input_tokens: int
+    output_tokens: int
+    stop_reason: Optional[str] = None
+
+
+class LLMCall(NamedTuple):
+    feature: str
+    tier: str
+    model: str
+    outcome: str
+    attempts: int
+    input_tokens: int
+    output_tokens: int
+    latency_ms: float
+    queued_ms: float
+    finished_at: float
+
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    """``"premium=4,pro=8"`` -> ``{"premium": 4, "pro": 8}``"""
+    limits = {}
+    for item in spec.split(","):
+        tier, _, limit = item.strip().partition("=")
+        if tier:
+            limits[tier.strip()] = max(1, int(limit))
+    limits.setdefault(DEFAULT_TIER, 1)
+    return limits
+
+
+def messages_payload(model: str, system: str, prompt: str, max_tokens: int) -> dict:
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def parse_messages_response(body: dict) -> Completion:
+    text = "".join(block.get("text", "") for block in body.get("content", []) if block.get("type") == "text")
+    usage = body.get("usage") or {}
+    return Completion(text, int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0)), body.get("stop_reason"))
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMBackend:
+    """Transport for one completion attempt; retries and limits live in ``LLMClient``"""
+
+    async def complete(self, model: str, system: str, prompt: str, max_tokens: int) -> Completion:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class StubBackend(LLMBackend):
+    """Deterministic replies from ``services.llm_stub``, in process"""
+
+    def __init__(self, latency: llm_stub.StubLatency = llm_stub.StubLatency()):
+        self.latency = latency
+
+    async def complete(self, model: str, system: str, prompt: str, max_tokens: int) -> Completion:
+        payload = messages_payload(model, system, prompt, max_tokens)
+        body = llm_stub.reply(payload)
+        delay = llm_stub.latency_seconds(payload, body, self.latency)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return parse_messages_response(body)
+
+
+class HTTPBackend(LLMBackend):
+    """Messages API over a pooled ``httpx.AsyncClient``, created on first use"""
+
+    def __init__(
+        self,
+        base_url: str = LLM_BASE_URL,
+        api_key: str = LLM_API_KEY,
+        timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            # Imported here: only workers that talk to a provider pay for httpx at startup
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"x-api-key": self.api_key, "anthropic-version": LLM_API_VERSION},
+                timeout=httpx.Timeout(self.timeout_seconds, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def complete(self, model: str, system: str, prompt: str, max_tokens: int) -> Completion:
+        import httpx
+
+        try:
+            response = await self._http().post("/v1/messages", json=messages_payload(model, system, prompt, max_tokens))
+        except httpx.TimeoutException as e:
+            raise _Retryable(LLMTimeout(f"LLM request timed out: {e!r}"))
+        except httpx.TransportError as e:
+            raise _Retryable(LLMError(f"LLM connection failed: {e!r}"))
+        if response.status_code in RETRYABLE_STATUSES:
+            raise _Retryable(
+                LLMError(f"LLM provider returned {response.status_code}"),
+                _retry_after(response.headers.get("retry-after")),
+            )
+        if response.status_code >= 400:
+            raise LLMError(f"LLM provider returned {response.status_code}: {response.text[:200]}")
+        return parse_messages_response(response.json())
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LLMMetrics:
+    def __init__(self):
+        self.latency = Histogram(
+            "llm_call_duration_seconds", "Time for an LLM call, including retries but not queueing",
+            LLM_LATENCY_BUCKETS, LLM_LABEL_NAMES,
+        )
+        self.queued = Histogram(
+            "llm_call_queued_seconds", "Time an LLM call waited for a concurrency slot of its tier",
+            LLM_LATENCY_BUCKETS, LLM_LABEL_NAMES,
+        )
+        self.input_tokens = Histogram(
+            "llm_call_input_tokens", "Prompt tokens billed for an LLM call", TOKEN_BUCKETS, LLM_LABEL_NAMES
+        )
+        self.output_tokens = Histogram(
+            "llm_call_output_tokens", "Completion tokens billed for an LLM call", TOKEN_BUCKETS, LLM_LABEL_NAMES
+        )
+
+    def observe(self, call: LLMCall):
+        labels = (call.feature, call.tier, call.outcome)
+        self.latency.observe(labels, call.latency_ms / 1000)
+        self.queued.observe(labels, call.queued_ms / 1000)
+        self.input_tokens.observe(labels, call.input_tokens)
+        self.output_tokens.observe(labels, call.output_tokens)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.latency, self.queued, self.input_tokens, self.output_tokens):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+class LLMClient:
+    def __init__(
+        self,
+        backend: LLMBackend,
+        concurrency: Optional[Dict[str, int]] = None,
+        model: str = LLM_MODEL,
+        timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+        queue_timeout_seconds: float = LLM_QUEUE_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        recent_calls: int = LLM_RECENT_CALLS,
+    ):
+        self.backend = backend
+        self.concurrency = concurrency or parse_concurrency(LLM_CONCURRENCY)
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.metrics = LLMMetrics()
+        self.recent: "deque[LLMCall]" = deque(maxlen=recent_calls)
+        self.outcomes: Counter = Counter()
+        self.tokens: Counter = Counter()
+        self.invalid_replies = 0
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Counter = Counter()
+        self._waiting: Counter = Counter()
+
+    def configure(self, backend: Optional[LLMBackend] = None, concurrency: Optional[Dict[str, int]] = None):
+        if backend is not None:
+            self.backend = backend
+        if concurrency is not None:
+            self.concurrency = concurrency
+            self._semaphores.clear()
+
+    def _tier(self, tier: str) -> str:
+        return tier if tier in self.concurrency else DEFAULT_TIER
+
+    def _semaphore(self, tier: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(tier)
+        if semaphore is None:
+            semaphore = self._semaphores[tier] = asyncio.Semaphore(self.concurrency[tier])
+        return semaphore
+
+    async def complete(self, feature: str, tier: str, system: str, prompt: str, max_tokens: int) -> Completion:
+        """One completion within ``tier``'s concurrency limit, retried on transient failures"""
+        tier = self._tier(tier)
+        semaphore = self._semaphore(tier)
+        started = time.perf_counter()
+        self._waiting[tier] += 1
+        try:
+            # Not wait_for: it runs acquire() as a separate task, and a timeout or
+            # cancellation landing just as the permit is granted can leak it.
+            # Cancelled in place, acquire() hands a granted permit back itself
+            async with asyncio.timeout(self.queue_timeout_seconds):
+                await semaphore.acquire()
+        except TimeoutError:
+            self._record(feature, tier, LLMOverloaded.outcome, 0, None, started, time.perf_counter())
+            raise LLMOverloaded(f"No LLM capacity for tier {tier} within {self.queue_timeout_seconds}s")
+        finally:
+            self._waiting[tier] -= 1
+
+        acquired = time.perf_counter()
+        self._in_flight[tier] += 1
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    completion = await self._attempt(system, prompt, max_tokens)
+                except _Retryable as retryable:
+                    if attempts > self.max_retries:
+                        raise retryable.error
+                    # Full jitter spreads retries from concurrent callers apart
+                    backoff = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+                    delay = max(backoff, retryable.retry_after or 0)
+                    logger.warning(f"LLM call for {feature} failed ({retryable.error}); retry {attempts} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                self._record(feature, tier, "ok", attempts, completion, started, acquired)
+                return completion
+        except LLMError as e:
+            self._record(feature, tier, e.outcome, attempts, None, started, acquired)
+            raise
+        except Exception as e:
+            self._record(feature, tier, LLMError.outcome, attempts, None, started, acquired)
+            raise LLMError(f"LLM call failed: {e!r}") from e
+        finally:
+            self._in_flight[tier] -= 1
+            semaphore.release()
+
+    async def _attempt(self, system: str, prompt: str, max_tokens: int) -> Completion:
+        try:
+            return await asyncio.wait_for(
+                self.backend.complete(self.model, system, prompt, max_tokens), self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            raise _Retryable(LLMTimeout(f"LLM call took longer than {self.timeout_seconds}s"))
+
+    def _record(self, feature, tier, outcome, attempts, completion: Optional[Completion], started, acquired):
+        now = time.perf_counter()
+        call = LLMCall(
+            feature=feature,
+            tier=tier,
+            model=self.model,
+            outcome=outcome,
+            attempts=attempts,
+            input_tokens=completion.input_tokens if completion else 0,
+            output_tokens=completion.output_tokens if completion else 0,
+            latency_ms=round((now - acquired) * 1000, 3),
+            queued_ms=round((acquired - started) * 1000, 3),
+            finished_at=time.time(),
+        )
+        self.metrics.observe(call)
+        self.recent.append(call)
+        self.outcomes[outcome] += 1
+        self.tokens["input"] += call.input_tokens
+        self.tokens["output"] += call.output_tokens
+        logger.info(
+            f"LLM call {feature} tier={tier} outcome={outcome} attempts={attempts} "
+            f"tokens={call.input_tokens}+{call.output_tokens} latency={call.latency_ms:.0f}ms queued={call.queued_ms:.0f}ms"
+        )
+
+    async def refine(self, feature: str, tier: str, instructions: str, context: dict, draft: ModelT, max_tokens: int) -> ModelT:
+        """Ask the model to improve ``draft`` given ``context``; the draft itself if that fails"""
+        system = f"{instructions}\nReply with only a JSON object with the same keys and value types as the draft."
+        prompt = (
+            f"Context:\n{json.dumps(context, default=str)}\n\n"
+            f"{llm_stub.DRAFT_MARKER}{draft.model_dump_json()}"
+        )
+        try:
+            completion = await self.complete(feature, tier, system, prompt, max_tokens)
+        except LLMError as e:
+            logger.warning(f"LLM call for {feature} failed, answering with the draft: {str(e)}")
+            return draft
+        try:
+            return type(draft).model_validate_json(_json_object(completion.text))
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"LLM reply for {feature} did not match {type(draft).__name__}, answering with the draft: {str(e)}")
+            self.invalid_replies += 1
+            return draft
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "model": self.model,
+            "tiers": {
+                tier: {"limit": limit, "in_flight": self._in_flight[tier], "waiting": self._waiting[tier]}
+                for tier, limit in self.concurrency.items()
+            },
+            "outcomes": dict(self.outcomes),
+            "invalid_replies": self.invalid_replies,
+            "tokens": dict(self.tokens),
+        }
+
+    def recent_calls(self, limit: int = 50) -> list:
+        calls = list(self.recent)[-limit:] if limit > 0 else []
+        return [call._asdict() for call in calls]
+
+    async def stop(self):
+        await self.backend.close()
+
+
+def _json_object(text: str) -> str:
+    """The outermost ``{...}`` in a reply, tolerating prose or code fences around it"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in reply")
+    return text[start:end + 1]
+
+
+def _default_backend() -> LLMBackend:
+    if LLM_BACKEND == "http":
+        return HTTPBackend()
+    if LLM_BACKEND != "stub":
+        logger.warning(f"Unknown LLM_BACKEND {LLM_BACKEND!r}, using the stub")
+    return StubBackend()
+
+
+llm_client = LLMClient(_default_backend())
@@ -0,0 +1,132 @@
+"""
+Deterministic stand-in for the LLM provider, for offline development and load tests.
+
+Speaks the subset of the Messages API that ``services.llm.HTTPBackend`` uses
+(``POST /v1/messages``). The reply depends only on the request: when the last
+user message ends with a ``Draft:`` JSON object (as the hybrid features
+send), the stub returns that object unchanged, so responses match the
+features' own heuristics; otherwise it returns a fixed sentence derived from
+a hash of the prompt. Token counts are estimated at four characters per
+token.
+
+Latency is simulated as ``base + per output token + jitter``, with the jitter
+also derived from the prompt hash, and ``--fail-every N`` answers every Nth
+request with a 529 (overloaded) to exercise retries. ``StubBackend`` in
+``services.llm`` calls ``reply`` in process, without HTTP.
+
+Usage (from backend/):
+    python -m services.llm_stub --port 8090 --base-latency-ms 400 --ms-per-token 5
+    LLM_BACKEND=http LLM_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+from typing import NamedTuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DRAFT_MARKER = "Draft:\n"
+CHARS_PER_TOKEN = 4
+
+
+class StubLatency(NamedTuple):
+    base_ms: float = 0.0
+    ms_per_token: float = 0.0
+    jitter_ms: float = 0.0
+
+
+def count_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def _text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if block.get("type") == "text")
+
+
+def _prompt(payload: dict) -> str:
+    system = _text_of(payload.get("system") or "")
+    return system + "".join(_text_of(message["content"]) for message in payload.get("messages", []))
+
+
+def _digest(payload: dict) -> str:
+    return hashlib.sha256(_prompt(payload).encode("utf-8")).hexdigest()
+
+
+def reply_text(payload: dict) -> str:
+    user_messages = [message for message in payload.get("messages", []) if message.get("role") == "user"]
+    last = _text_of(user_messages[-1]["content"]) if user_messages else ""
+    _, marker, draft = last.rpartition(DRAFT_MARKER)
+    if marker:
+        try:
+            return json.dumps(json.loads(draft), separators=(",", ":"))
+        except ValueError:
+            pass
+    return f"Stub reply {_digest(payload)[:12]}."
+
+
+def reply(payload: dict) -> dict:
+    """The Messages API response body for ``payload``"""
+    text = reply_text(payload)
+    stop_reason = "end_turn"
+    max_tokens = payload.get("max_tokens")
+    if max_tokens and count_tokens(text) > max_tokens:
+        text = text[:max_tokens * CHARS_PER_TOKEN]
+        stop_reason = "max_tokens"
+    return {
+        "id": f"msg_stub_{_digest(payload)[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": payload.get("model", "stub"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "usage": {"input_tokens": count_tokens(_prompt(payload)), "output_tokens": count_tokens(text)},
+    }
+
+
+def latency_seconds(payload: dict, body: dict, latency: StubLatency) -> float:
+    jitter = int(_digest(payload)[:8], 16) / 0xFFFFFFFF * latency.jitter_ms
+    return (latency.base_ms + latency.ms_per_token * body["usage"]["output_tokens"] + jitter) / 1000
+
+
+def create_app(latency: StubLatency = StubLatency(), fail_every: int = 0) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    app.state.requests = 0
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        if fail_every and app.state.requests % fail_every == 0:
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (stub)"}},
+                status_code=529,
+            )
+        body = reply(payload)
+        await asyncio.sleep(latency_seconds(payload, body, latency))
+        return body
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--base-latency-ms", type=float, default=400.0)
+    parser.add_argument("--ms-per-token", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 529")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(StubLatency(args.base_latency_ms, args.ms_per_token, args.jitter_ms), args.fail_every)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Normalized progress storage.
+
+Completed chapters are rows in ``chapter_completions`` (unique per user,
+course and chapter) and quiz results are one ``quiz_best_scores`` row per
+user and quiz, so recording progress is an idempotent insert or a single-row
+upsert rather than a rewrite of a JSON blob. ``user_progress`` keeps one row
+per enrolled course for streaks and last access.
+
+Readers turn completions into a bitset over chapter positions with
+``CourseStructure.completion_mask``; counts and percentages come from that.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import (
+    ChapterCompletion as ChapterCompletionModel,
+    QuizBestScore as QuizBestScoreModel,
+    UserProgress as UserProgressModel,
+)
+
+
+def _insert(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+async def ensure_progress(db, keys: Iterable[Tuple[str, str]], touch: bool = False):
+    """Create missing progress rows for (user_id, course_id) pairs; ``touch``
+    also sets ``last_accessed`` on rows that already exist"""
+    rows = [{"user_id": user_id, "course_id": course_id, "streak_days": 0} for user_id, course_id in dict.fromkeys(keys)]
+    if not rows:
+        return
+    stmt = _insert(db.bind.dialect.name)(UserProgressModel)
+    index_elements = [UserProgressModel.user_id, UserProgressModel.course_id]
+    if touch:
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_={"last_accessed": func.now()})
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    await db.execute(stmt, rows)
+
+
+async def record_completion(db, user_id: str, course_id: str, chapter_id: str) -> bool:
+    """Record a completed chapter; returns False if it was already recorded.
+    The caller commits."""
+    stmt = _insert(db.bind.dialect.name)(ChapterCompletionModel).values(
+        user_id=user_id, course_id=course_id, chapter_id=chapter_id
+    ).on_conflict_do_nothing(
+        index_elements=[ChapterCompletionModel.user_id, ChapterCompletionModel.course_id, ChapterCompletionModel.chapter_id]
+    )
+    inserted = (await db.execute(stmt)).rowcount == 1
+    await ensure_progress(db, [(user_id, course_id)], touch=inserted)
+    return inserted
+
+
+async def completed_chapters(db, user_id: str, course_ids: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Completed chapter ids per course, in completion order (all courses when ``course_ids`` is None)"""
+    query = select(ChapterCompletionModel.course_id, ChapterCompletionModel.chapter_id).where(
+        ChapterCompletionModel.user_id == user_id
+    )
+    if course_ids is not None:
+        query = query.where(ChapterCompletionModel.course_id.in_(list(course_ids)))
+    completed: Dict[str, List[str]] = defaultdict(list)
+    for course_id, chapter_id in (await db.execute(query.order_by(ChapterCompletionModel.id))).all():
+        completed[course_id].append(chapter_id)
+    return completed
+
+
+async def quiz_scores(db, user_id: str, course_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, dict]]:
+    """Quiz scores per course, keyed by quiz id (all courses when ``course_ids`` is None)"""
+    query = select(QuizBestScoreModel).where(QuizBestScoreModel.user_id == user_id)
+    if course_ids is not None:
+        query = query.where(QuizBestScoreModel.course_id.in_(list(course_ids)))
+    scores: Dict[str, Dict[str, dict]] = defaultdict(dict)
+    for row in (await db.execute(query.order_by(QuizBestScoreModel.id))).scalars():
+        scores[row.course_id][row.quiz_id] = {
+            "score": row.last_score,
+            "passed": row.last_passed,
+            "date": row.last_attempt_at.isoformat() if row.last_attempt_at else None,
+            "best_score": row.best_score,
+            "attempts": row.attempts,
+        }
+    return scores
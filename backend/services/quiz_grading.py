@@ -0,0 +1,116 @@
+"""
+Quiz grading against compiled answer keys.
+
+``compile_quiz`` turns the JSON ``questions`` list into parallel tuples of
+question ids and correct answers, so grading a submission is one C-level
+pass (``map(dict.get)`` + ``map(operator.eq)``) with no per-question dict
+walking.
+
+``quiz_keys`` caches compiled quizzes in process, so the questions JSON is
+only read and decoded on a miss. Entries are dropped when a committed write
+touches the quiz; writes that bypass the ORM unit of work must call
+``quiz_keys.invalidate`` themselves.
+"""
+import operator
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from models import Quiz as QuizModel
+from utils.invalidation import register_invalidation
+
+# Compares unequal to every submitted answer; stands in for questions that
+# lack an id or a correct answer, which can never be answered correctly
+_UNANSWERABLE = object()
+
+
+class CompiledQuiz(NamedTuple):
+    quiz_id: str
+    course_id: str
+    question_ids: Tuple[str, ...]
+    correct_answers: Tuple[object, ...]
+    passing_score: float
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.question_ids)
+
+
+def compile_quiz(quiz) -> CompiledQuiz:
+    """Compile a Quiz (or a row with its id, course_id, questions, passing_score)"""
+    question_ids, correct_answers = [], []
+    for question in quiz.questions or ():
+        question_id = question.get('id')
+        correct_answer = question.get('correct_answer')
+        question_ids.append(question_id)
+        correct_answers.append(
+            _UNANSWERABLE if question_id is None or correct_answer is None else correct_answer
+        )
+    return CompiledQuiz(
+        quiz_id=quiz.id,
+        course_id=quiz.course_id,
+        question_ids=tuple(question_ids),
+        correct_answers=tuple(correct_answers),
+        passing_score=quiz.passing_score,
+    )
+
+
+def grade(compiled: CompiledQuiz, answers: Dict[str, str]) -> Tuple[float, bool]:
+    """(score, passed) for one submission"""
+    if not compiled.total_questions:
+        return 0, 0 >= compiled.passing_score
+    correct = sum(map(operator.eq, map(answers.get, compiled.question_ids), compiled.correct_answers))
+    score = correct / compiled.total_questions
+    return score, score >= compiled.passing_score
+
+
+class CompiledQuizCache:
+    def __init__(self):
+        self._entries: Dict[str, CompiledQuiz] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db, quiz_id: str) -> Optional[CompiledQuiz]:
+        """Compiled quiz, or None if no such quiz exists"""
+        return (await self.get_many(db, [quiz_id])).get(quiz_id)
+
+    async def get_many(self, db, quiz_ids: Iterable[str]) -> Dict[str, CompiledQuiz]:
+        """Compiled quizzes by id, loading every miss in one query; unknown ids are left out"""
+        quiz_ids = list(dict.fromkeys(quiz_ids))
+        missing = [quiz_id for quiz_id in quiz_ids if quiz_id not in self._entries]
+        self.hits += len(quiz_ids) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            rows = (await db.execute(
+                select(QuizModel.id, QuizModel.course_id, QuizModel.questions, QuizModel.passing_score)
+                .where(QuizModel.id.in_(missing))
+            )).all()
+            for row in rows:
+                self._entries[row.id] = compile_quiz(row)
+        return {quiz_id: self._entries[quiz_id] for quiz_id in quiz_ids if quiz_id in self._entries}
+
+    def invalidate(self, quiz_id: Optional[str] = None):
+        """Drop one quiz, or everything when ``quiz_id`` is None"""
+        if quiz_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(quiz_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+quiz_keys = CompiledQuizCache()
+
+
+# Drop compiled quizzes changed in a committed transaction
+def _quiz_changes(obj, change: str):
+    return (obj.id,) if isinstance(obj, QuizModel) else ()
+
+
+def _invalidate_quizzes(quiz_ids):
+    for quiz_id in set(quiz_ids):
+        quiz_keys.invalidate(quiz_id)
+
+
+register_invalidation("quiz_keys", _quiz_changes, _invalidate_quizzes)
@@ -0,0 +1,222 @@
+"""
+Recording graded quiz attempts.
+
+``record_attempts`` writes attempts and their progress updates with three
+statements: an executemany insert of the attempts, a batched
+``INSERT ... ON CONFLICT DO UPDATE`` of ``quiz_best_scores`` on the unique
+``(user_id, quiz_id)`` key, and an insert of any missing ``user_progress``
+rows. The caller commits, so a submission is a single transaction.
+
+With ``QUIZ_WRITE_BEHIND`` set, ``submit_quiz`` hands attempts to
+``quiz_writer`` instead: they are queued in memory and written by a
+background task every ``QUIZ_WRITE_BEHIND_INTERVAL`` seconds, or as soon as
+``QUIZ_WRITE_BEHIND_MAX_PENDING`` are queued. A failed flush keeps its batch
+queued for the next tick; the submission that triggered it still succeeds,
+since its attempt is queued. While writes keep failing the queue grows up to
+``QUIZ_WRITE_BEHIND_MAX_QUEUE``, beyond which ``submit`` raises ``QueueFull``
+(a 503) instead of accepting more. The queue is flushed on shutdown. Queued
+attempts are not visible to reads until flushed, and are lost if the process
+dies without a graceful shutdown.
+
+Submitting and flushing both mark the users in ``read_your_writes`` so their
+next reads go to the primary rather than a lagging replica.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Sequence
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.database import AsyncSessionLocal, read_your_writes
+from models import QuizAttempt as QuizAttemptModel, QuizBestScore as QuizBestScoreModel
+from services.progress_store import ensure_progress
+
+logger = logging.getLogger(__name__)
+
+QUIZ_WRITE_BEHIND = os.getenv("QUIZ_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+QUIZ_WRITE_BEHIND_INTERVAL = float(os.getenv("QUIZ_WRITE_BEHIND_INTERVAL", "1"))
+QUIZ_WRITE_BEHIND_MAX_PENDING = int(os.getenv("QUIZ_WRITE_BEHIND_MAX_PENDING", "500"))
+QUIZ_WRITE_BEHIND_MAX_QUEUE = int(os.getenv("QUIZ_WRITE_BEHIND_MAX_QUEUE", "10000"))
+
+
+class QueueFull(Exception):
+    """The write-behind queue is at its hard cap; the attempt was not accepted"""
+
+
+class GradedAttempt(NamedTuple):
+    user_id: str
+    quiz_id: str
+    course_id: str
+    answers: Dict[str, str]
+    score: float
+    passed: bool
+    submitted_at: datetime  # naive UTC
+
+
+def _best_score_upsert_statement(dialect_name: str):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(QuizBestScoreModel)
+    best = QuizBestScoreModel.best_score
+    if dialect_name == "postgresql":
+        best_score = func.greatest(best, stmt.excluded.best_score)
+    else:
+        # SQLite's two-argument max() is NULL if either side is
+        best_score = func.max(func.coalesce(best, stmt.excluded.best_score), stmt.excluded.best_score)
+    return stmt.on_conflict_do_update(
+        index_elements=[QuizBestScoreModel.user_id, QuizBestScoreModel.quiz_id],
+        set_={
+            "best_score": best_score,
+            "attempts": func.coalesce(QuizBestScoreModel.attempts, 0) + stmt.excluded.attempts,
+            "last_score": stmt.excluded.last_score,
+            "last_passed": stmt.excluded.last_passed,
+            "last_attempt_at": stmt.excluded.last_attempt_at,
+        },
+    )
+
+
+def _best_score_rows(attempts: Sequence[GradedAttempt]) -> List[dict]:
+    """One row per (user, quiz): best score and count of these attempts, and the latest one"""
+    rows: Dict[tuple, dict] = {}
+    for attempt in attempts:
+        row = rows.get((attempt.user_id, attempt.quiz_id))
+        if row is None:
+            row = rows[(attempt.user_id, attempt.quiz_id)] = {
+                "user_id": attempt.user_id,
+                "quiz_id": attempt.quiz_id,
+                "course_id": attempt.course_id,
+                "best_score": attempt.score,
+                "attempts": 0,
+            }
+        row["best_score"] = max(row["best_score"], attempt.score)
+        row["attempts"] += 1
+        row["last_score"] = attempt.score
+        row["last_passed"] = attempt.passed
+        row["last_attempt_at"] = attempt.submitted_at.replace(tzinfo=timezone.utc)
+    return list(rows.values())
+
+
+async def record_attempts(db, attempts: Sequence[GradedAttempt], stamp_completed_at: bool = False):
+    """Insert attempts, upsert the users' quiz scores and make sure each user has
+    a progress row for the course; the caller commits
+
+    ``stamp_completed_at`` stores ``submitted_at`` as the completion time
+    instead of the database's insert time (for writes made after the fact).
+    """
+    if not attempts:
+        return
+    rows = []
+    for attempt in attempts:
+        row = {
+            "user_id": attempt.user_id,
+            "quiz_id": attempt.quiz_id,
+            "answers": attempt.answers,
+            "score": attempt.score,
+            "passed": attempt.passed,
+        }
+        if stamp_completed_at:
+            row["completed_at"] = attempt.submitted_at.replace(tzinfo=timezone.utc)
+        rows.append(row)
+    await db.execute(insert(QuizAttemptModel), rows)
+    await db.execute(_best_score_upsert_statement(db.bind.dialect.name), _best_score_rows(attempts))
+    await ensure_progress(db, [(attempt.user_id, attempt.course_id) for attempt in attempts])
+
+
+class QuizAttemptWriter:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        enabled: bool = QUIZ_WRITE_BEHIND,
+        max_queue: int = QUIZ_WRITE_BEHIND_MAX_QUEUE,
+    ):
+        self._session_factory = session_factory
+        self.enabled = enabled
+        self.max_queue = max_queue
+        self._pending: List[GradedAttempt] = []
+        # Created on first use so it binds to the serving event loop
+        self._lock = None
+        self._task = None
+        self._stopping = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, attempt: GradedAttempt):
+        """Queue an attempt; the submission that fills a batch writes it
+
+        Raises ``QueueFull`` without queueing when flushes have been failing
+        long enough to fill the queue.
+        """
+        if len(self._pending) >= self.max_queue:
+            raise QueueFull(f"{len(self._pending)} quiz attempts are waiting to be written")
+        self._pending.append(attempt)
+        if len(self._pending) >= QUIZ_WRITE_BEHIND_MAX_PENDING:
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged. The attempt is queued and the next tick retries
+                # the batch, so failing this request would invite a duplicate retry
+                pass
+
+    async def flush(self) -> int:
+        """Write all queued attempts in one transaction; returns attempts written"""
+        async with self.lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            try:
+                async with self._session_factory() as db:
+                    await record_attempts(db, batch, stamp_completed_at=True)
+                    await db.commit()
+            except BaseException as e:
+                # Put the batch back (ahead of newer attempts) so the next flush
+                # retries it, also when this flush is cancelled
+                self._pending[:0] = batch
+                if isinstance(e, Exception):
+                    logger.error(f"Error flushing quiz attempts: {str(e)}")
+                raise
+            # The window starts again now that the attempts are on the primary
+            read_your_writes.mark(*{attempt.user_id for attempt in batch})
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), QUIZ_WRITE_BEHIND_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged; the batch stays queued for the next tick
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._lock = asyncio.Lock()
+            self._stopping = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still queued
+
+        The loop is signalled rather than cancelled, so a flush in flight
+        finishes before the final one runs.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+quiz_writer = QuizAttemptWriter()
@@ -0,0 +1,180 @@
+"""
+Response cache for read-mostly content endpoints.
+
+Handlers hand ``response_cache.respond`` a loader; the JSON body it renders
+(with ``utils.serialization.dumps``) is stored together with its ETag, keyed
+by endpoint name plus path and query parameters (so legacy and /api/v1
+routes share entries unless the handler passes a ``variant``, e.g. for
+paginated lists). Hits are written out as stored bytes, and a matching
+``If-None-Match`` gets a bare 304. Loaders should read the primary (the
+routes take ``get_db``): an entry rebuilt from a lagging replica right after
+a write would stay stale until the TTL runs out.
+
+The default backend is an in-process TTL + LRU map. Anything implementing
+``CacheBackend`` (e.g. a Redis-backed store) can be swapped in with
+``response_cache.configure``. Committed Course / Chapter writes clear the
+content namespace.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import Request, Response
+from models import Course as CourseModel, Chapter as ChapterModel
+from utils.invalidation import register_invalidation
+from utils.serialization import dumps
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+CONTENT_NAMESPACE = "content"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+
+
+class CacheBackend:
+    """Storage interface for the response cache"""
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class InMemoryCache(CacheBackend):
+    """TTL + LRU cache held in this process"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: str):
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_etag(body: bytes, suffix: str = "") -> str:
+    """A strong ETag for ``body``; ``suffix`` tells apart encodings of the same representation"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + suffix + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag`` (RFC 9110)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        # Bumped on invalidation so a load that raced a write is not stored
+        self._generation = 0
+
+    def configure(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None):
+        if backend is not None:
+            self.backend = backend
+        if ttl is not None:
+            self.ttl = ttl
+
+    @staticmethod
+    def key_for(request: Request, namespace: str = CONTENT_NAMESPACE, variant: str = "") -> str:
+        endpoint = request.scope.get("endpoint")
+        name = getattr(endpoint, "__name__", request.url.path)
+        path_params = "&".join(f"{k}={v}" for k, v in sorted(request.path_params.items()))
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{namespace}:{name}:{variant}:{path_params}?{query}"
+
+    def _respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    async def respond(
+        self,
+        request: Request,
+        load: Callable[[], Awaitable[Any]],
+        namespace: str = CONTENT_NAMESPACE,
+        variant: str = "",
+    ) -> Response:
+        """Serve from cache, or call ``load`` and cache its rendered JSON
+
+        ``variant`` separates responses that differ for the same endpoint and
+        params (e.g. legacy full lists vs. paginated pages).
+        """
+        key = self.key_for(request, namespace, variant)
+        entry = self.backend.get(key)
+        if entry is None:
+            generation = self._generation
+            payload = await load()
+            body = dumps(payload)
+            entry = CachedResponse(body=body, etag=make_etag(body))
+            if generation == self._generation:
+                self.backend.set(key, entry, self.ttl)
+        return self._respond(request, entry)
+
+    def invalidate(self, namespace: str = CONTENT_NAMESPACE):
+        self._generation += 1
+        self.backend.delete_prefix(f"{namespace}:")
+
+
+response_cache = ResponseCache(InMemoryCache())
+
+
+# Drop cached content once a transaction that wrote courses or chapters commits
+def _content_changes(obj, change: str):
+    return (True,) if isinstance(obj, (CourseModel, ChapterModel)) else ()
+
+
+register_invalidation("response_cache", _content_changes, lambda changes: response_cache.invalidate())
@@ -0,0 +1,360 @@
+"""
+In-memory inverted index with BM25 scoring for course and chapter search.
+
+The index holds term postings only (no titles or bodies), so routers look the
+ranked ids up in the database. It is persisted to ``SEARCH_INDEX_PATH`` on
+shutdown and kept current by session hooks that replay committed Course /
+Chapter writes.
+
+Each saved index records the database version it was built from: document
+counts plus the latest ``created_at`` / ``updated_at`` of each table. On
+startup the index is only reused when that version still matches, so edits
+made while this worker was not tracking them force a rebuild.
+"""
+import bisect
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import tempfile
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, select
+
+from models import Course as CourseModel, Chapter as ChapterModel
+from utils.invalidation import register_invalidation
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "./search_index.pkl")
+INDEX_FORMAT_VERSION = 1
+
+# Title matches count this many times a body match
+TITLE_BOOST = 3
+# Max vocabulary terms a trailing partial word expands to ("pyth" -> "python")
+PREFIX_EXPANSIONS = 10
+# Terms matching at least this many documents keep a cached impact-sorted list
+IMPACT_CACHE_MIN_DF = 256
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or that the this to was what when with".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens with stopwords removed"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class InvertedIndex:
+    """BM25 index over one document type; documents are addressed by string id"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._terms: List[Tuple[str, ...]] = []
+        self._free: List[int] = []
+        self._total_length = 0
+        # Derived data, rebuilt lazily after writes
+        self._norms: Optional[List[float]] = None
+        self._vocabulary: Optional[List[str]] = None
+        self._impact_cache: Dict[str, List[Tuple[float, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def add(self, doc_id: str, title: Optional[str], body: Optional[str]):
+        """Index a document, replacing any previous version with the same id"""
+        self.remove(doc_id)
+
+        counts = Counter(tokenize(body))
+        for term in tokenize(title):
+            counts[term] += TITLE_BOOST
+        length = sum(counts.values())
+
+        slot = self._free.pop() if self._free else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(doc_id)
+            self._lengths.append(length)
+            self._terms.append(tuple(counts))
+        else:
+            self._ids[slot] = doc_id
+            self._lengths[slot] = length
+            self._terms[slot] = tuple(counts)
+        self._slots[doc_id] = slot
+        self._total_length += length
+
+        for term, tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary = None
+            postings[slot] = tf
+        self._norms = None
+
+    def remove(self, doc_id: str):
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return
+        for term in self._terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+        self._total_length -= self._lengths[slot]
+        self._ids[slot] = None
+        self._lengths[slot] = 0
+        self._terms[slot] = ()
+        self._free.append(slot)
+        self._norms = None
+
+    def _expand(self, tokens: List[str], partial_last: bool) -> List[str]:
+        if not partial_last or not tokens:
+            return tokens
+        prefix = tokens[-1]
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        matches = []
+        for position in range(bisect.bisect_left(vocabulary, prefix), len(vocabulary)):
+            term = vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > PREFIX_EXPANSIONS:
+            matches.sort(key=lambda t: len(self._postings[t]), reverse=True)
+            matches = matches[:PREFIX_EXPANSIONS]
+            if prefix in self._postings and prefix not in matches:
+                matches.append(prefix)
+        return tokens[:-1] + (matches or [prefix])
+
+    def _impacts(self, term: str, postings: Dict[int, int], weight: float) -> List[Tuple[float, int]]:
+        """(score contribution, slot) pairs for ``term``, highest first"""
+        cached = self._impact_cache.get(term)
+        if cached is not None:
+            return cached
+        norms = self._norms
+        impacts = sorted(
+            ((weight * tf / (tf + norms[slot]), slot) for slot, tf in postings.items()),
+            reverse=True,
+        )
+        # Short lists are cheap to rebuild; only keep the ones worth caching
+        if len(impacts) >= IMPACT_CACHE_MIN_DF:
+            self._impact_cache[term] = impacts
+        return impacts
+
+    def search(self, query: str, limit: int = 10, partial_last: bool = True) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (doc_id, bm25_score) pairs, best first"""
+        n_docs = len(self._slots)
+        if not n_docs or limit <= 0:
+            return []
+        terms = self._expand(tokenize(query), partial_last and not query[-1:].isspace())
+        if not terms:
+            return []
+
+        if self._norms is None:
+            avg_length = self._total_length / n_docs or 1.0
+            k1, b = self.k1, self.b
+            self._norms = [k1 * (1 - b + b * length / avg_length) for length in self._lengths]
+            self._impact_cache = {}
+        norms = self._norms
+        k1_plus_1 = self.k1 + 1
+
+        scored_terms = []
+        for term in dict.fromkeys(terms):
+            postings = self._postings.get(term)
+            if postings:
+                df = len(postings)
+                weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * k1_plus_1
+                scored_terms.append((postings, weight, self._impacts(term, postings, weight)))
+        if not scored_terms:
+            return []
+
+        if len(scored_terms) == 1:
+            best = [(slot, score) for score, slot in scored_terms[0][2][:limit]]
+            return [(self._ids[slot], score) for slot, score in best]
+
+        # Threshold algorithm: walk the impact-ordered lists in lockstep and stop
+        # once no unseen document can beat the current k-th best score
+        top: List[Tuple[float, int]] = []
+        seen = set()
+        depth = 0
+        max_depth = max(len(impacts) for _, _, impacts in scored_terms)
+        while depth < max_depth:
+            threshold = 0.0
+            for _, _, impacts in scored_terms:
+                if depth >= len(impacts):
+                    continue
+                impact, slot = impacts[depth]
+                threshold += impact
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                norm = norms[slot]
+                score = 0.0
+                for postings, weight, _ in scored_terms:
+                    tf = postings.get(slot)
+                    if tf:
+                        score += weight * tf / (tf + norm)
+                if len(top) < limit:
+                    heapq.heappush(top, (score, slot))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, slot))
+            if len(top) >= limit and top[0][0] >= threshold:
+                break
+            depth += 1
+
+        top.sort(reverse=True)
+        return [(self._ids[slot], score) for score, slot in top]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_norms"] = None
+        state["_vocabulary"] = None
+        state["_impact_cache"] = {}
+        return state
+
+
+async def database_version(db) -> tuple:
+    """Counts and latest write timestamps of the indexed tables"""
+    version = ()
+    for model in (CourseModel, ChapterModel):
+        version += tuple((await db.execute(
+            select(func.count(), func.max(model.created_at), func.max(model.updated_at)).select_from(model)
+        )).one())
+    return version
+
+
+class SearchIndex:
+    """Course and chapter indexes plus persistence and database rebuilds"""
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self.courses = InvertedIndex()
+        self.chapters = InvertedIndex()
+        # ``database_version`` the indexes were built from; None if unknown
+        self.version = None
+
+    def index_course(self, course_id: str, title: Optional[str], description: Optional[str]):
+        self.courses.add(course_id, title, description)
+
+    def index_chapter(self, chapter_id: str, title: Optional[str], content: Optional[str]):
+        self.chapters.add(chapter_id, title, content)
+
+    def search_courses(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        return self.courses.search(query, limit)
+
+    def search_chapters(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        return self.chapters.search(query, limit)
+
+    def save(self):
+        """Atomically write both indexes to ``self.path``"""
+        # A temporary file of our own, so workers saving at once never share one
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=f"{os.path.basename(self.path)}.",
+            suffix=".tmp",
+            delete=False,
+        ) as fh:
+            try:
+                pickle.dump(
+                    {
+                        "version": INDEX_FORMAT_VERSION,
+                        "db_version": self.version,
+                        "courses": self.courses,
+                        "chapters": self.chapters,
+                    },
+                    fh,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            except BaseException:
+                fh.close()
+                os.unlink(fh.name)
+                raise
+        os.replace(fh.name, self.path)
+        logger.info(f"Saved search index ({len(self.courses)} courses, {len(self.chapters)} chapters) to {self.path}")
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as fh:
+                state = pickle.load(fh)
+        except Exception as e:
+            logger.error(f"Error loading search index from {self.path}: {str(e)}")
+            return False
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            return False
+        self.courses = state["courses"]
+        self.chapters = state["chapters"]
+        self.version = state.get("db_version")
+        return True
+
+    async def rebuild(self, db):
+        """Rebuild both indexes from the database, streaming chapter rows"""
+        # Read before the rows: writes racing the rebuild only make the next check stale
+        version = await database_version(db)
+        courses, chapters = InvertedIndex(), InvertedIndex()
+        for course_id, title, description in (
+            await db.execute(select(CourseModel.id, CourseModel.title, CourseModel.description))
+        ).all():
+            courses.add(course_id, title, description)
+        result = await db.stream(
+            select(ChapterModel.id, ChapterModel.title, ChapterModel.content).execution_options(yield_per=1000)
+        )
+        async for chapter_id, title, content in result:
+            chapters.add(chapter_id, title, content)
+        self.courses, self.chapters, self.version = courses, chapters, version
+        logger.info(f"Built search index: {len(courses)} courses, {len(chapters)} chapters")
+
+    async def load_or_build(self, db):
+        """Use the on-disk index when it was built from the current database version"""
+        if self.load() and self.version == await database_version(db):
+            logger.info(f"Loaded search index from {self.path}")
+            return
+        await self.rebuild(db)
+        self.save()
+
+
+search_index = SearchIndex()
+
+
+# Keep the index in step with committed Course / Chapter writes
+_INDEXED_FIELDS = {CourseModel: ("title", "description"), ChapterModel: ("title", "content")}
+
+
+def _search_changes(obj, change: str):
+    fields = _INDEXED_FIELDS.get(type(obj))
+    if not fields:
+        return ()
+    if change == "deleted":
+        return ((type(obj), obj.id, None),)
+    if change == "dirty" and not any(inspect(obj).attrs[f].history.has_changes() for f in fields):
+        return ()
+    return ((type(obj), obj.id, tuple(getattr(obj, f) for f in fields)),)
+
+
+def _apply_search_changes(changes):
+    for model, doc_id, fields in changes:
+        index = search_index.courses if model is CourseModel else search_index.chapters
+        if fields is None:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, *fields)
+
+
+register_invalidation("search_index", _search_changes, _apply_search_changes)
@@ -0,0 +1,155 @@
+"""
+Buffered hybrid-feature usage metering.
+
+Premium endpoints record usage in memory; a background task flushes the
+buffered increments in one batched ``INSERT ... ON CONFLICT DO UPDATE SET
+n = n + excluded.n`` against the unique ``(user_id, month_year)`` key, so
+concurrent requests never lose updates and no request waits on a write.
+
+Reads merge the counts that have not reached the database yet, so
+``get_hybrid_usage`` stays exact for usage recorded by this worker.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.database import AsyncSessionLocal
+from models import HybridUsage as HybridUsageModel
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ("adaptive_learning", "llm_assessment", "synthesis", "mentor_sessions")
+
+# Flush at least this often (seconds), or sooner once this many user/month keys are pending
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "5"))
+USAGE_FLUSH_MAX_PENDING = int(os.getenv("USAGE_FLUSH_MAX_PENDING", "500"))
+
+UsageKey = Tuple[str, str]
+
+
+def current_month() -> str:
+    return datetime.utcnow().strftime('%Y-%m')
+
+
+def _upsert_statement(dialect_name: str):
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = insert(HybridUsageModel)
+    return stmt.on_conflict_do_update(
+        index_elements=[HybridUsageModel.user_id, HybridUsageModel.month_year],
+        set_={
+            **{field: getattr(HybridUsageModel, field) + getattr(stmt.excluded, field) for field in USAGE_FIELDS},
+            "updated_at": func.now(),
+        },
+    )
+
+
+class UsageMeter:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._pending: Dict[UsageKey, Counter] = defaultdict(Counter)
+        # Created on first use so it binds to the serving event loop
+        self._lock = None
+        self._task = None
+        self._flush_task = None
+        self._stopping = None
+
+    def record(self, user_id: str, feature: str, amount: int = 1):
+        """Count one use of ``feature`` for ``user_id`` in the current month"""
+        if feature not in USAGE_FIELDS:
+            raise ValueError(f"Unknown hybrid feature: {feature}")
+        self._pending[(user_id, current_month())][feature] += amount
+        if len(self._pending) >= USAGE_FLUSH_MAX_PENDING and not (self._flush_task and not self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            self._flush_task.add_done_callback(self._log_flush_failure)
+
+    @staticmethod
+    def _log_flush_failure(task: asyncio.Task):
+        # Nobody awaits a size-triggered flush; retrieve its error so it is
+        # logged here rather than as "Task exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Size-triggered hybrid usage flush failed: {task.exception()!r}")
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def flush(self) -> int:
+        """Write all buffered increments in one transaction; returns rows upserted"""
+        async with self.lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(Counter)
+            rows = [
+                {"user_id": user_id, "month_year": month_year, **{field: counts[field] for field in USAGE_FIELDS}}
+                for (user_id, month_year), counts in batch.items()
+            ]
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(_upsert_statement(db.bind.dialect.name), rows)
+                    await db.commit()
+            except BaseException as e:
+                # Put the batch back so the next flush retries it, also when
+                # this flush is cancelled
+                for key, counts in batch.items():
+                    self._pending[key].update(counts)
+                if isinstance(e, Exception):
+                    logger.error(f"Error flushing hybrid usage: {str(e)}")
+                raise
+            return len(rows)
+
+    async def get_usage(self, db, user_id: str, month_year: str) -> Dict[str, int]:
+        """Stored counters for the month plus anything still buffered"""
+        # Hold the lock so a batch is never counted both in flight and in the table
+        async with self.lock:
+            usage = (await db.execute(
+                select(HybridUsageModel).where(
+                    HybridUsageModel.user_id == user_id,
+                    HybridUsageModel.month_year == month_year
+                )
+            )).scalars().first()
+            counts = {field: (getattr(usage, field) or 0) if usage else 0 for field in USAGE_FIELDS}
+            for field, amount in self._pending.get((user_id, month_year), {}).items():
+                counts[field] += amount
+        return {"id": usage.id if usage else 0, "user_id": user_id, "month_year": month_year, **counts}
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), USAGE_FLUSH_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged; the batch stays buffered for the next tick
+
+    def start(self):
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._stopping = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still buffered
+
+        The loop is signalled rather than cancelled, and the final flush
+        takes the lock, so a flush in flight (periodic or size-triggered)
+        finishes first.
+        """
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+usage_meter = UsageMeter()
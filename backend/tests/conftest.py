@@ -0,0 +1,97 @@
+"""
+Test fixtures: the app on two SQLite files, a primary and a read replica.
+
+The database URLs are set before any application module is imported, since
+``config.database`` reads them at import time. The replica is a copy of the
+primary made with SQLite's backup API; it only changes when a test calls
+``sync_replica``, so tests can read "behind" the primary on purpose.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix="course-companion-tests-")
+PRIMARY_PATH = os.path.join(DATA_DIR, "primary.db")
+REPLICA_PATH = os.path.join(DATA_DIR, "replica.db")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{PRIMARY_PATH}",
+    "DATABASE_READ_URL": f"sqlite:///{REPLICA_PATH}",
+    "SEARCH_INDEX_PATH": os.path.join(DATA_DIR, "search_index.pkl"),
+    "ADMIN_TOKEN": "test-admin-token",
+})
+
+
+def copy_primary_to_replica():
+    source = sqlite3.connect(PRIMARY_PATH)
+    target = sqlite3.connect(REPLICA_PATH)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+@pytest.fixture(scope="session")
+def app():
+    import asyncio
+
+    import manage
+    from config.database import async_engine
+
+    manage.migrate()
+    asyncio.run(manage.seed())
+    # seed() ran on a loop that is now closed; drop its pooled connections
+    asyncio.run(async_engine.dispose())
+    copy_primary_to_replica()
+
+    from main import create_app
+
+    yield create_app()
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def admin_headers():
+    return {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+
+
+@pytest.fixture
+def sync_replica():
+    """Bring the replica up to date with the primary"""
+    return copy_primary_to_replica
+
+
+@pytest.fixture
+def primary_db():
+    """A sync session on the primary, for arranging data behind the replica's back"""
+    from config.database import SessionLocal
+
+    with SessionLocal() as db:
+        yield db
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Start every test with empty in-process caches and no sticky users"""
+    from config.database import read_your_writes
+    from services.course_structure import course_structure
+    from services.quiz_grading import quiz_keys
+    from services.response_cache import response_cache
+
+    response_cache.invalidate()
+    course_structure.invalidate()
+    quiz_keys.invalidate()
+    read_your_writes.clear()
+    yield
@@ -0,0 +1,49 @@
+"""GET /api/v1/courses/chapters/{id}/bundle: a chapter with both neighbors in one response"""
+URL = "/api/v1/courses/chapters/{}/bundle"
+
+
+def _bundle(client, chapter_id: str, **params) -> dict:
+    response = client.get(URL.format(chapter_id), params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_neighbors_follow_the_chapter_order(client):
+    bundle = _bundle(client, "ch2-basics")
+    chapter, previous, next_ = bundle["chapter"], bundle["previous"], bundle["next"]
+
+    assert (previous["id"], chapter["id"], next_["id"]) == ("ch1-intro", "ch2-basics", "ch3-functions")
+    assert previous["order"] < chapter["order"] < next_["order"]
+    assert chapter["prev_chapter_id"] == previous["id"]
+    assert chapter["next_chapter_id"] == next_["id"]
+    assert {previous["course_id"], next_["course_id"]} == {chapter["course_id"]}
+
+
+def test_first_and_last_chapters_have_one_neighbor(client):
+    first = _bundle(client, "ch1-intro")
+    assert first["previous"] is None
+    assert first["next"]["id"] == "ch2-basics"
+
+    last = _bundle(client, "ch3-functions")
+    assert last["next"] is None
+    assert last["previous"]["id"] == "ch2-basics"
+
+
+def test_neighbor_content_is_only_sent_when_asked_for(client):
+    full = client.get("/api/v1/courses/chapters/ch1-intro").json()
+
+    bundle = _bundle(client, "ch2-basics")
+    assert bundle["chapter"]["content"].startswith("# Python Basics")
+    assert bundle["previous"]["content"] is None
+    assert bundle["next"]["content"] is None
+
+    bundle = _bundle(client, "ch2-basics", include_content="true")
+    assert bundle["chapter"]["content"].startswith("# Python Basics")
+    assert bundle["previous"]["content"] == full["content"]
+    assert bundle["next"]["content"].startswith("# Functions and Type Hints")
+
+
+def test_unknown_chapter_is_not_found(client):
+    response = client.get(URL.format("no-such-chapter"))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Chapter not found"
@@ -0,0 +1,29 @@
+"""GET /api/v1/courses/chapters/{id}/content serves stored gzip or plain Markdown"""
+import gzip
+
+URL = "/api/v1/courses/chapters/ch1-intro/content"
+
+
+def test_gzip_and_identity_have_different_etags(client):
+    # Read the raw bytes: httpx would decode the gzip body
+    with client.stream("GET", URL, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        gzip_etag = response.headers["etag"]
+    identity = client.get(URL, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert gzip.decompress(raw).decode("utf-8") == identity.text
+
+    assert gzip_etag.endswith('-gz"')
+    assert gzip_etag != identity.headers["etag"]
+
+
+def test_if_none_match_only_matches_the_same_coding(client):
+    identity_etag = client.get(URL, headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+    response = client.get(URL, headers={"Accept-Encoding": "identity", "If-None-Match": identity_etag})
+    assert response.status_code == 304
+
+    response = client.get(URL, headers={"Accept-Encoding": "gzip", "If-None-Match": identity_etag})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
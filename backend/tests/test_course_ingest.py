@@ -0,0 +1,62 @@
+"""Ingesting a course bundle through POST /api/v1/courses/ingest"""
+import io
+import json
+import tarfile
+
+import pytest
+
+
+def _bundle(chapters) -> bytes:
+    files = {"ingest-demo/course.json": json.dumps({
+        "id": "course-ingest-demo", "title": "Ingest demo", "chapters": list(chapters),
+    })}
+    for filename in chapters:
+        files[f"ingest-demo/{filename}"] = f"# {filename}\n\nBody of {filename}."
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, text in files.items():
+            data = text.encode("utf-8")
+            member = tarfile.TarInfo(name)
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _ingest(client, headers, chapters):
+    response = client.post(
+        "/api/v1/courses/ingest", headers=headers,
+        files={"bundle": ("demo.tar.gz", _bundle(chapters), "application/gzip")},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_reingest_reports_chapters_missing_from_the_manifest(client, admin_headers):
+    report = _ingest(client, admin_headers, ["01-a.md", "02-b.md", "03-c.md"])
+    assert report == {"courses": 1, "chapters": 3, "batches": 1, "stale_chapters": []}
+
+    report = _ingest(client, admin_headers, ["01-a.md", "03-c.md"])
+    assert report["chapters"] == 2
+    assert report["stale_chapters"] == ["course-ingest-demo-02-b"]
+
+    chapters = client.get("/api/v1/courses/course-ingest-demo/chapters").json()["chapters"]
+    kept = {chapter["id"]: chapter for chapter in chapters}
+    assert set(kept) == {"course-ingest-demo-01-a", "course-ingest-demo-02-b", "course-ingest-demo-03-c"}
+    assert kept["course-ingest-demo-01-a"]["next_chapter_id"] == "course-ingest-demo-03-c"
+
+
+def test_malformed_bundle_is_rejected(client, admin_headers):
+    response = client.post(
+        "/api/v1/courses/ingest", headers=admin_headers,
+        files={"bundle": ("x.tar.gz", b"not a tar", "application/gzip")},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_ingest_requires_the_admin_token(client, headers):
+    response = client.post(
+        "/api/v1/courses/ingest", headers=headers,
+        files={"bundle": ("demo.tar.gz", _bundle(["01-a.md"]), "application/gzip")},
+    )
+    assert response.status_code == 403
@@ -0,0 +1,73 @@
+"""Plan expiry, with and without a cached entitlement"""
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import models
+from services import entitlements as entitlements_module
+from services.entitlements import entitlements
+
+SYNTHESIS = {"course_id": "course-python-intro", "chapter_ids": ["ch1-intro"], "learning_goals": ["Write scripts"]}
+
+
+@pytest.fixture
+def subscribe(client, primary_db):
+    """Add an active subscription ending ``ends_in`` from now (None: never)"""
+    def subscribe(user_id: str, plan_type: str, ends_in: timedelta = None):
+        if primary_db.get(models.User, user_id) is None:
+            primary_db.add(models.User(id=user_id))
+        end_date = datetime.utcnow() + ends_in if ends_in is not None else None
+        primary_db.add(models.Subscription(user_id=user_id, plan_type=plan_type, end_date=end_date, is_active=True))
+        primary_db.commit()
+
+    return subscribe
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock seen by the entitlement cache; the TTL clock keeps running"""
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(
+        entitlements_module, "time", SimpleNamespace(time=lambda: now.value, monotonic=time.monotonic),
+    )
+    return now
+
+
+def _access(client, user_id: str) -> dict:
+    response = client.get("/api/v1/access/check", params={"user_id": user_id})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_expired_subscription_is_denied(client, subscribe):
+    subscribe("expired-user", "premium", ends_in=timedelta(days=-1))
+    assert _access(client, "expired-user")["has_premium"] is False
+
+    response = client.post("/api/v1/hybrid/synthesis", json={"user_id": "expired-user", **SYNTHESIS})
+    assert response.status_code == 403
+
+
+def test_cached_grant_is_not_served_past_its_expiry(client, subscribe, clock):
+    subscribe("lapsing-user", "premium", ends_in=timedelta(hours=1))
+    granted = _access(client, "lapsing-user")
+    assert granted["has_premium"] is True
+    assert granted["expires_at"] is not None
+
+    stats = entitlements.stats()
+    clock.value += timedelta(hours=2).total_seconds()
+    assert _access(client, "lapsing-user")["has_premium"] is False
+    # Answered from the cached entry, not by reloading the plan
+    assert entitlements.stats()["hits"] == stats["hits"] + 1
+    assert entitlements.stats()["misses"] == stats["misses"]
+
+
+def test_lapsed_plan_falls_back_to_the_next_running_one(client, subscribe, clock):
+    subscribe("two-plans", "premium")
+    subscribe("two-plans", "pro", ends_in=timedelta(hours=1))
+    assert _access(client, "two-plans")["plan_type"] == "pro"
+
+    clock.value += timedelta(hours=2).total_seconds()
+    access = _access(client, "two-plans")
+    assert (access["plan_type"], access["expires_at"]) == ("premium", None)
@@ -0,0 +1,59 @@
+"""Hybrid features give their database connection back before calling the LLM"""
+import pytest
+
+import models
+from config.database import async_engine
+from services.entitlements import entitlements
+from services.llm import llm_client
+
+USER_ID = "hybrid-premium"
+
+REQUESTS = {
+    "/api/v1/hybrid/adaptive-learning": {
+        "user_id": USER_ID, "course_id": "course-python-intro", "current_chapter_id": "ch1-intro",
+        "quiz_performance": {"quiz-python-basics": 0.5}, "time_spent": {"ch1-intro": 120},
+    },
+    "/api/v1/hybrid/llm-assessment": {
+        "user_id": USER_ID, "quiz_id": "quiz-python-basics", "question_id": "q1",
+        "user_response": "A variable names a value", "correct_answer": "name", "question_context": "Variables",
+    },
+    "/api/v1/hybrid/synthesis": {
+        "user_id": USER_ID, "course_id": "course-python-intro", "chapter_ids": ["ch1-intro"],
+        "learning_goals": ["Write scripts"],
+    },
+    "/api/v1/hybrid/mentor-session": {
+        "user_id": USER_ID, "course_id": "course-python-intro", "chapter_id": "ch1-intro",
+        "question": "What is a loop?", "context": "Control flow",
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def premium_user(client):
+    from config.database import SessionLocal
+
+    with SessionLocal() as db:
+        db.add(models.Subscription(user_id=USER_ID, plan_type="premium", is_active=True))
+        db.commit()
+
+
+@pytest.fixture
+def checked_out_during_refine(monkeypatch):
+    """Connections checked out of the primary pool while each (stubbed) LLM call runs"""
+    observed = []
+
+    async def refine(feature, tier, instructions, context, draft, max_tokens):
+        observed.append(async_engine.sync_engine.pool.checkedout())
+        return draft
+
+    monkeypatch.setattr(llm_client, "refine", refine)
+    return observed
+
+
+@pytest.mark.parametrize("path", list(REQUESTS))
+def test_no_connection_is_held_across_the_llm_call(client, premium_user, checked_out_during_refine, path):
+    # A cold entitlement cache makes the request load the plan with its own session
+    entitlements.invalidate()
+    response = client.post(path, json=REQUESTS[path])
+    assert response.status_code == 200
+    assert checked_out_during_refine == [0]
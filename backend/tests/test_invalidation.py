@@ -0,0 +1,58 @@
+"""Commit-time cache invalidation hooks"""
+from sqlalchemy.orm import Session
+
+import models
+from utils.invalidation import register_invalidation
+
+
+class _TrackedSession(Session):
+    pass
+
+
+_invalidated = []
+
+
+def _chapter_changes(obj, change):
+    return ((change, obj.id),) if isinstance(obj, models.Chapter) else ()
+
+
+register_invalidation("test_chapters", _chapter_changes, _invalidated.append, session_cls=_TrackedSession)
+
+
+def _rename(client, title: str, commit: bool):
+    from config.database import engine
+
+    with _TrackedSession(engine) as db:
+        chapter = db.get(models.Chapter, "ch1-intro")
+        original = chapter.title
+        chapter.title = title
+        db.flush()
+        if commit:
+            db.commit()
+            chapter.title = original
+            db.commit()
+        else:
+            db.rollback()
+
+
+def test_committed_write_invalidates_its_keys(client):
+    _invalidated.clear()
+    _rename(client, "Renamed", commit=True)
+    assert _invalidated == [[("dirty", "ch1-intro")], [("dirty", "ch1-intro")]]
+
+
+def test_rolled_back_write_invalidates_nothing(client):
+    _invalidated.clear()
+    _rename(client, "Renamed", commit=False)
+    assert _invalidated == []
+
+
+def test_other_session_classes_are_not_hooked(client, primary_db):
+    _invalidated.clear()
+    chapter = primary_db.get(models.Chapter, "ch1-intro")
+    original = chapter.title
+    chapter.title = "Renamed"
+    primary_db.commit()
+    chapter.title = original
+    primary_db.commit()
+    assert _invalidated == []
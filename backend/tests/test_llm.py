@@ -0,0 +1,85 @@
+"""LLMClient: tier limits, timeouts and the draft fallback of refine"""
+import asyncio
+
+from schemas import MentorSessionResponse
+from services.llm import Completion, LLMBackend, LLMClient, LLMOverloaded, StubBackend
+
+DRAFT = MentorSessionResponse(
+    response="Break it down", teaching_points=["a"], follow_up_questions=["b"], related_concepts=["c"]
+)
+
+
+class SlowBackend(LLMBackend):
+    """Replies after ``delay`` seconds and tracks how many calls overlap"""
+
+    def __init__(self, delay: float, text: str = "{}"):
+        self.delay = delay
+        self.text = text
+        self.in_flight = 0
+        self.peak = 0
+
+    async def complete(self, model, system, prompt, max_tokens):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return Completion(self.text, 1, 1)
+
+
+def test_refine_returns_the_validated_reply():
+    client = LLMClient(StubBackend())
+    refined = asyncio.run(client.refine("mentor_sessions", "premium", "Mentor", {}, DRAFT, 500))
+    assert refined == DRAFT
+    assert client.outcomes == {"ok": 1}
+
+
+def test_refine_falls_back_to_the_draft_on_timeout():
+    client = LLMClient(SlowBackend(1), timeout_seconds=0.01, max_retries=0)
+    refined = asyncio.run(client.refine("mentor_sessions", "premium", "Mentor", {}, DRAFT, 500))
+    assert refined is DRAFT
+    assert client.outcomes == {"timeout": 1}
+
+
+def test_concurrency_is_limited_per_tier():
+    backend = SlowBackend(0.02)
+    client = LLMClient(backend, concurrency={"premium": 2, "default": 1})
+
+    async def calls():
+        await asyncio.gather(*(client.complete("test", "premium", "s", "p", 10) for _ in range(6)))
+
+    asyncio.run(calls())
+    assert backend.peak == 2
+    assert client.stats()["tiers"]["premium"] == {"limit": 2, "in_flight": 0, "waiting": 0}
+
+
+def test_queue_timeout_raises_overloaded():
+    client = LLMClient(SlowBackend(0.2), concurrency={"default": 1}, queue_timeout_seconds=0.01)
+
+    async def calls():
+        return await asyncio.gather(
+            *(client.complete("test", "default", "s", "p", 10) for _ in range(2)), return_exceptions=True
+        )
+
+    results = asyncio.run(calls())
+    assert [type(result) for result in results] == [Completion, LLMOverloaded]
+
+
+def test_permits_survive_timeouts_and_cancellations_at_handover():
+    limit = 2
+    client = LLMClient(SlowBackend(0.01), concurrency={"default": limit}, queue_timeout_seconds=0.01)
+
+    async def calls():
+        tasks = [asyncio.create_task(client.complete("test", "default", "s", "p", 10)) for _ in range(50)]
+        # Cancel callers around the moments permits change hands
+        for delay in (0.005, 0.01, 0.015, 0.02):
+            await asyncio.sleep(delay)
+            for task in tasks[::7]:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Every permit is back: a full tier's worth of calls runs at once
+        return await asyncio.gather(*(client.complete("test", "default", "s", "p", 10) for _ in range(limit)))
+
+    assert len(asyncio.run(calls())) == limit
+    assert client.stats()["tiers"]["default"] == {"limit": limit, "in_flight": 0, "waiting": 0}
@@ -0,0 +1,113 @@
+"""Data migrations, run against a scratch database seeded in the old shape"""
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+
+from config.migrations import alembic_config
+
+T0 = datetime(2026, 1, 1, 12, 0)
+T1 = datetime(2026, 1, 2, 12, 0)
+T2 = datetime(2026, 1, 3, 12, 0)
+T3 = datetime(2026, 1, 4, 12, 0)
+
+# More progress rows than one backfill batch holds
+FILLER_USERS = 1500
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _upgrade(engine, revision: str):
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def _seed_0002(engine):
+    metadata = sa.MetaData()
+    with engine.begin() as conn:
+        metadata.reflect(conn)
+        t = metadata.tables
+        users = ["u1", "u2"] + [f"filler-{i}" for i in range(FILLER_USERS)]
+        conn.execute(t["users"].insert(), [{"id": user_id} for user_id in users])
+        conn.execute(t["courses"].insert(), [{"id": "c1"}, {"id": "c2"}])
+        conn.execute(t["chapters"].insert(), [
+            {"id": "ch1", "course_id": "c1"}, {"id": "ch2", "course_id": "c1"},
+        ])
+        conn.execute(t["quizzes"].insert(), [
+            {"id": "qa", "course_id": "c1"}, {"id": "qb", "course_id": "c1"},
+        ])
+        conn.execute(t["quiz_attempts"].insert(), [
+            {"user_id": "u1", "quiz_id": "qa", "score": 0.5, "passed": False, "completed_at": T0},
+            {"user_id": "u1", "quiz_id": "qa", "score": 0.9, "passed": True, "completed_at": T1},
+            {"user_id": "u1", "quiz_id": "qa", "score": 0.7, "passed": False, "completed_at": T2},
+            {"user_id": "u2", "quiz_id": "qa", "score": 1.0, "passed": True, "completed_at": T1},
+        ])
+        conn.execute(t["user_progress"].insert(), [
+            {
+                "user_id": "u1", "course_id": "c1", "completed_chapters": ["ch1", "ch2", "ch1"],
+                "quiz_scores": {
+                    "qa": {"score": 0.8, "passed": True, "date": T3.isoformat()},
+                    "qb": {"score": 0.6, "passed": False, "date": "not a date"},
+                    "broken": "not an entry",
+                },
+                "last_accessed": T3,
+            },
+            {"user_id": "u2", "course_id": "c2", "completed_chapters": None, "quiz_scores": None, "last_accessed": T3},
+        ] + [
+            {
+                "user_id": f"filler-{i}", "course_id": "c1", "completed_chapters": ["ch1"],
+                "quiz_scores": {"qb": {"score": 1.0, "passed": True, "date": T2.isoformat()}},
+                "last_accessed": T2,
+            }
+            for i in range(FILLER_USERS)
+        ])
+
+
+def test_0003_backfills_completions_and_best_scores(scratch_engine):
+    _upgrade(scratch_engine, "0002")
+    _seed_0002(scratch_engine)
+    _upgrade(scratch_engine, "0003")
+
+    metadata = sa.MetaData()
+    with scratch_engine.connect() as conn:
+        metadata.reflect(conn)
+        completions_table = metadata.tables["chapter_completions"]
+        completions = conn.execute(sa.select(
+            completions_table.c.user_id, completions_table.c.course_id,
+            completions_table.c.chapter_id, completions_table.c.completed_at,
+        ).order_by(completions_table.c.id)).all()
+        scores = {
+            (row.user_id, row.quiz_id): row
+            for row in conn.execute(sa.select(metadata.tables["quiz_best_scores"])).all()
+        }
+
+    assert "completed_chapters" not in metadata.tables["user_progress"].c
+    assert "quiz_scores" not in metadata.tables["user_progress"].c
+
+    assert len(completions) == 2 + FILLER_USERS
+    assert [tuple(row[:3]) for row in completions[:2]] == [("u1", "c1", "ch1"), ("u1", "c1", "ch2")]
+    assert completions[0].completed_at == T3
+    assert completions[-1][:3] == (f"filler-{FILLER_USERS - 1}", "c1", "ch1")
+
+    assert len(scores) == 3 + FILLER_USERS
+    # Best score and count from the attempts, latest result from the JSON entry
+    u1_qa = scores["u1", "qa"]
+    assert (u1_qa.course_id, u1_qa.best_score, u1_qa.attempts) == ("c1", 0.9, 3)
+    assert (u1_qa.last_score, u1_qa.last_passed, u1_qa.last_attempt_at) == (0.8, True, T3)
+    # Only a JSON entry: one attempt, unparseable date dropped
+    u1_qb = scores["u1", "qb"]
+    assert (u1_qb.course_id, u1_qb.best_score, u1_qb.attempts) == ("c1", 0.6, 1)
+    assert (u1_qb.last_score, u1_qb.last_passed, u1_qb.last_attempt_at) == (0.6, False, None)
+    # Only attempts: latest result from the newest attempt
+    u2_qa = scores["u2", "qa"]
+    assert (u2_qa.best_score, u2_qa.attempts, u2_qa.last_score, u2_qa.last_attempt_at) == (1.0, 1, 1.0, T1)
+    filler = scores["filler-1499", "qb"]
+    assert (filler.best_score, filler.attempts, filler.last_attempt_at) == (1.0, 1, T2)
@@ -0,0 +1,33 @@
+"""Cursor pagination of the /api/v1 list routes"""
+import pytest
+
+from utils.pagination import encode_cursor
+
+CHAPTERS = "/api/v1/courses/course-python-intro/chapters"
+ATTEMPTS = "/api/v1/quizzes/attempts/user-1/quiz-python-basics"
+
+
+def test_chapters_follow_next_cursor(client):
+    everything = client.get(CHAPTERS).json()["chapters"]
+    paged, cursor = [], None
+    while True:
+        page = client.get(CHAPTERS, params={"limit": 1, **({"cursor": cursor} if cursor else {})}).json()
+        paged += page["chapters"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [chapter["id"] for chapter in paged] == [chapter["id"] for chapter in everything]
+
+
+@pytest.mark.parametrize("url,cursor", [
+    (CHAPTERS, "W1tdLFtdXQ"),  # [[], []]
+    (ATTEMPTS, "W251bGxd"),  # [null]
+    (CHAPTERS, encode_cursor(["1", "ch1-intro"])),  # order must be an int
+    (ATTEMPTS, encode_cursor([True])),
+    ("/api/v1/courses", encode_cursor([7])),  # course ids are strings
+    (CHAPTERS, "not base64!"),
+])
+def test_malformed_cursors_are_a_400(client, url, cursor):
+    response = client.get(url, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,52 @@
+"""Pool instrumentation: waits and timeouts of request sessions"""
+import asyncio
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config.pool import instrument_pool, pool_status, timed_checkout
+
+
+def test_waits_and_timeouts_on_a_pool_of_one(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1,
+    )
+    instrument_pool(engine.sync_engine, max_overflow=0)
+    sessions = async_sessionmaker(engine, class_=AsyncSession)
+
+    async def scenario():
+        async with sessions() as holder:
+            await timed_checkout(holder)
+            # Nothing frees the only connection: the second checkout times out
+            async with sessions() as starved:
+                with pytest.raises(exc.TimeoutError):
+                    await timed_checkout(starved)
+
+            # Here the holder lets go after 50ms, within the timeout
+            async def release_soon():
+                await asyncio.sleep(0.05)
+                await holder.close()
+
+            releasing = asyncio.create_task(release_soon())
+            async with sessions() as waiter:
+                await timed_checkout(waiter)
+            await releasing
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    stats = pool_status(engine)
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 2
+    assert stats["wait_ms_max"] >= 100
+    assert 40 <= stats["wait_ms_total"] - stats["wait_ms_max"] < 100
+    assert stats["checkouts"] == 2
+    assert stats["peak_checked_out"] == 1
+
+
+def test_pool_endpoint_reports_the_counters(client):
+    stats = client.get("/api/v1/internal/pool").json()
+    assert {"waits", "wait_ms_total", "wait_ms_max", "timeouts", "checked_out"} <= set(stats["async"])
+    assert stats["async"]["checkouts"] > 0
@@ -0,0 +1,119 @@
+"""Grading against compiled answer keys, one submission at a time and in batches"""
+from types import SimpleNamespace
+
+import pytest
+
+import models
+from services.quiz_grading import compile_quiz, grade, quiz_keys
+
+QUIZ = "quiz-python-basics"
+
+# Correct, partly correct, wrong, and answers keyed by ids the quiz does not have
+ANSWERS = [
+    {"q1": "x = 5", "q2": "def my_func():"},
+    {"q1": "x = 5", "q2": "function my_func():"},
+    {"q1": "var x = 5", "q2": "void my_func():"},
+    {"q3": "x = 5", "q9": "def my_func():"},
+    {"q1": "x = 5", "q2": "def my_func():", "q3": "extra"},
+    {},
+]
+
+
+def _quiz(questions, passing_score=0.5):
+    return SimpleNamespace(id="q", course_id="c", questions=questions, passing_score=passing_score)
+
+
+def test_grade_counts_only_matching_answers():
+    compiled = compile_quiz(_quiz([
+        {"id": "a", "correct_answer": "1"},
+        {"id": "b", "correct_answer": "2"},
+    ]))
+    assert grade(compiled, {"a": "1", "b": "2"}) == (1.0, True)
+    assert grade(compiled, {"a": "1", "b": "1"}) == (0.5, True)
+    assert grade(compiled, {"c": "1", "d": "2"}) == (0.0, False)
+
+
+def test_questions_without_an_id_or_answer_are_never_correct():
+    compiled = compile_quiz(_quiz([
+        {"id": "a", "correct_answer": "1"},
+        {"correct_answer": "2"},
+        {"id": "c"},
+    ]))
+    assert compiled.total_questions == 3
+    assert grade(compiled, {"a": "1", "None": "2", "c": None}) == (pytest.approx(1 / 3), False)
+
+
+def test_empty_quiz_scores_zero():
+    assert grade(compile_quiz(_quiz([], passing_score=0)), {"a": "1"}) == (0, True)
+
+
+def test_batch_matches_single_submissions(client):
+    submissions = [
+        {"user_id": f"grading-{i}", "quiz_id": QUIZ, "answers": answers}
+        for i, answers in enumerate(ANSWERS)
+    ]
+    single = []
+    for submission in submissions:
+        response = client.post("/api/v1/quizzes/submit", json=submission)
+        assert response.status_code == 200
+        single.append(response.json())
+
+    response = client.post("/api/v1/quizzes/submit/batch", json={"submissions": submissions})
+    assert response.status_code == 200
+    batch = response.json()["results"]
+
+    assert batch == single
+    assert [result["score"] for result in batch] == [1.0, 0.5, 0.0, 0.0, 1.0, 0.0]
+    assert [result["passed"] for result in batch] == [True, False, False, False, True, False]
+
+
+def test_batch_with_an_unknown_quiz_is_rejected(client):
+    response = client.post("/api/v1/quizzes/submit/batch", json={"submissions": [
+        {"user_id": "grading-0", "quiz_id": QUIZ, "answers": ANSWERS[0]},
+        {"user_id": "grading-0", "quiz_id": "no-such-quiz", "answers": ANSWERS[0]},
+    ]})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Quiz not found: no-such-quiz"
+
+
+def _submit_first_answer(client) -> float:
+    response = client.post("/api/v1/quizzes/submit", json={
+        "user_id": "grading-edit", "quiz_id": QUIZ, "answers": {"q1": "var x = 5"},
+    })
+    assert response.status_code == 200
+    return response.json()["score"]
+
+
+def _edit_first_answer(quiz, correct_answer: str):
+    # JSON columns only track reassignment, not in-place edits
+    questions = [dict(question) for question in quiz.questions]
+    questions[0]["correct_answer"] = correct_answer
+    quiz.questions = questions
+
+
+def test_committed_question_edit_drops_the_answer_key(client, primary_db):
+    assert _submit_first_answer(client) == 0.0
+    assert QUIZ in quiz_keys._entries
+
+    quiz = primary_db.get(models.Quiz, QUIZ)
+    _edit_first_answer(quiz, "var x = 5")
+    primary_db.commit()
+    try:
+        assert QUIZ not in quiz_keys._entries
+        assert _submit_first_answer(client) == 0.5
+    finally:
+        _edit_first_answer(quiz, "x = 5")
+        primary_db.commit()
+    assert _submit_first_answer(client) == 0.0
+
+
+def test_rolled_back_question_edit_keeps_the_answer_key(client, primary_db):
+    assert _submit_first_answer(client) == 0.0
+    compiled = quiz_keys._entries[QUIZ]
+
+    _edit_first_answer(primary_db.get(models.Quiz, QUIZ), "var x = 5")
+    primary_db.flush()
+    primary_db.rollback()
+
+    assert quiz_keys._entries[QUIZ] is compiled
+    assert _submit_first_answer(client) == 0.0
@@ -0,0 +1,83 @@
+"""Write-behind quiz attempts survive shutdown and cancelled flushes"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+import models
+from config.database import AsyncSessionLocal
+from services import quiz_submissions
+from services.quiz_submissions import GradedAttempt, QuizAttemptWriter
+
+
+class SlowSessions:
+    """Session factory whose sessions take ``delay`` seconds to open"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.opened = asyncio.Event()
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.opened.set()
+        await asyncio.sleep(self.delay)
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+def _attempts(user_id: str, count: int):
+    return [
+        GradedAttempt(
+            user_id=user_id, quiz_id="quiz-python-basics", course_id="course-python-intro",
+            answers={}, score=1.0, passed=True, submitted_at=datetime.utcnow(),
+        )
+        for _ in range(count)
+    ]
+
+
+def _stored(client, user_id: str) -> int:
+    async def count():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(func.count()).select_from(models.QuizAttempt).where(models.QuizAttempt.user_id == user_id)
+            )).scalar_one()
+
+    return client.portal.call(count)
+
+
+def test_stop_during_a_flush_writes_every_attempt(client, monkeypatch):
+    monkeypatch.setattr(quiz_submissions, "QUIZ_WRITE_BEHIND_INTERVAL", 0.01)
+    sessions = SlowSessions(0.2)
+    writer = QuizAttemptWriter(session_factory=sessions, enabled=True)
+
+    async def scenario():
+        writer.start()
+        for attempt in _attempts("writer-shutdown", 5):
+            await writer.submit(attempt)
+        # Shut down while the periodic flush is still opening its session
+        await sessions.opened.wait()
+        await writer.stop()
+
+    client.portal.call(scenario)
+    assert writer.pending == 0
+    assert _stored(client, "writer-shutdown") == 5
+
+
+def test_cancelled_flush_keeps_its_batch(client):
+    sessions = SlowSessions(10)
+    writer = QuizAttemptWriter(session_factory=sessions, enabled=True)
+
+    async def scenario():
+        for attempt in _attempts("writer-cancelled", 3):
+            await writer.submit(attempt)
+        flush = asyncio.create_task(writer.flush())
+        await sessions.opened.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+    client.portal.call(scenario)
+    assert writer.pending == 3
+    assert _stored(client, "writer-cancelled") == 0
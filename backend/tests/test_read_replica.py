@@ -0,0 +1,66 @@
+"""GET routes read the replica, except for recent writers and cache misses"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import models
+from config.database import ReadSessionLocal, read_your_writes
+
+
+def test_get_routes_read_the_replica(client, primary_db, sync_replica):
+    primary_db.add(models.QuizAttempt(
+        user_id="replica-reader", quiz_id="quiz-python-basics", answers={}, score=1.0, passed=True
+    ))
+    primary_db.commit()
+
+    url = "/api/v1/quizzes/attempts/replica-reader/quiz-python-basics"
+    assert client.get(url).json()["attempts"] == []
+
+    sync_replica()
+    assert len(client.get(url).json()["attempts"]) == 1
+
+
+def test_writer_reads_their_own_writes(client):
+    response = client.post("/api/v1/progress/replica-writer/courses/course-python-intro/chapters/ch1-intro")
+    assert response.status_code == 200
+
+    # Not on the replica yet: the writer is served from the primary
+    progress = client.get("/api/v1/progress/replica-writer/courses/course-python-intro").json()
+    assert progress["completed_chapters"] == ["ch1-intro"]
+
+    read_your_writes.clear()
+    assert client.get("/api/v1/progress/replica-writer/courses").json() == []
+
+
+def test_cache_misses_read_the_primary(client, primary_db, sync_replica):
+    primary_db.add(models.Course(id="course-lag", title="Lag", description="Replica lag", prerequisites=[]))
+    primary_db.add_all([
+        models.Chapter(id=f"lag-{n}", course_id="course-lag", title=f"Lag {n}", content="", order=n)
+        for n in (1, 2)
+    ])
+    primary_db.commit()
+    client.post("/api/v1/progress/lag-learner/courses/course-lag/chapters/lag-1")
+    sync_replica()
+    read_your_writes.clear()
+
+    chapters_url = "/api/v1/courses/course-lag/chapters"
+    progress_url = "/api/v1/progress/lag-learner/courses"
+    assert len(client.get(chapters_url).json()["chapters"]) == 2
+    assert client.get(progress_url).json()[0]["total_chapters"] == 2
+
+    # The write clears both caches; the replica has not seen it
+    primary_db.add(models.Chapter(id="lag-3", course_id="course-lag", title="Lag 3", content="", order=3))
+    primary_db.commit()
+
+    assert [chapter["id"] for chapter in client.get(chapters_url).json()["chapters"]] == ["lag-1", "lag-2", "lag-3"]
+    assert client.get(progress_url).json()[0]["total_chapters"] == 3
+
+
+async def _write_through_replica():
+    async with ReadSessionLocal() as db:
+        await db.execute(text("DELETE FROM courses"))
+
+
+def test_replica_sessions_are_read_only(client):
+    with pytest.raises(OperationalError, match="readonly"):
+        client.portal.call(_write_through_replica)
@@ -0,0 +1,48 @@
+"""Search hydrates a page of hits with a fixed number of SQL statements"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import models
+
+
+@pytest.fixture
+def statements():
+    """SQL statements executed on any engine while the test runs"""
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", count)
+
+
+@pytest.fixture(scope="module")
+def many_chapters(client):
+    from config.database import SessionLocal
+
+    with SessionLocal() as db:
+        db.add(models.Course(id="course-axolotl", title="Axolotl care", description="Axolotl tanks", prerequisites=[]))
+        db.add_all([
+            models.Chapter(
+                id=f"axolotl-{n}", course_id="course-axolotl", title=f"Axolotl {n}",
+                content="axolotl " * (n % 7 + 1), order=n,
+            )
+            for n in range(1, 61)
+        ])
+        db.commit()
+
+
+@pytest.mark.parametrize("path", ["/api/v1/search/chapters", "/api/v1/search/"])
+def test_statement_count_does_not_grow_with_limit(client, many_chapters, sync_replica, statements, path):
+    sync_replica()
+    counts = {}
+    for limit in (5, 50):
+        statements.clear()
+        response = client.get(path, params={"query": "axolotl", "limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == limit
+        counts[limit] = len(statements)
+    assert counts[5] == counts[50] > 0
@@ -0,0 +1,45 @@
+"""Persisting the search index and deciding when the saved copy is stale"""
+import os
+from datetime import datetime
+
+import models
+from config.database import AsyncSessionLocal
+from services.search_index import SearchIndex
+
+
+def _load_or_build(client, path: str) -> SearchIndex:
+    index = SearchIndex(path)
+
+    async def load_or_build():
+        async with AsyncSessionLocal() as db:
+            await index.load_or_build(db)
+
+    client.portal.call(load_or_build)
+    return index
+
+
+def test_save_leaves_no_temporary_files(client, tmp_path):
+    path = str(tmp_path / "index.pkl")
+    index = _load_or_build(client, path)
+    index.save()
+    assert os.listdir(tmp_path) == ["index.pkl"]
+    assert SearchIndex(path).load()
+
+
+def test_edit_with_unchanged_counts_forces_a_rebuild(client, primary_db, tmp_path):
+    path = str(tmp_path / "index.pkl")
+    _load_or_build(client, path)
+    assert _load_or_build(client, path).search_chapters("quetzalcoatl") == []
+
+    # Another worker renames a chapter: counts stay the same, updated_at moves.
+    # Set explicitly, since now() has one-second resolution on SQLite
+    chapter = primary_db.get(models.Chapter, "ch1-intro")
+    title, updated_at = chapter.title, chapter.updated_at
+    chapter.title, chapter.updated_at = "Quetzalcoatl", datetime(2100, 1, 1)
+    primary_db.commit()
+    try:
+        hits = _load_or_build(client, path).search_chapters("quetzalcoatl")
+        assert [chapter_id for chapter_id, _ in hits] == ["ch1-intro"]
+    finally:
+        chapter.title, chapter.updated_at = title, updated_at
+        primary_db.commit()
@@ -0,0 +1,82 @@
+"""Buffered hybrid usage reaches the database on flush and on shutdown"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from config.database import AsyncSessionLocal
+from services import usage_metering
+from services.usage_metering import UsageMeter, current_month
+
+
+class SlowSessions:
+    """Session factory whose sessions take ``delay`` seconds to open"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.opened = asyncio.Event()
+
+    @asynccontextmanager
+    async def __call__(self):
+        self.opened.set()
+        await asyncio.sleep(self.delay)
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+def _usage(client, user_id: str) -> dict:
+    async def get_usage():
+        async with AsyncSessionLocal() as db:
+            return await UsageMeter().get_usage(db, user_id, current_month())
+
+    return client.portal.call(get_usage)
+
+
+def test_reads_merge_buffered_counts(client):
+    meter = UsageMeter()
+
+    async def scenario():
+        meter.record("meter-reader", "synthesis")
+        async with AsyncSessionLocal() as db:
+            buffered = await meter.get_usage(db, "meter-reader", current_month())
+        await meter.flush()
+        return buffered
+
+    assert client.portal.call(scenario)["synthesis"] == 1
+    assert _usage(client, "meter-reader")["synthesis"] == 1
+
+
+def test_stop_during_a_flush_writes_every_count(client, monkeypatch):
+    monkeypatch.setattr(usage_metering, "USAGE_FLUSH_INTERVAL", 0.01)
+    sessions = SlowSessions(0.2)
+    meter = UsageMeter(session_factory=sessions)
+
+    async def scenario():
+        meter.start()
+        for feature in ("adaptive_learning", "mentor_sessions", "mentor_sessions"):
+            meter.record("meter-shutdown", feature)
+        # Shut down while the periodic flush is still opening its session
+        await sessions.opened.wait()
+        await meter.stop()
+
+    client.portal.call(scenario)
+    usage = _usage(client, "meter-shutdown")
+    assert (usage["adaptive_learning"], usage["mentor_sessions"]) == (1, 2)
+
+
+def test_cancelled_flush_keeps_its_counts(client):
+    sessions = SlowSessions(10)
+    meter = UsageMeter(session_factory=sessions)
+
+    async def scenario():
+        meter.record("meter-cancelled", "llm_assessment", 4)
+        flush = asyncio.create_task(meter.flush())
+        await sessions.opened.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        async with AsyncSessionLocal() as db:
+            return await meter.get_usage(db, "meter-cancelled", current_month())
+
+    assert client.portal.call(scenario)["llm_assessment"] == 4
+    assert _usage(client, "meter-cancelled")["llm_assessment"] == 0
@@ -0,0 +1,73 @@
+"""
+Gzip storage for large text columns.
+
+``CompressedText`` stores strings as gzip members in a binary column and
+hands them back decompressed, so ORM objects and Core statements keep
+reading and writing ``str``. Selecting the column through
+``type_coerce(column, LargeBinary)`` returns the stored bytes as they are,
+ready to send with ``Content-Encoding: gzip``.
+
+Gzip rather than zstd: every HTTP client accepts it, and zlib ships with
+Python. Headers carry no timestamp, so equal text compresses to equal bytes.
+"""
+import os
+import zlib
+from typing import Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+CONTENT_COMPRESSION_LEVEL = int(os.getenv("CONTENT_COMPRESSION_LEVEL", "6"))
+
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+def compress_text(value: str, level: int = CONTENT_COMPRESSION_LEVEL) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(value.encode("utf-8")) + compressor.flush()
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data, GZIP_WBITS).decode("utf-8")
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (explicitly or via ``*``), honouring q=0"""
+    allowed = None
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            # An explicit gzip entry takes precedence over the wildcard
+            if allowed is None:
+                allowed = q > 0
+        else:
+            return q > 0
+    return bool(allowed)
+
+
+class CompressedText(TypeDecorator):
+    """Text stored gzip-compressed"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(bytes(value))
@@ -0,0 +1,47 @@
+"""
+Cache invalidation on commit, for the in-process caches.
+
+``register_invalidation`` hooks a cache into the ORM session lifecycle:
+after each flush, ``keys_of(obj, change)`` is asked which cache keys every
+new, dirty or deleted object touches (``change`` is ``"deleted"``,
+``"new"`` or ``"dirty"``, in that order), and the keys are kept in
+``session.info``. Once the transaction commits, ``invalidate(keys)``
+receives them in order; a rollback discards them. So a cache never drops
+an entry for a write that did not happen, and never keeps one a committed
+write made stale.
+
+Writes that bypass the unit of work (bulk/Core statements) are not seen;
+their callers invalidate directly.
+"""
+from typing import Any, Callable, Iterable, List, Type
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def register_invalidation(
+    name: str,
+    keys_of: Callable[[Any, str], Iterable[Any]],
+    invalidate: Callable[[List[Any]], None],
+    session_cls: Type[Session] = Session,
+):
+    """Collect ``keys_of`` each flushed object and pass them to ``invalidate``
+    once the transaction commits; ``name`` keys the pending list in ``session.info``"""
+    pending_key = f"{name}_pending"
+
+    @event.listens_for(session_cls, "after_flush")
+    def _collect(session, flush_context):
+        pending = session.info.setdefault(pending_key, [])
+        for change, objects in (("deleted", session.deleted), ("new", session.new), ("dirty", session.dirty)):
+            for obj in objects:
+                pending.extend(keys_of(obj, change))
+
+    @event.listens_for(session_cls, "after_commit")
+    def _apply(session):
+        keys = session.info.pop(pending_key, None)
+        if keys:
+            invalidate(keys)
+
+    @event.listens_for(session_cls, "after_soft_rollback")
+    def _discard(session, previous_transaction):
+        session.info.pop(pending_key, None)
@@ -0,0 +1,53 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on the previous page, JSON-encoded
+and base64url'd so clients treat it as opaque. Routers fetch ``limit + 1``
+rows after the cursor and hand them to ``paginate`` to split off the page.
+"""
+import base64
+import json
+import os
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# Unversioned legacy routes keep returning full, unpaginated lists while set
+LEGACY_FULL_LISTS = os.getenv("LEGACY_FULL_LISTS", "true").lower() in ("1", "true", "yes")
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    raw = json.dumps(list(key), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Decode a cursor holding one key value per entry of ``types`` (``int`` or
+    ``str``); malformed cursors and values of the wrong type are a 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list) or len(key) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    for value, expected in zip(key, types):
+        # bool is an int subclass, but never a valid key
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def paginate(rows: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]) -> Tuple[List[Any], Optional[str]]:
+    """Split ``limit + 1`` fetched rows into the page and the cursor for the next one"""
+    page = list(rows[:limit])
+    next_cursor = encode_cursor(key(page[-1])) if len(rows) > limit and page else None
+    return page, next_cursor
+
+
+def is_legacy_request(request: Request) -> bool:
+    """True for unversioned routes that should keep full-list responses"""
+    return LEGACY_FULL_LISTS and not request.url.path.startswith("/api/")
@@ -158,9 +158,11 @@ export default function CourseDetailPage() {
                           <h3 className="font-medium text-emerald-900 dark:text-emerald-100">
                             Chapter {index + 1}: {chapter.title}
                           </h3>
-                          <p className="text-sm text-emerald-600 dark:text-emerald-300 mt-1 line-clamp-2">
-                            {chapter.content.substring(0, 100)}...
-                          </p>
+                          {chapter.content && (
+                            <p className="text-sm text-emerald-600 dark:text-emerald-300 mt-1 line-clamp-2">
+                              {chapter.content.substring(0, 100)}...
+                            </p>
+                          )}
                         </div>
                       </div>
 
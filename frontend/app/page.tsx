@@ -92,7 +92,7 @@ export default function Home() {
                       <div className="flex justify-between items-start">
                         <div>
                           <h4 className="font-medium text-emerald-900 dark:text-emerald-100">Chapter {index + 1}: {chapter.title}</h4>
-                          <p className="text-emerald-600 dark:text-emerald-300 mt-1 line-clamp-2">{chapter.content.substring(0, 100)}...</p>
+                          {chapter.content && <p className="text-emerald-600 dark:text-emerald-300 mt-1 line-clamp-2">{chapter.content.substring(0, 100)}...</p>}
                         </div>
                         <button
                           className="bg-emerald-600 text-white px-4 py-2 rounded-lg text-sm hover:bg-emerald-700 transition dark:bg-emerald-700 dark:hover:bg-emerald-800"
@@ -35,13 +35,33 @@ export async function apiRequest(endpoint: string, options: RequestInit = {}) {
   }
 }
 
+/**
+ * Fetch every page of a cursor-paginated list endpoint and return the items
+ * under `key`, as the unpaged endpoints did
+ */
+export async function apiRequestAllPages(endpoint: string, key: string, pageSize: number = 200) {
+  const separator = endpoint.includes('?') ? '&' : '?';
+  const items: any[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const cursorParam: string = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+    const page = await apiRequest(`${endpoint}${separator}limit=${pageSize}${cursorParam}`);
+    items.push(...(page[key] || []));
+    cursor = page.next_cursor;
+  } while (cursor);
+
+  return { [key]: items };
+}
+
 /**
  * Course-related API functions
  */
 export const courseApi = {
-  getCourses: () => apiRequest('/api/v1/courses'),
+  getCourses: () => apiRequestAllPages('/api/v1/courses', 'courses'),
   getCourse: (id: string) => apiRequest(`/api/v1/courses/${id}`),
-  getCourseChapters: (courseId: string) => apiRequest(`/api/v1/courses/${courseId}/chapters`),
+  getCourseChapters: (courseId: string) =>
+    apiRequestAllPages(`/api/v1/courses/${courseId}/chapters`, 'chapters'),
   getChapter: (chapterId: string) => apiRequest(`/api/v1/courses/chapters/${chapterId}`),
   getNextChapter: (chapterId: string) => apiRequest(`/api/v1/courses/chapters/${chapterId}/next`),
   getPrevChapter: (chapterId: string) => apiRequest(`/api/v1/courses/chapters/${chapterId}/previous`),
@@ -57,7 +77,7 @@ export const quizApi = {
     body: JSON.stringify(submission),
   }),
   getUserQuizAttempts: (userId: string, quizId: string) =>
-    apiRequest(`/api/v1/quizzes/attempts/${userId}/${quizId}`),
+    apiRequestAllPages(`/api/v1/quizzes/attempts/${userId}/${quizId}`, 'attempts'),
   getUserQuizzesForCourse: (userId: string, courseId: string) =>
     apiRequest(`/api/v1/quizzes/user/${userId}/course/${courseId}`),
 };
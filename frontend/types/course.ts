@@ -9,7 +9,7 @@ export interface Course {
 export interface Chapter {
   id: string;
   title: string;
-  content: string;
+  content?: string;  // Omitted from chapter lists unless requested with include_content
   next_chapter_id?: string | null;
   prev_chapter_id?: string | null;
 }